@@ -1,40 +1,155 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
 import re
-from typing import Optional, Dict
-
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional, Dict, Iterator, List, Tuple
+from src.analysis.fidelity import TraceColumns, score_traces
+from src.analysis.sketches import TraceSketch
+
+# Casa uma linha inteira do log de uma vez (re.MULTILINE), para rodar o
+# findall sobre blocos grandes do arquivo em vez de linha a linha.
+# Linhas sem target (ou com target vazio) não casam e são descartadas.
 LOG_REGEX = re.compile(
-    r'^(?P<timestamp>\d+\.\d+)\s+'
-    r'\[(?P<db>\d+)\s+(?P<client_ip>[^\]]+)\]\s+'
-    r'"(?P<command>\w+)"'
-    r'(?:\s+"(?P<target>[^"]*)")?'
-    r'(?P<other_args>.*)?$'
+    r'^[ \t]*(?P<timestamp>\d+\.\d+)[ \t]+'
+    r'\[\d+[ \t]+[^\]\n]+\][ \t]+'
+    r'"(?P<command>\w+)"[ \t]+'
+    r'"(?P<target>[^"\n]+)"',
+    re.MULTILINE
 )
 
-def parse_log_to_dataframe(filepath: str) -> Optional[pd.DataFrame]:
-    records = []
+METRIC_PERCENTILES = [.5, .75, .9, .95, .99, .999]
+
+# Colunas já parseadas ficam em cache (.npz) aqui, indexadas pelo caminho,
+# mtime e tamanho do log; reanalisar o mesmo log não reparseia o arquivo.
+ANALYSIS_CACHE_DIR = os.path.join('logs', '.analysis_cache')
+_CACHE_VERSION = 1
+_READ_CHUNK_CHARS = 64 * 1024 * 1024
+
+
+def _cache_prefix(filepath: str, cache_dir: str) -> str:
+    path_hash = hashlib.sha1(os.path.abspath(filepath).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{os.path.basename(filepath)}.{path_hash}")
+
+
+def _cache_file(filepath: str, cache_dir: str) -> str:
+    stat = os.stat(filepath)
+    return f"{_cache_prefix(filepath, cache_dir)}.v{_CACHE_VERSION}.{stat.st_mtime_ns}-{stat.st_size}.npz"
+
+
+def _remove_stale_cache(filepath: str, cache_dir: str, current: str):
+    """Remove entradas antigas do mesmo log (mtime/tamanho diferentes)."""
+    prefix = os.path.basename(_cache_prefix(filepath, cache_dir)) + '.'
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith(prefix) and path != current:
+            os.remove(path)
+
+
+def _encode_categories(values) -> np.ndarray:
+    # Nem comandos (\w+) nem targets (regex acima) contêm '\n'.
+    return np.frombuffer('\n'.join(values).encode('utf-8'), dtype=np.uint8)
+
+
+def _decode_categories(blob: np.ndarray) -> List[str]:
+    return blob.tobytes().decode('utf-8').split('\n')
+
+
+def _save_columns(df: pd.DataFrame, cache_path: str):
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            timestamp=df['timestamp'].to_numpy(),
+            command_codes=df['command'].cat.codes.to_numpy(),
+            commands=_encode_categories(df['command'].cat.categories),
+            target_codes=df['target'].cat.codes.to_numpy(),
+            targets=_encode_categories(df['target'].cat.categories),
+        )
+    os.replace(tmp_path, cache_path)
+
+
+def _load_columns(cache_path: str) -> pd.DataFrame:
+    with np.load(cache_path) as data:
+        return pd.DataFrame({
+            'timestamp': data['timestamp'],
+            'command': pd.Categorical.from_codes(data['command_codes'], _decode_categories(data['commands'])),
+            'target': pd.Categorical.from_codes(data['target_codes'], _decode_categories(data['targets'])),
+        })
+
+
+def iter_log_chunks(filepath: str, chunk_chars: int = _READ_CHUNK_CHARS) -> Iterator[pd.DataFrame]:
+    """
+    Lê o log em blocos de ~chunk_chars caracteres (alinhados em fim de
+    linha) e produz um DataFrame (timestamp, command, target) por bloco, na
+    ordem do arquivo e sem ordenar.
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        while True:
+            text = f.read(chunk_chars)
+            if not text:
+                break
+            text += f.readline()
+            matches = LOG_REGEX.findall(text)
+            if not matches:
+                continue
+            # Uma list comprehension por coluna é bem mais rápida que zip(*matches).
+            chunk = pd.DataFrame({
+                'timestamp': np.array([m[0] for m in matches], dtype=np.float64),
+                'command': pd.Series([m[1] for m in matches], dtype=object).str.upper(),
+                'target': pd.Series([m[2] for m in matches], dtype=object),
+            })
+            yield chunk[chunk['command'] != 'CLIENT']
+
+
+def _parse_log_columns(filepath: str) -> Optional[pd.DataFrame]:
+    """Parseia o log inteiro para colunas, ordenadas por timestamp."""
+    chunks = list(iter_log_chunks(filepath))
+    if not chunks:
+        return None
+    df = pd.concat(chunks, ignore_index=True)
+    if df.empty:
+        return None
+    df['command'] = df['command'].astype('category')
+    df['target'] = df['target'].astype('category')
+    return df.sort_values(by='timestamp', kind='stable').reset_index(drop=True)
+
+
+def parse_log_to_dataframe(filepath: str, cache_dir: Optional[str] = ANALYSIS_CACHE_DIR) -> Optional[pd.DataFrame]:
+    """
+    Carrega um log MONITOR em colunas (timestamp, command, target; command e
+    target como categorias) ordenadas por timestamp, mais inter_arrival_ms.
+    Com cache_dir, o resultado do parse é reaproveitado enquanto o arquivo
+    não mudar (mesmo mtime e tamanho); cache_dir=None desativa o cache.
+    """
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                match = LOG_REGEX.match(line.strip())
-                if match:
-                    data = match.groupdict()
-                    if data['target'] and data['command'].upper() != 'CLIENT':
-                        records.append({
-                            'timestamp': float(data['timestamp']),
-                            'command': data['command'].upper(),
-                            'target': data['target']
-                        })
-
-        if not records:
-            print(f"AVISO: Nenhum registro válido com target encontrado em {filepath}.")
-            return None
+        cache_path = _cache_file(filepath, cache_dir) if cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            df = _load_columns(cache_path)
+        else:
+            df = _parse_log_columns(filepath)
+            if df is None:
+                print(f"AVISO: Nenhum registro válido com target encontrado em {filepath}.")
+                return None
+            if cache_path:
+                try:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    _remove_stale_cache(filepath, cache_dir, cache_path)
+                    _save_columns(df, cache_path)
+                except OSError as e:
+                    print(f"AVISO: Não foi possível gravar o cache de {filepath}: {e}")
 
-        df = pd.DataFrame(records)
-        df = df.sort_values(by='timestamp').reset_index(drop=True)
         df['inter_arrival_ms'] = df['timestamp'].diff() * 1000
-        df = df.iloc[1:]
+        df = df.iloc[1:].copy()
+        # A primeira linha removida pode deixar categorias sem ocorrências.
+        df['command'] = df['command'].cat.remove_unused_categories()
+        df['target'] = df['target'].cat.remove_unused_categories()
         return df
     except FileNotFoundError:
         print(f"ERRO: Arquivo não encontrado: {filepath}")
@@ -44,29 +159,39 @@ def parse_log_to_dataframe(filepath: str) -> Optional[pd.DataFrame]:
         return None
 
 
-def calculate_metrics(df: pd.DataFrame, name: str):
-    if df is None or df.empty:
-        print(f"\n--- Métricas para {name} ---")
-        print("DataFrame vazio, não foi possível calcular as métricas.")
-        return
+def sketch_log(filepath: str, chunk_chars: int = _READ_CHUNK_CHARS) -> Optional[TraceSketch]:
+    """
+    Modo fora de memória: lê o log uma única vez, em blocos, e resume-o num
+    TraceSketch (memória limitada, independente do tamanho do log).
+    """
+    try:
+        sketch = TraceSketch()
+        for chunk in iter_log_chunks(filepath, chunk_chars):
+            sketch.update(chunk)
+        if not sketch.count:
+            print(f"AVISO: Nenhum registro válido com target encontrado em {filepath}.")
+            return None
+        return sketch
+    except FileNotFoundError:
+        print(f"ERRO: Arquivo não encontrado: {filepath}")
+        return None
+    except Exception as e:
+        print(f"ERRO inesperado ao processar {filepath}: {e}")
+        return None
 
-    # Recalcula a duração com base nos timestamps restantes após remover a primeira linha
-    duration_s = df['timestamp'].iloc[-1] - df['timestamp'].iloc[0] if len(df) > 1 else 0
-    total_ops = len(df)
-    throughput = total_ops / duration_s if duration_s > 0 else 0
 
-    # Proporção de comandos
-    proportions = df['command'].value_counts(normalize=True)
+def _print_metrics(name: str, duration_s: float, total_ops: int, inter_arrival: Optional[pd.Series],
+                   proportions: pd.Series, unique_targets: Optional[int]):
+    throughput = total_ops / duration_s if duration_s > 0 else 0
 
     print(f"\n--- Métricas para {name} ---")
     print(f"Duração Total (análise): {duration_s:.2f} segundos")
     print(f"Total de Operações (análise): {total_ops}")
     print(f"Vazão (Throughput): {throughput:.2f} ops/segundo")
 
-    inter_arrival_data = df['inter_arrival_ms'].dropna()
-    if not inter_arrival_data.empty:
+    if inter_arrival is not None:
         print("\nPercentis de Tempo entre Ações (ms):")
-        print(inter_arrival_data.describe(percentiles=[.5, .75, .9, .95, .99, .999]))
+        print(inter_arrival)
     else:
         print("\nPercentis de Tempo entre Ações (ms): Não há dados suficientes.")
 
@@ -74,49 +199,125 @@ def calculate_metrics(df: pd.DataFrame, name: str):
     print(proportions)
 
     # Informação sobre recursos únicos
-    if 'target' in df.columns:
-         unique_targets = df['target'].nunique()
+    if unique_targets is not None:
          print(f"Número de Recursos Únicos Acessados: {unique_targets}")
 
     print("-" * 30)
 
 
-def plot_combined_comparisons(logs: Dict[str, Optional[pd.DataFrame]], experiment_name: str, path, valor):
+def calculate_metrics(df: pd.DataFrame, name: str):
+    if df is None or df.empty:
+        print(f"\n--- Métricas para {name} ---")
+        print("DataFrame vazio, não foi possível calcular as métricas.")
+        return
+
+    # Recalcula a duração com base nos timestamps restantes após remover a primeira linha
+    duration_s = df['timestamp'].iloc[-1] - df['timestamp'].iloc[0] if len(df) > 1 else 0
+    total_ops = len(df)
+
+    # Proporção de comandos
+    proportions = df['command'].value_counts(normalize=True)
+
+    inter_arrival_data = df['inter_arrival_ms'].dropna()
+    inter_arrival = None
+    if not inter_arrival_data.empty:
+        inter_arrival = inter_arrival_data.describe(percentiles=METRIC_PERCENTILES)
+
+    unique_targets = df['target'].nunique() if 'target' in df.columns else None
+    _print_metrics(name, duration_s, total_ops, inter_arrival, proportions, unique_targets)
+
+
+def calculate_sketch_metrics(sketch: Optional[TraceSketch], name: str):
+    """As mesmas métricas de calculate_metrics, a partir de um TraceSketch (percentis e únicos aproximados)."""
+    if sketch is None or not sketch.count:
+        print(f"\n--- Métricas para {name} ---")
+        print("Sketch vazio, não foi possível calcular as métricas.")
+        return
+
+    inter_arrival = None
+    if sketch.inter_arrival_ms.count:
+        inter_arrival = sketch.inter_arrival_ms.describe(METRIC_PERCENTILES, name='inter_arrival_ms')
+    _print_metrics(name, sketch.duration_s, sketch.count, inter_arrival,
+                   sketch.command_proportions(), sketch.unique_targets.estimate())
+
+
+def summarize_metrics(df: Optional[pd.DataFrame]) -> Dict[str, Any]:
+    """As métricas principais de calculate_metrics, como dicionário (para tabelas)."""
+    if df is None or df.empty:
+        return {'total_ops': 0}
+    duration_s = df['timestamp'].iloc[-1] - df['timestamp'].iloc[0] if len(df) > 1 else 0
+    inter_arrival_data = df['inter_arrival_ms'].dropna()
+    summary = {
+        'total_ops': len(df),
+        'duration_s': duration_s,
+        'throughput_ops_s': len(df) / duration_s if duration_s > 0 else 0,
+        'inter_arrival_p50_ms': inter_arrival_data.quantile(0.5) if not inter_arrival_data.empty else None,
+        'inter_arrival_p99_ms': inter_arrival_data.quantile(0.99) if not inter_arrival_data.empty else None,
+        'unique_targets': df['target'].nunique(),
+    }
+    for command, proportion in df['command'].value_counts(normalize=True).items():
+        summary[f'prop_{command}'] = proportion
+    return summary
+
+
+def summarize_sketch(sketch: Optional[TraceSketch]) -> Dict[str, Any]:
+    """O mesmo que summarize_metrics, a partir de um TraceSketch."""
+    if sketch is None or not sketch.count:
+        return {'total_ops': 0}
+    duration_s = sketch.duration_s
+    summary = {
+        'total_ops': sketch.count,
+        'duration_s': duration_s,
+        'throughput_ops_s': sketch.count / duration_s if duration_s > 0 else 0,
+        'inter_arrival_p50_ms': sketch.inter_arrival_ms.quantile(0.5),
+        'inter_arrival_p99_ms': sketch.inter_arrival_ms.quantile(0.99),
+        'unique_targets': sketch.unique_targets.estimate(),
+    }
+    for command, proportion in sketch.command_proportions().items():
+        summary[f'prop_{command}'] = proportion
+    return summary
+
+
+# --- ATUALIZADO: Definição de Fontes (Valores Aumentados) ---
+TITLE_FONTSIZE = 20       # Título principal da figura (era 18)
+SUBPLOT_TITLE_FONTSIZE = 18 # Títulos dos 4 subplots (era 16)
+AXIS_LABEL_FONTSIZE = 16  # Labels 'Tempo (ms)', 'Proporção', etc. (era 14)
+LEGEND_FONTSIZE = 14      # Legenda (Inicial, Gerado, Recebido) (era 12)
+TICK_LABEL_FONTSIZE = 14  # Números nos eixos (0.0, 0.2, 10-1, etc.) (era 12)
+# --- FIM DA ATUALIZAÇÃO ---
+
+
+# --- Mapa de estilos com linha pontilhada para 'Recebido' ---
+PLOT_STYLE_MAP = {
+    'Inicial': {
+        'color': 'C0', # Azul
+        'hist_kwargs': {'alpha': 0.6, 'histtype': 'bar'},
+        'line_kwargs': {'linestyle': '-', 'alpha': 0.7, 'linewidth': 1.5} # Sólido
+    },
+    'Gerado': {
+        'color': 'C1', # Laranja
+        'hist_kwargs': {'alpha': 0.9, 'histtype': 'step', 'linewidth': 2.0},
+        'line_kwargs': {'linestyle': '--', 'alpha': 1.0, 'linewidth': 2.0} # Traços espaçados
+    },
+    'Recebido': {
+        'color': 'C2', # Verde
+        'hist_kwargs': {'alpha': 0.9, 'histtype': 'step', 'linewidth': 2.0},
+        'line_kwargs': {'linestyle': ':', 'alpha': 1.0, 'linewidth': 2.0} # Pontilhado de bolinhas
+    }
+}
+# --- FIM DO MAPA DE ESTILOS ---
+
+
+def plot_combined_comparisons(logs: Dict[str, Optional[pd.DataFrame]], experiment_name: str, path, valor,
+                              output_filename: Optional[str] = None):
     """
     Gera e salva UMA figura contendo os 4 gráficos comparativos
     para os logs analisados (Inicial, Gerado, Recebido).
     """
     print(f"\nGerando gráfico combinado para o experimento: {experiment_name}...")
 
-    # --- ATUALIZADO: Definição de Fontes (Valores Aumentados) ---
-    TITLE_FONTSIZE = 20       # Título principal da figura (era 18)
-    SUBPLOT_TITLE_FONTSIZE = 18 # Títulos dos 4 subplots (era 16)
-    AXIS_LABEL_FONTSIZE = 16  # Labels 'Tempo (ms)', 'Proporção', etc. (era 14)
-    LEGEND_FONTSIZE = 14      # Legenda (Inicial, Gerado, Recebido) (era 12)
-    TICK_LABEL_FONTSIZE = 14  # Números nos eixos (0.0, 0.2, 10-1, etc.) (era 12)
-    # --- FIM DA ATUALIZAÇÃO ---
-
-
-    # --- Mapa de estilos com linha pontilhada para 'Recebido' ---
-    style_map = {
-        'Inicial': {
-            'color': 'C0', # Azul
-            'hist_kwargs': {'alpha': 0.6, 'histtype': 'bar'},
-            'line_kwargs': {'linestyle': '-', 'alpha': 0.7, 'linewidth': 1.5} # Sólido
-        },
-        'Gerado': {
-            'color': 'C1', # Laranja
-            'hist_kwargs': {'alpha': 0.9, 'histtype': 'step', 'linewidth': 2.0},
-            'line_kwargs': {'linestyle': '--', 'alpha': 1.0, 'linewidth': 2.0} # Traços espaçados
-        },
-        'Recebido': {
-            'color': 'C2', # Verde
-            'hist_kwargs': {'alpha': 0.9, 'histtype': 'step', 'linewidth': 2.0},
-            'line_kwargs': {'linestyle': ':', 'alpha': 1.0, 'linewidth': 2.0} # Pontilhado de bolinhas
-        }
-    }
+    style_map = PLOT_STYLE_MAP
     default_style = style_map['Inicial']
-    # --- FIM DO MAPA DE ESTILOS ---
 
 
     fig, axes = plt.subplots(2, 2, figsize=(16, 12))
@@ -270,43 +471,309 @@ def plot_combined_comparisons(logs: Dict[str, Optional[pd.DataFrame]], experimen
     # Cria um nome de arquivo seguro
     safe_exp_name = "".join(c if c.isalnum() else "_" for c in experiment_name)
     # ATENÇÃO: Verifique se o nome do arquivo deve incluir 'valor' ou 'safe_exp_name'
-    output_filename = f'{path}/test{valor}.png' # Usando 'valor' como no seu código original
+    if output_filename is None:
+        output_filename = f'{path}/test{valor}.png' # Usando 'valor' como no seu código original
     # Alternativa: output_filename = f'{path}/comparacao_combinada_{safe_exp_name}.png'
 
     plt.savefig(output_filename)
     print(f"Salvo: {output_filename}")
     plt.close(fig) # Fecha a figura
 
+def plot_sketch_comparisons(sketches: Dict[str, Optional[TraceSketch]], experiment_name: str, output_filename: str):
+    """
+    Os mesmos 4 gráficos de plot_combined_comparisons, a partir de
+    TraceSketches (modo fora de memória). Histogramas e CDF são
+    reconstruídos dos sketches: buckets logarítmicos, top-K e cauda estimada.
+    """
+    print(f"\nGerando gráfico combinado (sketches) para o experimento: {experiment_name}...")
+    style_map = PLOT_STYLE_MAP
+    default_style = style_map['Inicial']
+    valid = {name: sketch for name, sketch in sketches.items() if sketch is not None and sketch.count}
+
+    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+    ax1, ax2, ax3, ax4 = axes[0, 0], axes[0, 1], axes[1, 0], axes[1, 1]
+    if not valid:
+        for ax in (ax1, ax2, ax3, ax4):
+            ax.text(0.5, 0.5, 'Sem dados para plotar', horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
+        print("Aviso: Não há dados para gerar os gráficos.")
+    else:
+        # --- Gráfico 1: Proporção de Comandos ---
+        df_proportions = pd.DataFrame({name: sketch.command_proportions() for name, sketch in valid.items()}).fillna(0)
+        df_proportions.plot(kind='bar', ax=ax1, edgecolor='black', linewidth=0.7)
+        ax1.set_title('Proporção de Comandos', fontsize=SUBPLOT_TITLE_FONTSIZE)
+        ax1.set_ylabel('Proporção', fontsize=AXIS_LABEL_FONTSIZE)
+        ax1.set_xlabel('command', fontsize=AXIS_LABEL_FONTSIZE)
+        ax1.tick_params(axis='x', rotation=45, labelsize=TICK_LABEL_FONTSIZE)
+        ax1.tick_params(axis='y', labelsize=TICK_LABEL_FONTSIZE)
+        ax1.legend(fontsize=LEGEND_FONTSIZE)
+
+        # --- Gráfico 2: Tempos de Chegada (buckets do histograma reagrupados em 50 bins log) ---
+        for name, sketch in valid.items():
+            edges, counts = sketch.inter_arrival_ms.buckets()
+            if not len(counts):
+                continue
+            centers = np.sqrt(edges[:-1] * edges[1:])
+            bins = np.logspace(np.log10(edges[0]), np.log10(edges[-1]), 50)
+            style = style_map.get(name, default_style)
+            ax2.hist(centers, bins=bins, weights=counts, label=name, density=True,
+                     color=style['color'], **style['hist_kwargs'])
+        ax2.set_xscale('log')
+        ax2.set_title('Distribuição Tempos Chegada (Escala Log)', fontsize=SUBPLOT_TITLE_FONTSIZE)
+        ax2.set_xlabel('Tempo (ms)', fontsize=AXIS_LABEL_FONTSIZE)
+        ax2.set_ylabel('Densidade de Probabilidade', fontsize=AXIS_LABEL_FONTSIZE)
+        ax2.tick_params(axis='both', which='major', labelsize=TICK_LABEL_FONTSIZE)
+        ax2.legend(fontsize=LEGEND_FONTSIZE)
+
+        # --- Gráfico 3: Operações por Segundo ---
+        max_duration = max(1, max(int(sketch.duration_s) for sketch in valid.values()))
+        for name, sketch in valid.items():
+            ops_over_time = sketch.ops_per_second.series().reindex(pd.RangeIndex(start=0, stop=max_duration + 1), fill_value=0)
+            style = style_map.get(name, default_style)
+            ax3.plot(ops_over_time.index, ops_over_time.values, label=name, color=style['color'], **style['line_kwargs'])
+        ax3.set_title('Operações por Segundo', fontsize=SUBPLOT_TITLE_FONTSIZE)
+        ax3.set_xlabel('Tempo (segundos)', fontsize=AXIS_LABEL_FONTSIZE)
+        ax3.set_ylabel('Número de Operações', fontsize=AXIS_LABEL_FONTSIZE)
+        ax3.tick_params(axis='both', labelsize=TICK_LABEL_FONTSIZE)
+        ax3.legend(fontsize=LEGEND_FONTSIZE)
+
+        # --- Gráfico 4: CDF Acesso a Recursos (top-K + cauda estimada) ---
+        for name, sketch in valid.items():
+            normalized_rank, normalized_cumulative_freq = sketch.popularity_cdf()
+            style = style_map.get(name, default_style)
+            ax4.plot(normalized_rank, normalized_cumulative_freq, label=name, color=style['color'], **style['line_kwargs'])
+        ax4.set_title('CDF Acesso a Recursos', fontsize=SUBPLOT_TITLE_FONTSIZE)
+        ax4.set_xlabel('Proporção Recursos (Popularidade)', fontsize=AXIS_LABEL_FONTSIZE)
+        ax4.set_ylabel('Proporção Cumulativa Acessos', fontsize=AXIS_LABEL_FONTSIZE)
+        ax4.grid(True, linestyle='--', alpha=0.6)
+        ax4.legend(fontsize=LEGEND_FONTSIZE)
+        ax4.axhline(0.8, color='grey', linestyle=':', linewidth=0.8)
+        ax4.axvline(0.2, color='grey', linestyle=':', linewidth=0.8)
+        ax4.set_xlim(0, 1)
+        ax4.set_ylim(0, 1)
+        ax4.tick_params(axis='both', labelsize=TICK_LABEL_FONTSIZE)
+
+    plt.tight_layout(rect=[0, 0.03, 1, 0.97])
+    plt.savefig(output_filename)
+    print(f"Salvo: {output_filename}")
+    plt.close(fig)
+
 # ==============================================================================
 # FIM DA FUNÇÃO
 # ==============================================================================
 # ==============================================================================
 # FIM DA FUNÇÃO
 # ==============================================================================
-if __name__ == '__main__':
-    current_experiment_name = 'Heatmap_1pct_Double_Stretch'
-
-    path_log_inicial = 'logs/input/trace.log'
-
-    print(f"=== Iniciando análise para o experimento: {current_experiment_name} ===")
-    for x in range(1, 6):
-        path_log_recebido = f'logs/output/test{x}/redis_monitor_received.log'
-        path_log_gerado = f'logs/output/test{x}/synthetic_trace.log'
-        df_inicial = parse_log_to_dataframe(path_log_inicial)
-        df_gerado = parse_log_to_dataframe(path_log_gerado)
-        df_recebido = parse_log_to_dataframe(path_log_recebido)
-
+# ==============================================================================
+# DRIVER DE MÚLTIPLOS EXPERIMENTOS
+# ==============================================================================
+GENERATED_LOG_NAME = 'synthetic_trace.log'
+RECEIVED_LOG_NAME = 'redis_monitor_received.log'
+SUMMARY_NAME = 'summary.json'
+FIDELITY_NAME = 'fidelity.json'
+
+
+def _natural_key(name: str) -> List[Any]:
+    # 'test2' antes de 'test10'.
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def discover_experiments(experiments_dir: str) -> List[str]:
+    """Subdiretórios de experiments_dir com um log gerado e/ou recebido."""
+    experiments = []
+    for name in sorted(os.listdir(experiments_dir), key=_natural_key):
+        path = os.path.join(experiments_dir, name)
+        if not os.path.isdir(path):
+            continue
+        if any(os.path.exists(os.path.join(path, log)) for log in (GENERATED_LOG_NAME, RECEIVED_LOG_NAME)):
+            experiments.append(path)
+    return experiments
+
+
+def _experiment_outputs(experiment_dir: str) -> Tuple[str, str]:
+    name = os.path.basename(os.path.normpath(experiment_dir))
+    return os.path.join(experiment_dir, f'{name}.png'), os.path.join(experiment_dir, SUMMARY_NAME)
+
+
+def is_up_to_date(experiment_dir: str, input_log: str) -> bool:
+    """True se o gráfico e o resumo do experimento são mais novos que todos os logs de entrada."""
+    outputs = _experiment_outputs(experiment_dir)
+    if not all(os.path.exists(path) for path in outputs):
+        return False
+    inputs = [input_log] + [os.path.join(experiment_dir, log) for log in (GENERATED_LOG_NAME, RECEIVED_LOG_NAME)]
+    newest_input = max(os.path.getmtime(path) for path in inputs if os.path.exists(path))
+    return min(os.path.getmtime(path) for path in outputs) > newest_input
+
+
+def score_fidelity(logs_data: Dict[str, Optional[pd.DataFrame]], intervals: int = 20) -> Dict[str, Dict[str, Any]]:
+    """Pontuações de fidelidade (src/analysis/fidelity.py) de cada log em relação ao 'Inicial'."""
+    reference = logs_data.get('Inicial')
+    if reference is None or len(reference) < 2:
+        return {}
+
+    def columns(df: pd.DataFrame) -> TraceColumns:
+        return TraceColumns(df['timestamp'].to_numpy(), df['command'].to_numpy(dtype=object), df['target'].to_numpy(dtype=object))
+
+    scores = {}
+    for name, df in logs_data.items():
+        if name != 'Inicial' and df is not None and len(df) > 1:
+            scores[name] = score_traces(columns(reference), columns(df), intervals)
+    return scores
+
+
+def analyze_experiment(
+    experiment_dir: str,
+    input_log: str,
+    experiment_name: str,
+    streaming: bool = False,
+    input_sketch: Optional[TraceSketch] = None,
+    fidelity_intervals: int = 20
+) -> Tuple[str, Dict[str, Dict[str, Any]], str]:
+    """
+    Parse, métricas e gráfico de um experimento. Retorna (diretório, resumo
+    por log, texto impresso); o texto é capturado para que a saída de
+    processos paralelos não se misture. Com streaming, os logs são lidos
+    em blocos para TraceSketches (input_sketch evita reler o log inicial);
+    sem streaming, também grava as pontuações de fidelidade (fidelity.json).
+    """
+    output = io.StringIO()
+    png_path, summary_path = _experiment_outputs(experiment_dir)
+    label = f"{experiment_name} - {os.path.basename(os.path.normpath(experiment_dir))}"
+    if streaming:
+        with contextlib.redirect_stdout(output):
+            sketches = {
+                'Inicial': input_sketch if input_sketch is not None else sketch_log(input_log),
+                'Gerado': sketch_log(os.path.join(experiment_dir, GENERATED_LOG_NAME)),
+                'Recebido': sketch_log(os.path.join(experiment_dir, RECEIVED_LOG_NAME)),
+            }
+            for name, sketch in sketches.items():
+                calculate_sketch_metrics(sketch, f"{label} - {name}")
+            plot_sketch_comparisons(sketches, experiment_name, png_path)
+        summary = {name: summarize_sketch(sketch) for name, sketch in sketches.items()}
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, default=float)
+        return experiment_dir, summary, output.getvalue()
+
+    with contextlib.redirect_stdout(output):
         logs_data = {
-            'Inicial': df_inicial,         # Legendas mais curtas
-            'Gerado': df_gerado,
-            'Recebido': df_recebido,
+            'Inicial': parse_log_to_dataframe(input_log),
+            'Gerado': parse_log_to_dataframe(os.path.join(experiment_dir, GENERATED_LOG_NAME)),
+            'Recebido': parse_log_to_dataframe(os.path.join(experiment_dir, RECEIVED_LOG_NAME)),
         }
-
-        # Imprime métricas antes de plotar
         for name, df in logs_data.items():
-            calculate_metrics(df, f"{current_experiment_name} - {name}") # Adiciona nome do exp às métricas
+            calculate_metrics(df, f"{label} - {name}")
+
+        plot_combined_comparisons(logs_data, experiment_name, experiment_dir, None, output_filename=png_path)
+
+    summary = {name: summarize_metrics(df) for name, df in logs_data.items()}
+    fidelity = score_fidelity(logs_data, fidelity_intervals)
+    with open(os.path.join(experiment_dir, FIDELITY_NAME), 'w', encoding='utf-8') as f:
+        json.dump(fidelity, f, indent=2)
+    for name, scores in fidelity.items():
+        summary[name].update({
+            'fid_inter_arrival_ks': scores['inter_arrival']['ks'],
+            'fid_op_mix_js': scores['op_mix']['js'],
+            'fid_key_js_by_rank': scores['key_popularity']['js_by_rank'],
+            'fid_throughput_error': scores['throughput']['relative_error'],
+        })
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, default=float)
+    return experiment_dir, summary, output.getvalue()
+
+
+def _init_worker():
+    # Os processos só gravam arquivos: backend sem interface gráfica.
+    plt.switch_backend('Agg')
+
+
+def run_experiments(
+    experiments_dir: str,
+    input_log: str,
+    experiment_name: str,
+    workers: int = 1,
+    force: bool = False,
+    summary_file: Optional[str] = None,
+    streaming: bool = False,
+    fidelity_intervals: int = 20
+) -> pd.DataFrame:
+    """
+    Analisa todos os experimentos de experiments_dir (em paralelo com
+    workers > 1) e grava uma tabela combinada (uma linha por experimento e
+    log). Experimentos cujos resultados são mais novos que os logs são
+    pulados (a menos que force) e entram na tabela pelo resumo salvo.
+    Com streaming, cada log é resumido em sketches (memória limitada).
+    """
+    experiments = discover_experiments(experiments_dir)
+    pending = [path for path in experiments if force or not is_up_to_date(path, input_log)]
+    print(f"{len(experiments)} experimentos encontrados em '{experiments_dir}'; "
+          f"{len(experiments) - len(pending)} atualizados, {len(pending)} a analisar.")
+
+    # O log inicial é comum a todos os experimentos: aquece o cache (ou,
+    # com streaming, resume-o uma vez e envia o sketch aos processos).
+    input_sketch = None
+    if pending:
+        if streaming:
+            input_sketch = sketch_log(input_log)
+        else:
+            parse_log_to_dataframe(input_log)
+
+    summaries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = [
+                executor.submit(analyze_experiment, path, input_log, experiment_name, streaming, input_sketch,
+                                fidelity_intervals)
+                for path in pending
+            ]
+            for future in futures:
+                path, summary, output = future.result()
+                print(output, end='')
+                summaries[path] = summary
+    else:
+        _init_worker()
+        for path in pending:
+            path, summary, output = analyze_experiment(
+                path, input_log, experiment_name, streaming, input_sketch, fidelity_intervals
+            )
+            print(output, end='')
+            summaries[path] = summary
+
+    rows = []
+    for path in experiments:
+        summary = summaries.get(path)
+        if summary is None:
+            with open(_experiment_outputs(path)[1], 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+        for log_name, metrics in summary.items():
+            rows.append({'experiment': os.path.basename(os.path.normpath(path)), 'log': log_name, **metrics})
+
+    table = pd.DataFrame(rows)
+    if summary_file is None:
+        summary_file = os.path.join(experiments_dir, 'summary.csv')
+    table.to_csv(summary_file, index=False)
+    print(f"\nResumo combinado salvo em: {summary_file}")
+    return table
 
-        # Gera o gráfico combinado
-        plot_combined_comparisons(logs_data, current_experiment_name, f'logs/output/test{x}', x)
 
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Análise comparativa dos experimentos (logs inicial, gerado e recebido).")
+    arg_parser.add_argument('--experiments-dir', default='logs/output', help="Diretório com um subdiretório por experimento.")
+    arg_parser.add_argument('--input-log', default='logs/input/trace.log', help="Log inicial (comum a todos os experimentos).")
+    arg_parser.add_argument('--name', default='Heatmap_1pct_Double_Stretch', help="Nome do experimento nas métricas.")
+    arg_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Processos em paralelo.")
+    arg_parser.add_argument('--force', action='store_true', help="Reanalisa mesmo experimentos atualizados.")
+    arg_parser.add_argument('--streaming', action='store_true',
+                            help="Modo fora de memória: lê cada log em blocos e usa sketches (percentis, únicos e CDF aproximados).")
+    arg_parser.add_argument('--intervals', type=int, default=20,
+                            help="Fatias de tempo das pontuações de fidelidade por intervalo (100 / percentage_interval).")
+    arg_parser.add_argument('--summary', default=None, help="CSV do resumo combinado (padrão: <experiments-dir>/summary.csv).")
+    args = arg_parser.parse_args()
+
+    current_experiment_name = args.name
+    print(f"=== Iniciando análise para o experimento: {current_experiment_name} ===")
+    summary_table = run_experiments(
+        args.experiments_dir, args.input_log, current_experiment_name, args.workers, args.force, args.summary,
+        args.streaming, args.intervals
+    )
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(summary_table.to_string(index=False))
     print(f"\n=== Análise concluída para o experimento: {current_experiment_name} ===")
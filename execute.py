@@ -0,0 +1,91 @@
+import heapq
+from typing import Iterable, Iterator
+from src.config_loader import load_config
+from src.executors.factory import ExecutorFactory
+from src.generators.factory import GeneratorFactory
+from src.models.fei import FEIEvent
+from src.output.binary_trace import BinaryTrace
+from src.output.sharding import read_manifest
+from src.parsers.factory import ParserFactory
+from src.parsers.interfaces import IParser
+from main import generate_synthetic_events
+
+
+def read_trace(parser: IParser, trace_file: str, output_format: str) -> Iterable[FEIEvent]:
+    """Events of one text or binary trace file."""
+    if output_format == 'binary':
+        return BinaryTrace(trace_file)
+    return parser.parse(trace_file)
+
+
+def read_pipeline_output(parser: IParser, pipeline_config) -> Iterator[FEIEvent]:
+    """
+    Events written by the pipeline, in timestamp order. Sharded output is
+    read through its manifest and the shards are merged back into one
+    stream. RESP output keeps no per-command timestamps, so it cannot be
+    replayed here.
+    """
+    trace_file = pipeline_config.get('generator_log_file')
+    if not trace_file:
+        raise KeyError("'generator_log_file' not found in config.yaml")
+    output_format = pipeline_config.get('output_format', 'text')
+    if output_format == 'resp':
+        raise ValueError(
+            "output_format 'resp' is meant for external replay workers (e.g. 'redis-cli --pipe' per client file); "
+            "replay it with executor.source 'generator' or write the trace as 'text' or 'binary'."
+        )
+    if pipeline_config.get('output_shards', 1) <= 1:
+        print(f"Reading synthetic events from '{trace_file}'...")
+        return iter(read_trace(parser, trace_file, output_format))
+
+    manifest = read_manifest(trace_file)
+    print(f"Reading synthetic events from {manifest['shard_count']} shards of '{trace_file}'...")
+    shards = [read_trace(parser, shard["file"], manifest["output_format"]) for shard in manifest["shards"]]
+    # Every shard is in timestamp order; ties keep the shard order.
+    return heapq.merge(*shards, key=lambda event: event['timestamp'])
+
+
+def run_python_executor():
+    """
+    Replays the synthetic workload against the target system. The events are
+    read from 'generator_log_file' (or its shards), or, with executor.source
+    set to 'generator', taken straight from the generator's stream.
+    """
+    print("\n--- STARTING WORKLOAD EXECUTION ---")
+
+    config = load_config('config.yaml')
+    pipeline_config = config.get('pipeline', {})
+    components_config = config.get('components', {})
+    parser_config = components_config.get('parser', {})
+    generator_config = components_config.get('generator', {})
+    executor_config = components_config.get('executor', {})
+
+    parser = ParserFactory().create_parser(parser_config)
+    executor = ExecutorFactory().create_executor(executor_config)
+
+    source = executor_config.get('source', 'trace')
+    if source == 'generator':
+        generator = GeneratorFactory().create_generator(generator_config, parser)
+        events = generate_synthetic_events(pipeline_config, generator_config, parser, generator)
+    elif source == 'trace':
+        events = read_pipeline_output(parser, pipeline_config)
+    else:
+        raise ValueError(f"executor.source must be 'trace' or 'generator', not '{source}'")
+
+    summary = executor.execute(events)
+
+    print("\n--- EXECUTION SUMMARY ---")
+    print(f"Total Operations Attempted: {summary.attempted}")
+    print(f"Successful Operations:      {summary.succeeded}")
+    print(f"Failed Operations:          {summary.failed}")
+    if summary.attempted > 0:
+        print(f"Success Rate:               {summary.succeeded / summary.attempted * 100:.2f}%")
+    print(f"Duration:                   {summary.duration_s:.3f}s")
+    if summary.latency_p50_ms is not None:
+        print(f"Latency p50/p99/max:        {summary.latency_p50_ms:.3f} / {summary.latency_p99_ms:.3f} / {summary.latency_max_ms:.3f} ms")
+    print(f"Max Dispatch Lag:           {summary.max_dispatch_lag_ms:.3f} ms")
+    print("-------------------------\n")
+
+
+if __name__ == "__main__":
+    run_python_executor()
@@ -1,11 +1,126 @@
 import json 
+import shutil
+from typing import Any, Dict, Iterable, Iterator, Optional
 from src.config_loader import load_config
+from src.instrumentation import PipelineInstrumentation, report_path
+from src.models.event_batch import EventBatch
+from src.models.fei import FEIEvent
+from src.parsers.interfaces import IParser
 from src.parsers.factory import ParserFactory
+from src.stage_cache import StageCache
 from src.generators.factory import GeneratorFactory
+from src.generators.interfaces import IGenerator
+from src.output.binary_trace import BinaryTraceWriter
+from src.output.resp_writer import RespTraceWriter
+from src.output.sharding import OUTPUT_FORMATS, ShardedTraceWriter, manifest_path
+
+
+def write_event_stream(
+    events: Iterable[FEIEvent],
+    parser: IParser,
+    output_file: str,
+    batch_size: int,
+    buffer_bytes: int
+) -> int:
+    """Formats and writes an event stream in batches. Returns the event count."""
+    count = 0
+    batch = []
+    with open(output_file, 'w', encoding='utf-8', buffering=buffer_bytes) as f:
+        for event in events:
+            batch.append(parser.format(event))
+            if len(batch) >= batch_size:
+                f.write('\n'.join(batch) + '\n')
+                count += len(batch)
+                batch.clear()
+        if batch:
+            f.write('\n'.join(batch) + '\n')
+            count += len(batch)
+    return count
+
+
+def generate_synthetic_events(
+    pipeline_config: Dict[str, Any],
+    generator_config: Dict[str, Any],
+    parser: IParser,
+    generator: IGenerator,
+    instrumentation: Optional[PipelineInstrumentation] = None,
+    stage_cache: Optional[StageCache] = None
+) -> Iterator[FEIEvent]:
+    """
+    Parses the raw log and generates the synthetic events as a lazy stream.
+    In streaming mode the generator consumes the events in a single pass and
+    only the trace time bounds are read ahead. With a saved model, parsing
+    and characterization are skipped entirely; with a stage cache, they are
+    skipped whenever the same input was already parsed or characterized with
+    the same settings.
+    """
+    input_log_file = pipeline_config.get('input_log_file')
+    model_input_file = generator_config.get('model_input_file')
+    instrumentation = instrumentation or PipelineInstrumentation(enabled=False)
+    # The stream characterizes (or loads the model) before its first event
+    # and then synthesizes while the writer pulls from it.
+    if model_input_file:
+        print(f"Running '{generator_config.get('type')}' strategy from the saved model '{model_input_file}'...")
+        return instrumentation.iter_stage('synthesize', generator.generate_stream_from_model(model_input_file), 'load_model')
+
+    streaming = pipeline_config.get('streaming_characterization', False)
+    parser_params = parser.cache_params()
+    model_params = generator.model_cache_params()
+    events_key = None
+    if stage_cache is not None and parser_params is not None:
+        input_digest = stage_cache.input_digest(input_log_file)
+        events_key = stage_cache.key('events', input_digest, parser_params)
+        if model_params is not None:
+            if streaming:
+                # Out-of-order events are handled differently when streaming.
+                model_params = dict(
+                    model_params,
+                    streaming=True,
+                    reorder_buffer_size=generator_config.get('reorder_buffer_size', 10000),
+                    characterization_workers=generator_config.get('characterization_workers', 1)
+                )
+            model_key = stage_cache.key('model', input_digest, {"parser": parser_params, "generator": model_params})
+            cached_model = stage_cache.lookup(model_key)
+            if cached_model is not None:
+                print(f"Found a cached characterization model of '{input_log_file}'; skipping parsing and characterization.")
+                model_output_file = generator_config.get('model_output_file')
+                if model_output_file:
+                    shutil.copyfile(cached_model, model_output_file)
+                print(f"Running '{generator_config.get('type')}' strategy from the cached model...")
+                return instrumentation.iter_stage('synthesize', generator.generate_stream_from_model(cached_model), 'load_model')
+            generator.model_sink = lambda model: stage_cache.store(
+                model_key, lambda path: generator.save_model(model, path)
+            )
+
+    if streaming:
+        print(f"Reading time bounds of '{input_log_file}'...")
+        time_bounds = parser.read_time_bounds(input_log_file)
+        print(f"Streaming events from '{input_log_file}' (trace spans {time_bounds[1] - time_bounds[0]:.3f}s).")
+        print(f"Running '{generator_config.get('type')}' strategy to generate events...")
+        stream = generator.generate_stream_from_file(parser, input_log_file, time_bounds=time_bounds)
+        return instrumentation.iter_stage('synthesize', stream, 'parse_characterize')
+
+    if events_key is not None and stage_cache.lookup(events_key) is not None:
+        print(f"Loading the cached parse of '{input_log_file}' into memory...")
+        with instrumentation.stage('load_events'):
+            loaded_events = stage_cache.load_events(events_key)
+        instrumentation.add_events('load_events', len(loaded_events))
+    else:
+        print(f"Parsing '{input_log_file}' into memory...")
+        with instrumentation.stage('parse'):
+            # Held as one columnar EventBatch rather than a list of event dicts.
+            loaded_events = EventBatch.concat(parser.parse_batches(input_log_file))
+        instrumentation.add_events('parse', len(loaded_events))
+        if events_key is not None:
+            with instrumentation.stage('store_events'):
+                stage_cache.store_events(events_key, loaded_events)
+    print(f"Parsing complete. {len(loaded_events)} events loaded into memory.")
+    print(f"Running '{generator_config.get('type')}' strategy to generate events...")
+    return instrumentation.iter_stage('synthesize', generator.generate_stream(loaded_events), 'characterize')
 
 
 def run_python_pipeline():
-    """Orchestrates the parsing and generation stages in-memory."""
+    """Orchestrates the parsing, generation and writing stages."""
     print("\n--- STARTING WORKLOAD GENERATION PIPELINE ---")
     
     # --- 1. Load Configurations ---
@@ -34,24 +149,79 @@ def run_python_pipeline():
             "'input_log_file' or 'generator_log_file' not found in config.yaml"
         )
 
-    # Stage 1: Parse the raw log into an in-memory list of events
-    print(f"Parsing '{input_log_file}' into memory...")
-    event_iterator = parser.parse(input_log_file)
-    loaded_events = list(event_iterator)
-    print(f"Parsing complete. {len(loaded_events)} events loaded into memory.")
+    # Per-stage timings (and opt-in profiles) of this run, saved next to the output.
+    instrumentation = PipelineInstrumentation.from_config(pipeline_config.get('instrumentation', {}))
 
-    # Stage 2: Generate the synthetic events list in-memory
-    print(f"Running '{generator_config.get('type')}' strategy to generate events...")
-    synthetic_events = generator.generate(loaded_events)
+    # Parsed events and characterization models are reused across runs
+    # over the same input (see stage_cache in config.yaml).
+    stage_cache = StageCache.from_config(pipeline_config.get('stage_cache', {}))
+
+    # Stage 1 & 2: Parse the raw log and generate the synthetic events.
+    synthetic_events = generate_synthetic_events(
+        pipeline_config, generator_config, parser, generator, instrumentation, stage_cache
+    )
+
+    # Stage 3: Format and write the output using the parser's format method.
+    # Lines are written in batches as they are synthesized, so memory stays
+    # flat regardless of the simulation length.
+    write_batch_size = pipeline_config.get('write_batch_size', 10000)
+    write_buffer_bytes = pipeline_config.get('write_buffer_bytes', 8 * 1024 * 1024)
+    output_format = pipeline_config.get('output_format', 'text')
+    if output_format not in OUTPUT_FORMATS + ['resp']:
+        raise ValueError(f"pipeline.output_format must be one of {OUTPUT_FORMATS + ['resp']}, not '{output_format}'")
+    output_shards = pipeline_config.get('output_shards', 1)
+    with instrumentation.stage('write'):
+        if output_format == 'resp':
+            # RESP is always split per client; output_shards does not apply.
+            if output_shards > 1:
+                raise ValueError("pipeline.output_shards cannot be combined with output_format 'resp'")
+            resp_pipeline_size = pipeline_config.get('resp_pipeline_size', 0)
+            print(f"Encoding events as RESP, one file per client of '{output_log_file}'...")
+            writer = RespTraceWriter(parser, output_log_file, resp_pipeline_size, write_batch_size, write_buffer_bytes)
+            written_count = writer.write(synthetic_events)
+            written_files = list(writer.paths.values())
+            print(f"Saved {written_count} events. Client manifest: '{manifest_path(output_log_file)}'.")
+        elif output_shards > 1:
+            # One file per shard (by client or key hash), for parallel replay.
+            shard_by = pipeline_config.get('shard_by', 'client')
+            print(f"Formatting and streaming events to {output_shards} shards of '{output_log_file}' (by {shard_by})...")
+            writer = ShardedTraceWriter(
+                parser, output_log_file, output_shards, shard_by, write_batch_size, write_buffer_bytes, output_format
+            )
+            written_count = writer.write(synthetic_events)
+            written_files = writer.paths
+            print(f"Saved {written_count} events. Shard manifest: '{manifest_path(output_log_file)}'.")
+        elif output_format == 'binary':
+            # Fixed-width records plus string/payload sections, no text formatting.
+            print(f"Streaming events to binary trace '{output_log_file}'...")
+            written_count = BinaryTraceWriter(output_log_file, write_buffer_bytes).write(synthetic_events)
+            written_files = [output_log_file]
+            print(f"Saved {written_count} events.")
+        else:
+            print(f"Formatting and streaming events to '{output_log_file}'...")
+            written_count = write_event_stream(
+                synthetic_events, parser, output_log_file, write_batch_size, write_buffer_bytes
+            )
+            written_files = [output_log_file]
+            print(f"Saved {written_count} events.")
+    instrumentation.add_events('write', written_count)
 
-    # Stage 3: Format and write the output using the parser's format method
-    print(f"Formatting and saving {len(synthetic_events)} events to '{output_log_file}'...")
-    with open(output_log_file, 'w', encoding='utf-8') as f:
-        for event in synthetic_events:
-            log_line = parser.format(event)
-            f.write(log_line + '\n')
+    if instrumentation.enabled:
+        report_file = report_path(output_log_file)
+        instrumentation.write(report_file)
+        print("\nStage timings:")
+        print('\n'.join(instrumentation.summary_lines()))
+        print(f"Pipeline report saved to '{report_file}'.")
 
-    print(f"\nPipeline completed. Synthetic log saved to '{output_log_file}'.")
+    if written_files == [output_log_file]:
+        print(f"\nPipeline completed. Synthetic log saved to '{output_log_file}'.")
+    else:
+        # Sharded and RESP output never write output_log_file itself.
+        print(f"\nPipeline completed. Synthetic log saved to {len(written_files)} files (see '{manifest_path(output_log_file)}'):")
+        for path in written_files[:10]:
+            print(f"  {path}")
+        if len(written_files) > 10:
+            print(f"  ... and {len(written_files) - 10} more.")
 
 if __name__ == "__main__":
     run_python_pipeline()
\ No newline at end of file
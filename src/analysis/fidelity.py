@@ -0,0 +1,262 @@
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+
+class TraceColumns(NamedTuple):
+    """The columns fidelity scoring needs, one entry per event."""
+    timestamps: np.ndarray  # float64 seconds
+    ops: np.ndarray         # op names (object/str)
+    targets: np.ndarray     # target keys (object/str)
+
+
+def columns_from_batch(batch) -> TraceColumns:
+    """Builds TraceColumns from an EventBatch (e.g. RedisParser.parse_batches output)."""
+    op_names = np.array(batch.op_types.values, dtype=object)
+    target_names = np.array(batch.targets.values, dtype=object)
+    return TraceColumns(
+        timestamps=np.frombuffer(batch.timestamps, dtype=np.float64),
+        ops=op_names[np.frombuffer(batch.op_codes, dtype=np.uint32)],
+        targets=target_names[np.frombuffer(batch.target_codes, dtype=np.uint32)],
+    )
+
+
+def ks_statistic(a: np.ndarray, b: np.ndarray) -> float:
+    """Two-sample Kolmogorov-Smirnov statistic: max |F_a - F_b|."""
+    a = np.sort(a)
+    b = np.sort(b)
+    values = np.concatenate([a, b])
+    cdf_a = np.searchsorted(a, values, side='right') / len(a)
+    cdf_b = np.searchsorted(b, values, side='right') / len(b)
+    return float(np.max(np.abs(cdf_a - cdf_b)))
+
+
+def wasserstein_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """First Wasserstein (earth mover's) distance between two samples: the area between their CDFs."""
+    a = np.sort(a)
+    b = np.sort(b)
+    values = np.sort(np.concatenate([a, b]))
+    widths = np.diff(values)
+    cdf_a = np.searchsorted(a, values[:-1], side='right') / len(a)
+    cdf_b = np.searchsorted(b, values[:-1], side='right') / len(b)
+    return float(np.sum(np.abs(cdf_a - cdf_b) * widths))
+
+
+def js_divergence(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """
+    Jensen-Shannon divergence (base 2, so in [0, 1]) between count or
+    probability vectors along the last axis; 2-D inputs give one value per row.
+    Rows that are all zero on either side give NaN.
+    """
+    p = np.asarray(p, dtype=np.float64)
+    q = np.asarray(q, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = p / p.sum(axis=-1, keepdims=True)
+        q = q / q.sum(axis=-1, keepdims=True)
+        m = (p + q) / 2
+        kl_p = np.where(p > 0, p * np.log2(p / m), 0.0).sum(axis=-1)
+        kl_q = np.where(q > 0, q * np.log2(q / m), 0.0).sum(axis=-1)
+    return (kl_p + kl_q) / 2
+
+
+def _joint_codes(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Encodes two label arrays against their shared vocabulary."""
+    # Hash-based factorize: an order of magnitude faster than np.unique on strings.
+    codes, uniques = pd.factorize(np.concatenate([a, b]))
+    return codes[:len(a)], codes[len(a):], len(uniques)
+
+
+def _interval_index(timestamps: np.ndarray, intervals: int) -> np.ndarray:
+    """Bucket of each event when the trace is split into 'intervals' equal slices of its own duration."""
+    start, end = timestamps.min(), timestamps.max()
+    if end <= start:
+        return np.zeros(len(timestamps), dtype=np.int64)
+    index = np.floor((timestamps - start) / (end - start) * intervals).astype(np.int64)
+    return np.minimum(index, intervals - 1)
+
+
+def _inter_arrival_ms(timestamps: np.ndarray) -> np.ndarray:
+    return np.diff(np.sort(timestamps)) * 1000
+
+
+def _duration(timestamps: np.ndarray) -> float:
+    return float(timestamps.max() - timestamps.min())
+
+
+def _relative_errors(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    valid = reference > 0
+    return np.abs(candidate[valid] - reference[valid]) / reference[valid]
+
+
+def score_traces(reference: TraceColumns, candidate: TraceColumns, intervals: int = 20) -> Dict[str, Any]:
+    """
+    Scores how closely 'candidate' (a generated or received trace)
+    reproduces 'reference' (the input trace). 0 is a perfect match for
+    every distance. Time-dependent scores compare the two traces slice by
+    slice after splitting each into 'intervals' slices of its own duration
+    (as the heatmap generator does with percentage_interval), so traces of
+    different lengths can be compared; per-second throughput is compared
+    over the common length from the start of both traces.
+    """
+    if len(reference.timestamps) < 2 or len(candidate.timestamps) < 2:
+        raise ValueError("Both traces need at least two events to be scored.")
+    if intervals < 1:
+        raise ValueError(f"intervals must be at least 1: {intervals}")
+
+    # Inter-arrival distributions.
+    ref_gaps = _inter_arrival_ms(reference.timestamps)
+    cand_gaps = _inter_arrival_ms(candidate.timestamps)
+
+    # Op mix, overall and per interval (intervals x ops count matrices).
+    ref_ops, cand_ops, op_count = _joint_codes(reference.ops, candidate.ops)
+    ref_slices = _interval_index(reference.timestamps, intervals)
+    cand_slices = _interval_index(candidate.timestamps, intervals)
+    ref_mix = np.bincount(ref_slices * op_count + ref_ops, minlength=intervals * op_count).reshape(intervals, op_count)
+    cand_mix = np.bincount(cand_slices * op_count + cand_ops, minlength=intervals * op_count).reshape(intervals, op_count)
+    interval_js = js_divergence(ref_mix, cand_mix)
+    ref_interval_counts = ref_mix.sum(axis=1)
+    scored = ~np.isnan(interval_js)
+
+    # Key popularity: by key (same keys must be hot) and by rank (same skew).
+    ref_keys, cand_keys, key_count = _joint_codes(reference.targets, candidate.targets)
+    ref_popularity = np.bincount(ref_keys, minlength=key_count)
+    cand_popularity = np.bincount(cand_keys, minlength=key_count)
+    ref_ranked = np.sort(ref_popularity[ref_popularity > 0])[::-1]
+    cand_ranked = np.sort(cand_popularity[cand_popularity > 0])[::-1]
+    ranked_length = max(len(ref_ranked), len(cand_ranked))
+    ref_ranked = np.pad(ref_ranked, (0, ranked_length - len(ref_ranked)))
+    cand_ranked = np.pad(cand_ranked, (0, ranked_length - len(cand_ranked)))
+
+    # Throughput: overall, per interval (as a rate) and per second.
+    ref_duration = _duration(reference.timestamps)
+    cand_duration = _duration(candidate.timestamps)
+    ref_rate = len(reference.timestamps) / ref_duration if ref_duration > 0 else 0.0
+    cand_rate = len(candidate.timestamps) / cand_duration if cand_duration > 0 else 0.0
+    ref_interval_rates = ref_interval_counts / (ref_duration / intervals) if ref_duration > 0 else ref_interval_counts
+    cand_interval_rates = cand_mix.sum(axis=1) / (cand_duration / intervals) if cand_duration > 0 else cand_mix.sum(axis=1)
+    ref_seconds = np.bincount(np.floor(reference.timestamps - reference.timestamps.min()).astype(np.int64))
+    cand_seconds = np.bincount(np.floor(candidate.timestamps - candidate.timestamps.min()).astype(np.int64))
+    # The last common second may be partial on the shorter trace.
+    common_seconds = max(1, min(len(ref_seconds), len(cand_seconds)) - 1)
+    per_second_errors = _relative_errors(ref_seconds[:common_seconds], cand_seconds[:common_seconds])
+    interval_rate_errors = _relative_errors(ref_interval_rates, cand_interval_rates)
+
+    return {
+        "events": {"reference": int(len(reference.timestamps)), "candidate": int(len(candidate.timestamps))},
+        "inter_arrival": {
+            "ks": ks_statistic(ref_gaps, cand_gaps),
+            "wasserstein_ms": wasserstein_distance(ref_gaps, cand_gaps),
+        },
+        "op_mix": {
+            "intervals": intervals,
+            "js": float(js_divergence(ref_mix.sum(axis=0), cand_mix.sum(axis=0))),
+            "interval_js_mean": float(np.average(interval_js[scored], weights=ref_interval_counts[scored]))
+            if scored.any() and ref_interval_counts[scored].sum() else None,
+            "interval_js_max": float(interval_js[scored].max()) if scored.any() else None,
+            # Slices where exactly one of the traces has no events.
+            "unmatched_intervals": int(np.sum((ref_interval_counts > 0) != (cand_mix.sum(axis=1) > 0))),
+        },
+        "key_popularity": {
+            "js_by_key": float(js_divergence(ref_popularity, cand_popularity)),
+            "js_by_rank": float(js_divergence(ref_ranked, cand_ranked)),
+            "reference_keys": int(np.count_nonzero(ref_popularity)),
+            "candidate_keys": int(np.count_nonzero(cand_popularity)),
+        },
+        "throughput": {
+            "reference_ops_s": ref_rate,
+            "candidate_ops_s": cand_rate,
+            "relative_error": abs(cand_rate - ref_rate) / ref_rate if ref_rate else None,
+            "interval_rate_mape": float(interval_rate_errors.mean()) if len(interval_rate_errors) else None,
+            "per_second_mape": float(per_second_errors.mean()) if len(per_second_errors) else None,
+            "compared_seconds": int(common_seconds),
+        },
+    }
+
+
+def flatten_scores(scores: Dict[str, Any], prefix: str = '') -> Dict[str, Any]:
+    """{'inter_arrival': {'ks': x}} -> {'inter_arrival.ks': x}."""
+    flat: Dict[str, Any] = {}
+    for key, value in scores.items():
+        if isinstance(value, dict):
+            flat.update(flatten_scores(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def check_thresholds(scores: Dict[str, Any], thresholds: Dict[str, float]) -> List[str]:
+    """
+    Returns a message for every flattened score above its threshold
+    ({'inter_arrival.ks': 0.05, ...}); an empty list means the gate passes.
+    Unknown or missing scores are reported as failures too.
+    """
+    flat = flatten_scores(scores)
+    failures = []
+    for name, limit in thresholds.items():
+        value = flat.get(name)
+        if value is None:
+            failures.append(f"{name}: no such score")
+        elif value > limit:
+            failures.append(f"{name}: {value:.6g} > {limit:g}")
+    return failures
+
+
+def _parse_thresholds(values: Sequence[str]) -> Dict[str, float]:
+    thresholds = {}
+    for value in values:
+        name, _, limit = value.partition('=')
+        if not limit:
+            raise ValueError(f"Thresholds are given as <score>=<max>, not '{value}'.")
+        thresholds[name] = float(limit)
+    return thresholds
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from ..config_loader import load_config
+    from ..models.event_batch import EventBatch
+    from ..parsers.factory import ParserFactory
+
+    arg_parser = argparse.ArgumentParser(description="Score how closely traces reproduce a reference trace.")
+    arg_parser.add_argument('reference', help="Reference (input) trace.")
+    arg_parser.add_argument('candidates', nargs='+', help="Generated and/or received traces to score.")
+    arg_parser.add_argument('--config', default='config.yaml', help="Config whose components.parser reads the traces.")
+    arg_parser.add_argument('--intervals', type=int, default=20, help="Time slices for per-interval scores (100 / percentage_interval).")
+    arg_parser.add_argument('--output', default=None, help="Write the scores as JSON to this file (default: stdout).")
+    arg_parser.add_argument('--max', action='append', default=[], metavar='SCORE=VALUE',
+                            help="Fail (exit code 1) if a score, e.g. inter_arrival.ks, is above VALUE. Repeatable.")
+    args = arg_parser.parse_args(argv)
+
+    config = load_config(args.config)
+    parser = ParserFactory().create_parser(config.get('components', {}).get('parser', {}))
+    thresholds = _parse_thresholds(args.max)
+
+    def load(path: str) -> TraceColumns:
+        return columns_from_batch(EventBatch.concat(parser.parse_batches(path)))
+
+    reference = load(args.reference)
+    results: Dict[str, Any] = {"reference": args.reference, "intervals": args.intervals, "candidates": {}}
+    failed = False
+    for path in args.candidates:
+        scores = score_traces(reference, load(path), args.intervals)
+        failures = check_thresholds(scores, thresholds)
+        if failures:
+            failed = True
+            for failure in failures:
+                print(f"[FAIL] {path}: {failure}", file=sys.stderr)
+        results["candidates"][path] = {"scores": scores, "failures": failures}
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        print(f"Fidelity scores saved to '{args.output}'.")
+    else:
+        print(output)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
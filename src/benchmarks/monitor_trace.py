@@ -0,0 +1,121 @@
+import argparse
+import random
+from itertools import accumulate
+from typing import Iterator, List, NamedTuple, Optional
+
+# Op mix of the generated trace: (op, weight). Mirrors the ops RedisParser
+# knows the semantics of, so every stage of the pipeline sees all of them.
+_OP_WEIGHTS = [
+    ("GET", 40),
+    ("SET", 25),
+    ("HGETALL", 10),
+    ("HMSET", 10),
+    ("ZADD", 10),
+    ("DEL", 5),
+]
+_PAYLOAD_ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+# One value in this many carries MONITOR escapes (\" and \\), so the escape
+# paths of the parser and formatter are exercised too.
+_ESCAPED_VALUE_EVERY = 50
+
+
+class TraceSpec(NamedTuple):
+    """Shape of a synthetic MONITOR trace. The same spec always gives the same file."""
+    lines: int = 200000
+    keys: int = 10000
+    payload_bytes: int = 64
+    clients: int = 8
+    ops_per_second: float = 10000.0
+    zipf_s: float = 1.0
+    seed: int = 42
+
+
+def _payload_pool(rng: random.Random, payload_bytes: int, size: int = 1024) -> List[str]:
+    """Pre-built values, cycled through, so generating a line costs no per-byte work."""
+    pool = []
+    for i in range(size):
+        value = ''.join(rng.choices(_PAYLOAD_ALPHABET, k=max(1, payload_bytes)))
+        if i % _ESCAPED_VALUE_EVERY == 0 and len(value) > 4:
+            value = value[:2] + '\\"' + value[4:-2] + '\\\\'
+        pool.append(value)
+    return pool
+
+
+def iter_monitor_lines(spec: TraceSpec) -> Iterator[str]:
+    """
+    Yields the lines of a deterministic Redis MONITOR trace: Poisson
+    arrivals at spec.ops_per_second, keys drawn from a Zipf(spec.zipf_s)
+    popularity over spec.keys keys, and values of spec.payload_bytes bytes.
+    """
+    rng = random.Random(spec.seed)
+    ops = [op for op, _ in _OP_WEIGHTS]
+    op_cum_weights = list(accumulate(weight for _, weight in _OP_WEIGHTS))
+    key_cum_weights = list(accumulate(1.0 / (rank ** spec.zipf_s) for rank in range(1, spec.keys + 1)))
+    # Popularity is decoupled from the key name, as in a real key space.
+    key_names = [f"key:{i}" for i in range(spec.keys)]
+    rng.shuffle(key_names)
+    clients = [f"0 127.0.0.1:{5000 + i}" for i in range(spec.clients)]
+    payloads = _payload_pool(rng, spec.payload_bytes)
+
+    timestamp = 1700000000.0
+    block = 10000
+    for start in range(0, spec.lines, block):
+        count = min(block, spec.lines - start)
+        block_ops = rng.choices(ops, cum_weights=op_cum_weights, k=count)
+        block_keys = rng.choices(key_names, cum_weights=key_cum_weights, k=count)
+        block_clients = rng.choices(clients, k=count)
+        for i in range(count):
+            timestamp += rng.expovariate(spec.ops_per_second)
+            op = block_ops[i]
+            key = block_keys[i]
+            payload = payloads[(start + i) % len(payloads)]
+            if op == "SET":
+                command = f'"SET" "{key}" "{payload}"'
+            elif op == "HMSET":
+                command = f'"HMSET" "{key}" "field0" "{payload}" "field1" "{payload[:8]}"'
+            elif op == "ZADD":
+                command = f'"ZADD" "{key}" "{(start + i) % 100}.5" "member:{(start + i) % 997}"'
+            else:
+                command = f'"{op}" "{key}"'
+            yield f"{timestamp:.6f} [{block_clients[i]}] {command}"
+
+
+def write_monitor_trace(spec: TraceSpec, path: str, batch_size: int = 10000) -> int:
+    """Writes the trace of 'spec' to 'path'. Returns the line count."""
+    count = 0
+    batch = []
+    with open(path, 'w', encoding='utf-8', buffering=8 * 1024 * 1024) as f:
+        for line in iter_monitor_lines(spec):
+            batch.append(line)
+            if len(batch) >= batch_size:
+                f.write('\n'.join(batch) + '\n')
+                count += len(batch)
+                batch.clear()
+        if batch:
+            f.write('\n'.join(batch) + '\n')
+            count += len(batch)
+    return count
+
+
+def main(argv: Optional[List[str]] = None):
+    defaults = TraceSpec()
+    arg_parser = argparse.ArgumentParser(description="Write a deterministic synthetic Redis MONITOR trace.")
+    arg_parser.add_argument('output')
+    arg_parser.add_argument('--lines', type=int, default=defaults.lines)
+    arg_parser.add_argument('--keys', type=int, default=defaults.keys, help="Key cardinality.")
+    arg_parser.add_argument('--payload-bytes', type=int, default=defaults.payload_bytes)
+    arg_parser.add_argument('--clients', type=int, default=defaults.clients)
+    arg_parser.add_argument('--ops-per-second', type=float, default=defaults.ops_per_second)
+    arg_parser.add_argument('--zipf-s', type=float, default=defaults.zipf_s, help="Key popularity skew (0 = uniform).")
+    arg_parser.add_argument('--seed', type=int, default=defaults.seed)
+    args = arg_parser.parse_args(argv)
+
+    spec = TraceSpec(
+        args.lines, args.keys, args.payload_bytes, args.clients, args.ops_per_second, args.zipf_s, args.seed
+    )
+    count = write_monitor_trace(spec, args.output)
+    print(f"Wrote {count} lines to '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
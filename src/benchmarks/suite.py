@@ -0,0 +1,284 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from ..models.event_batch import EventBatch
+from ..parsers.redis.redis_parser import RedisParser
+from ..generators.heatmap.heatmap_generator import HeatmapGenerator
+from .monitor_trace import TraceSpec, write_monitor_trace
+
+DEFAULT_BASELINE_FILE = "logs/benchmarks/baseline.json"
+
+
+class Stage(NamedTuple):
+    """
+    A benchmarked stage: 'run' does the work once and returns the number of
+    events it handled; 'setup' builds its inputs before anything is measured.
+    """
+    name: str
+    run: Callable[[], int]
+    setup: Optional[Callable[[], Any]] = None
+
+
+class BenchmarkContext:
+    """
+    Inputs shared by the stages. Each one is built lazily, outside of any
+    measurement, by the setup of the first stage that needs it (e.g. the
+    synthesis stages reuse the model characterized once from the parsed
+    events).
+    """
+
+    def __init__(self, trace_file: str, timestamp_granularity: int, percentage_interval: float, simulation_duration_s: int, seed: int):
+        self.trace_file = trace_file
+        self.parser = RedisParser(timestamp_granularity)
+        self.percentage_interval = percentage_interval
+        self.simulation_duration_s = simulation_duration_s
+        self.seed = seed
+        self._cache: Dict[str, Any] = {}
+
+    def generator(self, engine: str = 'python') -> HeatmapGenerator:
+        return HeatmapGenerator(
+            self.parser,
+            percentage_interval=self.percentage_interval,
+            simulation_duration_s=self.simulation_duration_s,
+            time_expansion_strategy='stretch',
+            seed=self.seed,
+            synthesis_engine=engine,
+        )
+
+    def _cached(self, name: str, build: Callable[[], Any]) -> Any:
+        if name not in self._cache:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self._cache[name] = build()
+        return self._cache[name]
+
+    def events(self) -> list:
+        return self._cached('events', lambda: list(self.parser.parse(self.trace_file)))
+
+    def command_strings(self) -> List[str]:
+        def build():
+            with open(self.trace_file, 'r', encoding='utf-8') as f:
+                matches = [RedisParser._LOG_LINE_REGEX.match(line.strip()) for line in f]
+            return [match.group(3) for match in matches if match]
+        return self._cached('command_strings', build)
+
+    def model(self) -> Dict[str, Any]:
+        return self._cached('model', lambda: self.generator()._characterize(list(self.events())))
+
+    def synthetic_events(self) -> list:
+        return self._cached('synthetic_events', lambda: self.generator()._synthesize(self.model()))
+
+
+def build_stages(context: BenchmarkContext) -> List[Stage]:
+    parser = context.parser
+
+    def parse() -> int:
+        return len(list(parser.parse(context.trace_file)))
+
+    def parse_batches() -> int:
+        return len(EventBatch.concat(parser.parse_batches(context.trace_file)))
+
+    def parse_command_args() -> int:
+        commands = context.command_strings()
+        parse_args = parser._parse_command_args
+        for command in commands:
+            parse_args(command)
+        return len(commands)
+
+    def characterize() -> int:
+        # _characterize sorts its input in place, so it gets a fresh list.
+        events = list(context.events())
+        context.generator()._characterize(events)
+        return len(events)
+
+    def synthesize(engine: str) -> Callable[[], int]:
+        # Consumed as a stream, like the writer does: holding every event in
+        # a list makes the cyclic GC rescan them all, which dominates the
+        # timing and hides the engine's own cost.
+        def run() -> int:
+            return sum(1 for _ in context.generator(engine)._iter_synthesize(context.model()))
+        return run
+
+    def format_events() -> int:
+        events = context.synthetic_events()
+        for event in events:
+            parser.format(event)
+        return len(events)
+
+    return [
+        Stage('parse', parse),
+        Stage('parse_batches', parse_batches),
+        Stage('parse_command_args', parse_command_args, context.command_strings),
+        Stage('characterize', characterize, context.events),
+        Stage('synthesize_python', synthesize('python'), context.model),
+        Stage('synthesize_numpy', synthesize('numpy'), context.model),
+        Stage('format', format_events, context.synthetic_events),
+    ]
+
+
+def measure(stage: Stage, repeat: int) -> Dict[str, Any]:
+    """
+    Times 'repeat' runs of the stage and keeps the fastest, then runs it
+    once more under tracemalloc for its peak memory (tracing slows Python
+    down, so the two are never measured together). The peak counts the
+    Python and NumPy allocations made during the stage, not what was
+    already allocated before it.
+    """
+    timings = []
+    events = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        if stage.setup is not None:
+            stage.setup()
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            events = stage.run()
+            timings.append(time.perf_counter() - start)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            stage.run()
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        "events": events,
+        "seconds": best,
+        "events_per_s": events / best if best > 0 else 0.0,
+        "peak_bytes": peak_bytes,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float, memory_tolerance: float) -> List[str]:
+    """Lists the stages that got slower (or used more memory) than the baseline allows."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline["stages"].get(name)
+        if reference is None:
+            continue
+        if result["events_per_s"] < reference["events_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {result['events_per_s']:,.0f} events/s vs. baseline {reference['events_per_s']:,.0f} "
+                f"({result['events_per_s'] / reference['events_per_s'] - 1:+.1%})"
+            )
+        if result["peak_bytes"] > reference["peak_bytes"] * (1 + memory_tolerance):
+            regressions.append(
+                f"{name}: peak {result['peak_bytes'] / 2**20:.1f} MiB vs. baseline {reference['peak_bytes'] / 2**20:.1f} MiB "
+                f"({result['peak_bytes'] / reference['peak_bytes'] - 1:+.1%})"
+            )
+    return regressions
+
+
+def _machine() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _print_results(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]]):
+    print(f"{'stage':<20} {'events':>10} {'seconds':>9} {'events/s':>12} {'peak MiB':>9} {'vs. base':>9}")
+    for name, result in results.items():
+        reference = baseline["stages"].get(name) if baseline else None
+        change = f"{result['events_per_s'] / reference['events_per_s'] - 1:+.1%}" if reference else "-"
+        print(
+            f"{name:<20} {result['events']:>10} {result['seconds']:>9.3f} "
+            f"{result['events_per_s']:>12,.0f} {result['peak_bytes'] / 2**20:>9.1f} {change:>9}"
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    defaults = TraceSpec()
+    arg_parser = argparse.ArgumentParser(
+        description="Benchmark the parse, characterization, synthesis and formatting stages on a synthetic MONITOR trace."
+    )
+    arg_parser.add_argument('--lines', type=int, default=defaults.lines)
+    arg_parser.add_argument('--keys', type=int, default=defaults.keys, help="Key cardinality.")
+    arg_parser.add_argument('--payload-bytes', type=int, default=defaults.payload_bytes)
+    arg_parser.add_argument('--clients', type=int, default=defaults.clients)
+    arg_parser.add_argument('--seed', type=int, default=defaults.seed)
+    arg_parser.add_argument('--percentage-interval', type=float, default=1.0)
+    arg_parser.add_argument('--duration', type=int, default=None,
+                            help="Synthesized seconds (default: the trace's own length, so synthesis emits about --lines events).")
+    arg_parser.add_argument('--stages', nargs='+', default=None, help="Only run these stages.")
+    arg_parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage; the fastest is kept.")
+    arg_parser.add_argument('--baseline', default=DEFAULT_BASELINE_FILE)
+    arg_parser.add_argument('--save-baseline', action='store_true', help="Store this run as the baseline.")
+    arg_parser.add_argument('--tolerance', type=float, default=0.15, help="Allowed events/s drop before a stage is flagged.")
+    arg_parser.add_argument('--memory-tolerance', type=float, default=0.25, help="Allowed peak memory growth before a stage is flagged.")
+    arg_parser.add_argument('--output', default=None, help="Also write the results as JSON.")
+    args = arg_parser.parse_args(argv)
+
+    spec = TraceSpec(lines=args.lines, keys=args.keys, payload_bytes=args.payload_bytes, clients=args.clients, seed=args.seed)
+    duration = args.duration or max(1, round(spec.lines / spec.ops_per_second))
+    params = dict(spec._asdict(), percentage_interval=args.percentage_interval, duration=duration)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        trace_file = os.path.join(workdir, "trace.log")
+        print(f"Writing a synthetic trace of {spec.lines} lines ({spec.keys} keys, {spec.payload_bytes}-byte values)...")
+        write_monitor_trace(spec, trace_file)
+
+        context = BenchmarkContext(trace_file, 6, args.percentage_interval, duration, spec.seed)
+        stages = build_stages(context)
+        if args.stages:
+            unknown = set(args.stages) - {stage.name for stage in stages}
+            if unknown:
+                raise ValueError(f"Unknown stages {sorted(unknown)}; available: {[stage.name for stage in stages]}")
+            stages = [stage for stage in stages if stage.name in args.stages]
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for stage in stages:
+            print(f"Benchmarking '{stage.name}'...")
+            results[stage.name] = measure(stage, args.repeat)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print(f"[WARN] Baseline '{args.baseline}' was recorded with different parameters; not comparing.", file=sys.stderr)
+            baseline = None
+
+    print()
+    _print_results(results, baseline)
+    report = {"machine": _machine(), "params": params, "stages": results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to '{args.baseline}'.")
+        return
+
+    if baseline is None:
+        print("\nNo baseline to compare against (run with --save-baseline to store one).")
+        return
+    if baseline.get("machine") != report["machine"]:
+        print("[WARN] The baseline was recorded on a different machine or Python version.", file=sys.stderr)
+    regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+from typing import Any, Dict
+from .interfaces import IExecutor
+
+
+class ExecutorFactory:
+    """
+    Factory responsible for creating Executor instances.
+    """
+    def create_executor(self, config: Dict[str, Any]) -> IExecutor:
+        executor_type = config.get('type')
+
+        if executor_type == 'redis':
+            from .redis.redis_executor import RedisExecutor
+
+            host = config.get('host', '127.0.0.1')
+            port = config.get('port', 6379)
+            max_workers = config.get('max_workers', 10)
+            pipeline_depth = config.get('pipeline_depth', 1)
+            connect_timeout_s = config.get('connect_timeout_s', 1.0)
+            return RedisExecutor(
+                host=host,
+                port=port,
+                max_connections=max_workers,
+                pipeline_depth=pipeline_depth,
+                connect_timeout_s=connect_timeout_s
+            )
+
+        raise ValueError(f"Executor of type '{executor_type}' is not supported.")
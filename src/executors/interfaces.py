@@ -0,0 +1,34 @@
+from abc import ABC, abstractmethod
+from typing import Iterable, NamedTuple, Optional
+from ..models.fei import FEIEvent
+
+
+class ExecutionSummary(NamedTuple):
+    """Outcome of replaying a trace against a live system."""
+    attempted: int
+    succeeded: int
+    failed: int
+    duration_s: float
+    # Latencies are measured from each event's scheduled time, so they
+    # include any queueing behind earlier requests (open-loop replay).
+    latency_p50_ms: Optional[float]
+    latency_p99_ms: Optional[float]
+    latency_max_ms: Optional[float]
+    # Largest delay between an event's scheduled time and its dispatch,
+    # i.e. how far the replay fell behind the trace.
+    max_dispatch_lag_ms: float
+
+
+class IExecutor(ABC):
+    """
+    Interface for strategies that replay FEI events against a live system,
+    issuing each one at its (relative) trace timestamp.
+    """
+
+    @abstractmethod
+    def execute(self, events: Iterable[FEIEvent]) -> ExecutionSummary:
+        """
+        Replays 'events' (in timestamp order) and returns a summary. Any
+        iterable works: a parsed trace file or a generator's event stream.
+        """
+        pass
@@ -0,0 +1,208 @@
+import asyncio
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from ...models.fei import FEIEvent
+from ..interfaces import ExecutionSummary, IExecutor
+from .resp import RespError, encode_command, read_reply
+
+# A queued request: (scheduled loop time, encoded command).
+_Request = Tuple[float, bytes]
+
+
+class _Connection:
+    """
+    One server connection and the requests routed to it. Requests are sent
+    as soon as they are queued; with pipeline_depth > 1, everything queued
+    (up to the depth) goes out in a single write before the replies are read.
+    """
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        pipeline_depth: int,
+        stats: '_ReplayStats'
+    ):
+        self.reader = reader
+        self.writer = writer
+        self.pipeline_depth = pipeline_depth
+        self.stats = stats
+        self.queue: 'asyncio.Queue[Optional[_Request]]' = asyncio.Queue()
+        self.lost = False
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            request = await self.queue.get()
+            if request is None:
+                break
+            batch: List[_Request] = [request]
+            while len(batch) < self.pipeline_depth and not self.queue.empty():
+                request = self.queue.get_nowait()
+                if request is None:
+                    closing = True
+                    break
+                batch.append(request)
+
+            self.writer.write(b''.join([command for _, command in batch]))
+            try:
+                await self.writer.drain()
+                for scheduled, _ in batch:
+                    reply = await read_reply(self.reader)
+                    self.stats.record(scheduled, loop.time(), not isinstance(reply, RespError))
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                print(f"[WARN] Connection lost with {len(batch)} requests in flight: {e}", file=sys.stderr)
+                self.lost = True
+                self.stats.failed += len(batch) + self._drop_queued()
+                self.writer.close()
+                return
+
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    def _drop_queued(self) -> int:
+        dropped = 0
+        while not self.queue.empty():
+            if self.queue.get_nowait() is not None:
+                dropped += 1
+        return dropped
+
+
+class _ReplayStats:
+    def __init__(self):
+        self.succeeded = 0
+        self.failed = 0
+        self.latencies_s = array('d')
+        self.max_dispatch_lag_s = 0.0
+
+    def record(self, scheduled: float, completed: float, success: bool):
+        self.latencies_s.append(completed - scheduled)
+        if success:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+
+class RedisExecutor(IExecutor):
+    """
+    Replays FEI events against a Redis server over raw RESP with asyncio.
+
+    Scheduling is open-loop: each event is released at its trace timestamp
+    (relative to the first event) whether or not earlier requests have been
+    answered. Every distinct client_id gets its own connection, as in the
+    captured trace, up to max_connections; beyond that client ids share
+    connections round-robin in order of first appearance. Requests of one
+    client stay in order on its connection.
+    """
+    # Events dispatched back-to-back before yielding to the connections
+    # when the dispatcher is behind schedule.
+    _DISPATCH_YIELD_EVERY = 256
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 6379,
+        max_connections: int = 10,
+        pipeline_depth: int = 1,
+        connect_timeout_s: float = 1.0
+    ):
+        if max_connections < 1:
+            raise ValueError(f"max_connections must be at least 1: {max_connections}")
+        if pipeline_depth < 1:
+            raise ValueError(f"pipeline_depth must be at least 1: {pipeline_depth}")
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        # Maximum requests written to a connection before reading replies.
+        self.pipeline_depth = pipeline_depth
+        self.connect_timeout_s = connect_timeout_s
+
+    def execute(self, events: Iterable[FEIEvent]) -> ExecutionSummary:
+        print(f"Replaying events against Redis at {self.host}:{self.port} "
+              f"(max {self.max_connections} connections, pipeline depth {self.pipeline_depth})...")
+        return asyncio.run(self.execute_async(events))
+
+    async def execute_async(self, events: Iterable[FEIEvent]) -> ExecutionSummary:
+        """Coroutine form of execute(), for callers already inside an event loop."""
+        loop = asyncio.get_running_loop()
+        stats = _ReplayStats()
+        connections: List[_Connection] = []
+        tasks: List[asyncio.Task] = []
+        connection_of: Dict[str, _Connection] = {}
+
+        start = loop.time()
+        first_timestamp: Optional[float] = None
+        attempted = 0
+        try:
+            for event in events:
+                if first_timestamp is None:
+                    first_timestamp = event['timestamp']
+                scheduled = start + (event['timestamp'] - first_timestamp)
+
+                delay = scheduled - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    stats.max_dispatch_lag_s = max(stats.max_dispatch_lag_s, -delay)
+                    if attempted % self._DISPATCH_YIELD_EVERY == 0:
+                        await asyncio.sleep(0)
+
+                client_id = event['client_id']
+                connection = connection_of.get(client_id)
+                if connection is None:
+                    if len(connections) < self.max_connections:
+                        connection = await self._connect(stats)
+                        connections.append(connection)
+                        tasks.append(asyncio.create_task(connection.run()))
+                    else:
+                        connection = connections[len(connection_of) % self.max_connections]
+                    connection_of[client_id] = connection
+
+                attempted += 1
+                if connection.lost:
+                    stats.failed += 1
+                    continue
+                connection.queue.put_nowait((scheduled, self._encode(event)))
+        finally:
+            for connection in connections:
+                connection.queue.put_nowait(None)
+            if tasks:
+                await asyncio.gather(*tasks)
+
+        return self._summarize(stats, attempted, loop.time() - start)
+
+    async def _connect(self, stats: _ReplayStats) -> _Connection:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), timeout=self.connect_timeout_s
+        )
+        return _Connection(reader, writer, self.pipeline_depth, stats)
+
+    @staticmethod
+    def _encode(event: FEIEvent) -> bytes:
+        raw_args = event['additional_data'].get('raw_args', [])
+        return encode_command([event['op_type'], event['target'], *raw_args])
+
+    @staticmethod
+    def _summarize(stats: _ReplayStats, attempted: int, duration_s: float) -> ExecutionSummary:
+        latencies = sorted(stats.latencies_s)
+
+        def percentile(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+        return ExecutionSummary(
+            attempted=attempted,
+            succeeded=stats.succeeded,
+            failed=stats.failed,
+            duration_s=duration_s,
+            latency_p50_ms=percentile(0.50),
+            latency_p99_ms=percentile(0.99),
+            latency_max_ms=latencies[-1] * 1000 if latencies else None,
+            max_dispatch_lag_ms=stats.max_dispatch_lag_s * 1000,
+        )
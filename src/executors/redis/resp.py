@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Iterable, List, Union
+
+
+class RespError(Exception):
+    """An error reply ('-ERR ...') returned by the server."""
+
+
+def encode_command(args: Iterable[Union[str, bytes]]) -> bytes:
+    """Encodes one command as a RESP array of bulk strings."""
+    parts: List[bytes] = []
+    count = 0
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode('utf-8', errors='surrogateescape')
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        count += 1
+    return b'*%d\r\n' % count + b''.join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """
+    Reads one RESP2 reply. Error replies are returned as RespError
+    instances (not raised), so a pipelined batch can be read to the end.
+    """
+    line = await reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError("Connection closed while reading a reply.")
+    kind, payload = line[:1], line[1:-2]
+
+    if kind == b'+':
+        return payload
+    if kind == b'-':
+        return RespError(payload.decode('utf-8', errors='replace'))
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b'*':
+        count = int(payload)
+        if count < 0:
+            return None
+        return [await read_reply(reader) for _ in range(count)]
+    raise ConnectionError(f"Unexpected RESP reply type: {line!r}")
@@ -25,12 +25,30 @@ class GeneratorFactory:
             interval = config.get('percentage_interval', 5)
             simulation_duration_s = config.get('simulation_duration_s', 30)
             time_expansion_strategy = config.get('time_expansion_strategy', 'cyclic')
+            reorder_buffer_size = config.get('reorder_buffer_size', 10000)
+            characterization_workers = config.get('characterization_workers', 1)
+            characterization_chunk_bytes = config.get('characterization_chunk_bytes', 32 * 1024 * 1024)
+            model_output_file = config.get('model_output_file')
+            synthesis_workers = config.get('synthesis_workers', 1)
+            seed = config.get('seed')
+            synthesis_engine = config.get('synthesis_engine', 'python')
+            synthesis_sampling = config.get('synthesis_sampling', 'rejection')
+            throughput_report_file = config.get('throughput_report_file')
 
             return HeatmapGenerator(
                 parser=parser,
                 percentage_interval=interval,
                 simulation_duration_s=simulation_duration_s,
-                time_expansion_strategy=time_expansion_strategy 
+                time_expansion_strategy=time_expansion_strategy,
+                reorder_buffer_size=reorder_buffer_size,
+                characterization_workers=characterization_workers,
+                characterization_chunk_bytes=characterization_chunk_bytes,
+                model_output_file=model_output_file,
+                synthesis_workers=synthesis_workers,
+                seed=seed,
+                synthesis_engine=synthesis_engine,
+                synthesis_sampling=synthesis_sampling,
+                throughput_report_file=throughput_report_file
             )
         else:
             raise ValueError(f"Generator type '{generator_type}' is not supported.")
\ No newline at end of file
@@ -0,0 +1,153 @@
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from .sampling import AliasSampler
+from .timebase import ms_to_micros
+
+
+class OpSemantics(NamedTuple):
+    """Pool rule flags of an operation, derived from its semantic_type list."""
+    semantic_type: List[str]
+    is_create_update: bool
+    is_read: bool
+    is_delete: bool
+
+
+class CompiledInterval(NamedTuple):
+    """
+    Ready-to-draw samplers for one heatmap interval. 'target_masses' holds,
+    per op, the probability that its target falls in the compiled key
+    partition (always 1.0 without partitioning); the target sampler of an
+    op with zero mass is None. The underlying op and target probabilities
+    are kept for conditioned draws, and 'mean_delta_us' for rate reports.
+    """
+    index: int
+    op_sampler: AliasSampler
+    target_samplers: Dict[str, Optional[AliasSampler]]
+    target_masses: Dict[str, float]
+    delta_us_sampler: AliasSampler
+    op_distribution: Dict[str, float]
+    target_distributions: Dict[str, Dict[str, float]]
+    mean_delta_us: float
+
+
+def key_partition(target: str, partition_count: int) -> int:
+    """Stable (process-independent) key partition of a target."""
+    return zlib.crc32(target.encode('utf-8', errors='surrogateescape')) % partition_count
+
+
+class CompiledModel:
+    """
+    Sampling-ready form of a characterization model. Every per-interval
+    distribution becomes an AliasSampler, and the fallback interval of each
+    bucket (the nearest earlier interval with data) is resolved up front, so
+    synthesis draws are O(1) with no per-event allocation.
+
+    With partition_count > 1 only the targets of key partition 'partition'
+    are kept, renormalized, alongside the mass they represent.
+    """
+
+    def __init__(
+        self,
+        model: Dict[str, Any],
+        last_index: int,
+        partition: int = 0,
+        partition_count: int = 1
+    ):
+        if not (0 <= partition < partition_count):
+            raise ValueError(f"partition must be in [0, {partition_count}): {partition}")
+        self.partition = partition
+        self.partition_count = partition_count
+        self._partition_cache: Dict[str, int] = {}
+        heatmap = model['heatmap']
+        target_probs = model['target_probabilities_by_op']
+        delta_probs = model['inter_arrival_probabilities']
+
+        self.op_semantics: Dict[str, OpSemantics] = {
+            op: OpSemantics(
+                semantic_type=semantics,
+                is_create_update="CREATE" in semantics and "UPDATE" in semantics,
+                is_read="READ" in semantics,
+                is_delete="DELETE" in semantics,
+            )
+            for op, semantics in model['op_semantics'].items()
+        }
+        self.client_ids: List[str] = list(model['client_ids'])
+
+        self.intervals: List[Optional[CompiledInterval]] = []
+        if not heatmap:
+            return
+
+        first_valid_interval = min(heatmap)
+        last_index = max(last_index, max(heatmap))
+
+        # Walk the buckets in order, carrying the latest distribution seen for
+        # each op and for the deltas; that is exactly the backward-scan fallback.
+        latest_targets: Dict[str, Tuple[float, Optional[AliasSampler], Dict[str, float]]] = {}
+        latest_delta: Optional[AliasSampler] = None
+        latest_mean_delta_us = self._mean_delta_us(delta_probs.get(first_valid_interval, {}))
+        compiled_by_index: Dict[int, CompiledInterval] = {}
+        resolved: Optional[CompiledInterval] = None
+
+        for index in range(last_index + 1):
+            for op_type, dist in target_probs.get(index, {}).items():
+                if dist:
+                    latest_targets[op_type] = self._target_sampler(dist)
+            delta_dist = delta_probs.get(index)
+            if delta_dist:
+                latest_delta = self._delta_sampler(delta_dist)
+                latest_mean_delta_us = self._mean_delta_us(delta_dist)
+
+            if index in heatmap:
+                action_dist = heatmap[index]
+                resolved = CompiledInterval(
+                    index=index,
+                    op_sampler=AliasSampler(list(action_dist.keys()), list(action_dist.values())),
+                    target_samplers={op: sampler for op, (_, sampler, _) in latest_targets.items()},
+                    target_masses={op: mass for op, (mass, _, _) in latest_targets.items()},
+                    delta_us_sampler=(
+                        latest_delta if latest_delta is not None
+                        else self._delta_sampler(delta_probs[first_valid_interval])
+                    ),
+                    op_distribution=action_dist,
+                    target_distributions={op: dist for op, (_, _, dist) in latest_targets.items()},
+                    mean_delta_us=latest_mean_delta_us,
+                )
+                compiled_by_index[index] = resolved
+            self.intervals.append(resolved)
+
+        # Buckets before the first valid interval fall forward onto it.
+        first = compiled_by_index[first_valid_interval]
+        self.intervals = [interval or first for interval in self.intervals]
+
+    def _target_sampler(self, dist: Dict[str, float]) -> Tuple[float, Optional[AliasSampler], Dict[str, float]]:
+        if self.partition_count == 1:
+            return 1.0, AliasSampler(list(dist.keys()), list(dist.values())), dist
+
+        cache = self._partition_cache
+        targets, weights = [], []
+        for target, probability in dist.items():
+            partition = cache.get(target)
+            if partition is None:
+                partition = cache[target] = key_partition(target, self.partition_count)
+            if partition == self.partition:
+                targets.append(target)
+                weights.append(probability)
+
+        mass = sum(weights) / sum(dist.values())
+        if not targets or mass <= 0:
+            return 0.0, None, {}
+        return mass, AliasSampler(targets, weights), dict(zip(targets, weights))
+
+    @staticmethod
+    def _delta_sampler(delta_dist: Dict[float, float]) -> AliasSampler:
+        return AliasSampler([ms_to_micros(d) for d in delta_dist], list(delta_dist.values()))
+
+    @staticmethod
+    def _mean_delta_us(delta_dist: Dict[float, float]) -> float:
+        total = sum(delta_dist.values())
+        if total <= 0:
+            return 0.0
+        return sum(ms_to_micros(d) * p for d, p in delta_dist.items()) / total
+
+    def __bool__(self) -> bool:
+        return bool(self.intervals)
@@ -1,10 +1,29 @@
+import heapq
+import json
+import multiprocessing
 import random
-from collections import Counter, defaultdict
-from typing import Any, Dict, List, Set
-from decimal import Decimal, getcontext
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from ..interfaces import IGenerator
+from ...models.event_batch import EventBatch
 from ...models.fei import FEIEvent
+from ...models.resource_pool import ResourcePool
+from ...parsers.chunking import split_newline_aligned
 from ...parsers.interfaces import IParser
+from .compiled_model import CompiledInterval, CompiledModel, OpSemantics
+from .model_store import load_model, save_model
+from .partial_model import PartialModel
+from .synthesis_stats import SynthesisStats
+from .timebase import (
+    SYNTHESIS_MAX_PERCENTAGE,
+    PercentageBuckets,
+    micros_to_seconds,
+    ms_to_micros,
+    seconds_to_micros,
+)
 
 
 class HeatmapGenerator(IGenerator):
@@ -13,220 +32,625 @@ class HeatmapGenerator(IGenerator):
     aprendendo padrões localizados para frequência de operações, popularidade de
     recursos por comando, e ritmo de chegada para cada intervalo.
     """
+    # Event batches buffered per synthesis worker before it blocks.
+    _SYNTHESIS_QUEUE_BATCHES = 8
+    # Plain target draws tried before a conditioned draw scans for live targets.
+    _CONDITIONED_TARGET_TRIES = 8
+    # Consecutive rejected draws after which the clock is moved on anyway;
+    # otherwise an interval whose ops can never apply would spin forever.
+    _MAX_CONSECUTIVE_REJECTIONS = 1000
+
     def __init__(
         self,
         parser: IParser,
         percentage_interval: float = 5.0,
         simulation_duration_s: int = 30,
-        time_expansion_strategy: str = 'cyclic'
+        time_expansion_strategy: str = 'cyclic',
+        reorder_buffer_size: int = 10000,
+        characterization_workers: int = 1,
+        characterization_chunk_bytes: int = 32 * 1024 * 1024,
+        model_output_file: Optional[str] = None,
+        synthesis_workers: int = 1,
+        seed: Optional[int] = None,
+        synthesis_engine: str = 'python',
+        synthesis_sampling: str = 'rejection',
+        throughput_report_file: Optional[str] = None
     ):
         if not (0 < percentage_interval <= 100):
             raise ValueError(f"The interval must be between 0 and 100.: {percentage_interval}")
         if time_expansion_strategy not in ['cyclic', 'stretch']:
             raise ValueError(f"time_expansion_strategy must be 'cyclic' or 'stretch', not '{time_expansion_strategy}'")
+        if reorder_buffer_size < 0:
+            raise ValueError(f"reorder_buffer_size must be non-negative: {reorder_buffer_size}")
+        if characterization_workers < 1:
+            raise ValueError(f"characterization_workers must be at least 1: {characterization_workers}")
+        if synthesis_engine not in ['python', 'numpy']:
+            raise ValueError(f"synthesis_engine must be 'python' or 'numpy', not '{synthesis_engine}'")
+        if synthesis_workers < 1:
+            raise ValueError(f"synthesis_workers must be at least 1: {synthesis_workers}")
+        if synthesis_sampling not in ['rejection', 'conditioned']:
+            raise ValueError(f"synthesis_sampling must be 'rejection' or 'conditioned', not '{synthesis_sampling}'")
+        if synthesis_sampling == 'conditioned' and synthesis_engine != 'python':
+            raise ValueError("synthesis_sampling 'conditioned' is only supported by the 'python' synthesis engine.")
 
         self.parser = parser
-        self.interval = Decimal(str(percentage_interval))
+        self.interval = percentage_interval
+        self._synthesis_buckets = PercentageBuckets(percentage_interval, SYNTHESIS_MAX_PERCENTAGE)
         self.simulation_duration_s = simulation_duration_s
         self.simulation_duration_ms = simulation_duration_s * 1000
         self.time_expansion_strategy = time_expansion_strategy
-
-    def generate(self, events: List[FEIEvent]) -> List[FEIEvent]:
-        model = self._characterize(events)
+        self.reorder_buffer_size = reorder_buffer_size
+        self.characterization_workers = characterization_workers
+        self.characterization_chunk_bytes = characterization_chunk_bytes
+        # When set, every characterized model is also saved to this file.
+        self.model_output_file = model_output_file
+        # When set, every characterized model is also passed to this
+        # callable (main.py uses it to fill the stage cache).
+        self.model_sink: Optional[Callable[[Dict[str, Any]], Any]] = None
+        # With more than one worker, synthesis runs one process per key
+        # partition. A seed makes the output reproducible for a given
+        # worker count.
+        self.synthesis_workers = synthesis_workers
+        self.synthesis_batch_size = 2000
+        self.seed = seed
+        # 'python' draws one event at a time; 'numpy' draws blocks of events
+        # per interval (see numpy_engine.py).
+        self.synthesis_engine = synthesis_engine
+        # 'rejection' drops draws that do not fit the pool (READ/DELETE of a
+        # key that is not live) without advancing the clock; 'conditioned'
+        # draws only ops and targets that fit, so every draw emits an event.
+        self.synthesis_sampling = synthesis_sampling
+        # When set, the achieved vs. target throughput is saved here as JSON.
+        self.throughput_report_file = throughput_report_file
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Worker processes never finalize a model, and the sink (often a
+        # closure) may not be picklable.
+        state = self.__dict__.copy()
+        state['model_sink'] = None
+        return state
+
+    def generate(
+        self,
+        events: Iterable[FEIEvent],
+        time_bounds: Optional[Tuple[float, float]] = None
+    ) -> List[FEIEvent]:
+        model = self._characterize_any(events, time_bounds)
         synthetic_events = self._synthesize(model)
         return synthetic_events
 
+    def generate_stream(
+        self,
+        events: Iterable[FEIEvent],
+        time_bounds: Optional[Tuple[float, float]] = None
+    ) -> Iterator[FEIEvent]:
+        model = self._characterize_any(events, time_bounds)
+        yield from self._iter_synthesize(model)
+
+    def generate_stream_from_file(
+        self,
+        parser: IParser,
+        file_path: str,
+        time_bounds: Optional[Tuple[float, float]] = None
+    ) -> Iterator[FEIEvent]:
+        if self.characterization_workers <= 1:
+            yield from super().generate_stream_from_file(parser, file_path, time_bounds)
+            return
+
+        if time_bounds is None:
+            time_bounds = parser.read_time_bounds(file_path)
+        model = self._characterize_file(parser, file_path, *time_bounds)
+        yield from self._iter_synthesize(model)
+
+    def generate_stream_from_model(self, model_file: str) -> Iterator[FEIEvent]:
+        model = self.load_model(model_file)
+        yield from self._iter_synthesize(model)
+
+    def model_cache_params(self) -> Optional[Dict[str, Any]]:
+        return {"type": "heatmap", "percentage_interval": self.interval}
+
+    def save_model(self, model: Dict[str, Any], path: str):
+        """Saves a characterization model in the compact binary format."""
+        save_model(model, self.interval, path)
+        print(f"Characterization model saved to '{path}'.")
+
+    def load_model(self, path: str) -> Dict[str, Any]:
+        """Loads a model saved by save_model, checking it matches this generator."""
+        model, percentage_interval = load_model(path)
+        if percentage_interval != self.interval:
+            raise ValueError(
+                f"Model '{path}' was characterized with percentage_interval={percentage_interval}, "
+                f"but the generator uses {self.interval}."
+            )
+        print(f"Characterization model loaded from '{path}'.")
+        return model
+
+    def _characterize_any(
+        self,
+        events: Iterable[FEIEvent],
+        time_bounds: Optional[Tuple[float, float]]
+    ) -> Dict[str, Any]:
+        if isinstance(events, EventBatch):
+            return self._characterize_batch(events)
+        if time_bounds is None:
+            return self._characterize(list(events))
+        return self._characterize_stream(events, *time_bounds)
+
     def _characterize(self, events: List[FEIEvent]) -> Dict[str, Any]:
         print("--- Characterization Phase: Building model with command-specific resource patterns ---")
         if not events:
             raise ValueError("Cannot characterize an empty list of events.")
 
-        getcontext().prec = 28
         events.sort(key=lambda e: e['timestamp'])
+        return self._build_model(
+            events, events[0]['timestamp'], events[-1]['timestamp'], reorder_buffer_size=0
+        )
+
+    def _characterize_batch(self, batch: EventBatch) -> Dict[str, Any]:
+        """
+        Like _characterize, but only sorts row indices; FEIEvents are built
+        one at a time as they are counted.
+        """
+        print("--- Characterization Phase: Building model with command-specific resource patterns ---")
+        if not len(batch):
+            raise ValueError("Cannot characterize an empty list of events.")
 
-        start_ts = Decimal(str(events[0]['timestamp']))
-        end_ts = Decimal(str(events[-1]['timestamp']))
-        total_duration_ms = (end_ts - start_ts) * 1000
-        if total_duration_ms == 0: total_duration_ms = Decimal(1)
-
-        target_counts = defaultdict(lambda: defaultdict(Counter))
-        inter_arrival_counts = defaultdict(Counter)
-        all_op_semantics = {}
-        all_targets: Set[str] = set()
-        all_client_ids: Set[str] = set()
-
-        for i in range(len(events) - 1):
-            current_event = events[i]
-            next_event = events[i+1]
-
-            relative_ts_ms = (Decimal(str(current_event['timestamp'])) - start_ts) * 1000
-            delta_ms = (Decimal(str(next_event['timestamp'])) - Decimal(str(current_event['timestamp']))) * 1000
-
-            percentage_complete = (relative_ts_ms / total_duration_ms) * 100
-            if percentage_complete >= 100:
-                percentage_complete = Decimal("99.9999999999")
-
-            interval_index = int(percentage_complete // self.interval)
-            
-            op_type = current_event['op_type']
-            target = current_event['target']
-
-            target_counts[interval_index][op_type][target] += 1
-            
-            rounded_delta = round(float(delta_ms), 3)
-            inter_arrival_counts[interval_index][rounded_delta] += 1
-
-            all_targets.add(target)
-            all_client_ids.add(current_event['client_id'])
-            if op_type not in all_op_semantics:
-                all_op_semantics[op_type] = current_event['semantic_type']
-
-        heatmap_probabilities = {}
-        for interval_idx, op_data in target_counts.items():
-            total_ops_in_interval = sum(sum(op.values()) for op in op_data.values())
-            if total_ops_in_interval > 0:
-                heatmap_probabilities[interval_idx] = {
-                    op: sum(targets.values()) / total_ops_in_interval
-                    for op, targets in op_data.items()
-                }
-
-        target_probabilities = defaultdict(dict)
-        for interval_idx, op_data in target_counts.items():
-            target_probabilities[interval_idx] = {}
-            for op_type, targets in op_data.items():
-                total_for_op = sum(targets.values())
-                if total_for_op > 0:
-                    target_probabilities[interval_idx][op_type] = {
-                        target: count / total_for_op for target, count in targets.items()
-                    }
-
-        inter_arrival_probabilities = {
-            k: {delta: v / sum(cnts.values()) for delta, v in cnts.items()}
-            for k, cnts in inter_arrival_counts.items()
-        }
+        order = batch.timestamp_order()
+        return self._build_model(
+            batch.iter_events(order), batch.timestamps[order[0]], batch.timestamps[order[-1]],
+            reorder_buffer_size=0
+        )
 
+    def _characterize_stream(
+        self,
+        events: Iterable[FEIEvent],
+        start_timestamp: float,
+        end_timestamp: float
+    ) -> Dict[str, Any]:
+        """
+        Single-pass characterization over an event stream whose time bounds
+        are known up front (e.g. from IParser.read_time_bounds). Mildly
+        out-of-order events are fixed by a bounded reorder buffer.
+        """
+        print("--- Characterization Phase (streaming): Building model in a single pass ---")
+        return self._build_model(
+            events, start_timestamp, end_timestamp, self.reorder_buffer_size
+        )
+
+    def _characterize_file(
+        self,
+        parser: IParser,
+        file_path: str,
+        start_timestamp: float,
+        end_timestamp: float
+    ) -> Dict[str, Any]:
+        """
+        Map-reduce characterization: each worker parses and counts one
+        newline-aligned byte range of the file, and the partial models are
+        merged in file order before a single finalize step.
+        """
+        print(f"--- Characterization Phase (map-reduce, {self.characterization_workers} workers): Building model from file chunks ---")
+        ranges = split_newline_aligned(file_path, self.characterization_chunk_bytes)
+        starts = [start for start, _ in ranges]
+        ends = [end for _, end in ranges]
+
+        merged = None
+        with ProcessPoolExecutor(max_workers=self.characterization_workers) as executor:
+            partials = executor.map(
+                self._count_range, repeat(parser), repeat(file_path), starts, ends,
+                repeat(start_timestamp), repeat(end_timestamp)
+            )
+            for partial in partials:
+                merged = partial if merged is None else merged.merge(partial)
+
+        if merged is None:
+            raise ValueError(f"Cannot characterize an empty file: '{file_path}'.")
+        return self._finalize(merged)
+
+    def _count_range(
+        self,
+        parser: IParser,
+        file_path: str,
+        start: int,
+        end: int,
+        start_timestamp: float,
+        end_timestamp: float
+    ) -> PartialModel:
+        """Map step, run inside a worker process."""
+        events = parser.parse_range(file_path, start, end)
+        return self._count(events, start_timestamp, end_timestamp, self.reorder_buffer_size)
+
+    def _reorder(self, events: Iterable[FEIEvent], buffer_size: int) -> Iterator[FEIEvent]:
+        """Yields events sorted within a sliding window of 'buffer_size' events."""
+        if buffer_size <= 0:
+            yield from events
+            return
+
+        heap: List[Tuple[float, int, FEIEvent]] = []
+        for seq, event in enumerate(events):
+            heapq.heappush(heap, (event['timestamp'], seq, event))
+            if len(heap) > buffer_size:
+                yield heapq.heappop(heap)[2]
+        while heap:
+            yield heapq.heappop(heap)[2]
+
+    def _count(
+        self,
+        events: Iterable[FEIEvent],
+        start_timestamp: float,
+        end_timestamp: float,
+        reorder_buffer_size: int
+    ) -> PartialModel:
+        """Count phase: builds the mergeable raw counts for a slice of the trace."""
+        start_us = seconds_to_micros(start_timestamp)
+        total_duration_us = seconds_to_micros(end_timestamp) - start_us
+        if total_duration_us <= 0: total_duration_us = ms_to_micros(1)
+
+        partial = PartialModel(self.interval, start_us, total_duration_us)
+        return partial.count_events(
+            self._reorder(events, reorder_buffer_size), payload_lengths=self.parser.payload_lengths
+        )
+
+    def _finalize(self, partial: PartialModel) -> Dict[str, Any]:
+        """Finalize phase: normalizes the merged counts into the model."""
+        if partial.is_empty:
+            raise ValueError("Cannot characterize an empty stream of events.")
+        if partial.late_events:
+            print(f"[WARN] {partial.late_events} events arrived out of order beyond the reorder buffer; their deltas were clamped to 0.", file=sys.stderr)
+
+        model = partial.finalize()
         print("Characterization complete.")
-        return {
-            "total_duration_ms": float(total_duration_ms),
-            "op_semantics": all_op_semantics,
-            "heatmap": heatmap_probabilities,
-            "target_probabilities_by_op": dict(target_probabilities),
-            "inter_arrival_probabilities": inter_arrival_probabilities,
-            "initial_resource_pool": list(all_targets),
-            "client_ids": list(all_client_ids) or ["default_client_1"],
-        }
-
-    def _synthesize(self, model: Dict[str, Any]) -> List[FEIEvent]:
-        print(f"--- Synthesis Phase: Generating events for {self.simulation_duration_ms / 1000}s (strategy: {self.time_expansion_strategy}) ---")
-        synthetic_events: List[FEIEvent] = []
-        available_pool: Set[str] = set()
-
-        getcontext().prec = 28
-
-        current_time_ms = Decimal("0.0")
-        original_duration_ms = Decimal(str(model['total_duration_ms']))
-        simulation_duration_ms = Decimal(str(self.simulation_duration_ms))
+        if self.model_output_file:
+            self.save_model(model, self.model_output_file)
+        if self.model_sink is not None:
+            self.model_sink(model)
+        return model
 
-        interval_size = self.interval 
+    def _build_model(
+        self,
+        events: Iterable[FEIEvent],
+        start_timestamp: float,
+        end_timestamp: float,
+        reorder_buffer_size: int
+    ) -> Dict[str, Any]:
+        partial = self._count(events, start_timestamp, end_timestamp, reorder_buffer_size)
+        return self._finalize(partial)
 
-        scaling_factor = Decimal("1.0")
-        is_stretching = False
-        if self.time_expansion_strategy == 'stretch' and simulation_duration_ms > original_duration_ms:
-            if original_duration_ms > 0:
-                scaling_factor = simulation_duration_ms / original_duration_ms
-            is_stretching = True
+    def _synthesize(self, model: Dict[str, Any]) -> List[FEIEvent]:
+        return list(self._iter_synthesize(model))
+
+    def _iter_synthesize(self, model: Dict[str, Any]) -> Iterator[FEIEvent]:
+        if self.synthesis_workers > 1:
+            print(f"--- Synthesis Phase ({self.synthesis_workers} workers): Generating events for {self.simulation_duration_ms / 1000}s (strategy: {self.time_expansion_strategy}) ---")
+            stats = self._new_stats(partitions=0)  # Merged from the workers' stats.
+            stream = self._iter_synthesize_parallel(model, stats)
+        else:
+            print(f"--- Synthesis Phase: Generating events for {self.simulation_duration_ms / 1000}s (strategy: {self.time_expansion_strategy}) ---")
+            if self.seed is not None:
+                random.seed(self._partition_seed(0, 1))
+            stats = self._new_stats()
+            stream = self._synthesize_partition(model, 0, 1, stats)
+
+        generated_count = 0
+        for event in stream:
+            yield event
+            generated_count += 1
+        print(f"Synthesis complete. Generated {generated_count} events.")
+        self._report_throughput(stats)
+
+    def _new_stats(self, partitions: int = 1) -> SynthesisStats:
+        return SynthesisStats(self._synthesis_buckets.last_index + 1, partitions)
+
+    def _report_throughput(self, stats: SynthesisStats):
+        report = stats.report()
+        if report["achieved_ops_s"] is None:
+            return
+        below_target = [
+            b for b in report["buckets"] if b["ratio"] is not None and b["ratio"] < 0.9
+        ]
+        print(f"Throughput: {report['achieved_ops_s']:.1f} ops/s achieved vs. {report['target_ops_s'] or 0:.1f} ops/s target; "
+              f"{len(below_target)}/{len(report['buckets'])} intervals below 90% of target.")
+        if report["rejected_draws"] or report["starved_draws"]:
+            print(f"Synthesis draws without an event: {report['rejected_draws']} rejected, {report['starved_draws']} with no applicable op.")
+        if self.throughput_report_file:
+            with open(self.throughput_report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"Throughput report saved to '{self.throughput_report_file}'.")
+
+    def _partition_seed(self, partition: int, partition_count: int) -> str:
+        """Seed of one worker's RNG stream, derived from the configured seed."""
+        return f"{self.seed}:{partition}/{partition_count}"
+
+    def _iter_synthesize_parallel(self, model: Dict[str, Any], stats: SynthesisStats) -> Iterator[FEIEvent]:
+        """
+        Splits the key space into one partition per worker process. Each
+        worker synthesizes the whole timeline for its own keys (so the
+        CREATE/READ/DELETE pool stays consistent) with its own RNG stream,
+        and the streams are merged here in timestamp order. The workers'
+        throughput stats are merged into 'stats'.
+        """
+        context = multiprocessing.get_context()
+        queues = [context.Queue(maxsize=self._SYNTHESIS_QUEUE_BATCHES) for _ in range(self.synthesis_workers)]
+        workers = [
+            context.Process(
+                target=_synthesis_worker,
+                args=(self, model, partition, self.synthesis_workers, queue),
+                daemon=True
+            )
+            for partition, queue in enumerate(queues)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            streams = [self._drain_queue(queue, stats) for queue in queues]
+            # Ties are broken by partition index, so the merge is deterministic.
+            yield from heapq.merge(*streams, key=lambda e: e['timestamp'])
+            for worker in workers:
+                worker.join()
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+
+    @staticmethod
+    def _drain_queue(queue, stats: SynthesisStats) -> Iterator[FEIEvent]:
+        while True:
+            batch = queue.get()
+            if batch is None:
+                return
+            if isinstance(batch, str):
+                raise RuntimeError(f"Synthesis worker failed:\n{batch}")
+            if isinstance(batch, SynthesisStats):
+                stats.merge(batch)
+                continue
+            yield from batch
 
-        valid_intervals = set(model['heatmap'].keys())
-        if not valid_intervals:
+    def _synthesize_partition(
+        self,
+        model: Dict[str, Any],
+        partition: int,
+        partition_count: int,
+        stats: SynthesisStats
+    ) -> Iterator[FEIEvent]:
+        """
+        Synthesis loop for one key partition. Events whose target belongs to
+        another partition are thinned out: they are not emitted, but the
+        clock still advances, so each partition keeps its share of the rate.
+        A thinned draw only advances the clock if the pool rules would have
+        accepted it (see _thinned_draw_applies), as an emitted one does, so
+        the merged partitions match the rate and op mix of a single stream.
+        Emitted events and elapsed time per bucket are recorded in 'stats'.
+        """
+        available_pool = ResourcePool()
+
+        buckets = self._synthesis_buckets
+        current_time_us = 0
+        original_duration_us = ms_to_micros(model['total_duration_ms'])
+        simulation_duration_us = seconds_to_micros(self.simulation_duration_s)
+
+        # Stretching maps simulated time t onto t * original / simulation, so
+        # its position within the trace is simply t / simulation.
+        is_stretching = (
+            self.time_expansion_strategy == 'stretch'
+            and simulation_duration_us > original_duration_us
+        )
+
+        compiled = CompiledModel(model, buckets.last_index, partition, partition_count)
+        if not compiled:
             print("Synthesis warning: Model heatmap is empty. No events will be generated.")
-            return []
-            
-        first_valid_interval = min(valid_intervals)
-
-        while current_time_ms < simulation_duration_ms:
-            percentage_complete = Decimal("0.0")
+            return
+        self.parser.set_payload_lengths(model.get('payload_length_probabilities', {}))
+        stats.record_targets(compiled)
+
+        if self.synthesis_engine == 'numpy':
+            from .numpy_engine import NumpySynthesisEngine
+
+            seed = self._partition_seed(partition, partition_count) if self.seed is not None else None
+            engine = NumpySynthesisEngine(compiled, seed)
+            yield from engine.run(
+                self.parser, buckets, original_duration_us, simulation_duration_us, is_stretching, stats
+            )
+            return
+
+        intervals = compiled.intervals
+        op_semantics = compiled.op_semantics
+        client_ids = compiled.client_ids
+        conditioned = self.synthesis_sampling == 'conditioned'
+        emitted = stats.events
+        elapsed_us = stats.elapsed_us
+        rejected_in_a_row = 0
+
+        while current_time_us < simulation_duration_us:
+            if rejected_in_a_row >= self._MAX_CONSECUTIVE_REJECTIONS:
+                stats.starved += 1
+                rejected_in_a_row = 0
+                delta_us = interval.delta_us_sampler.sample()
+                elapsed_us[interval_start] += delta_us
+                current_time_us += delta_us
+                continue
 
-            if original_duration_ms == 0:
-                percentage_complete = Decimal("0.0")
+            if original_duration_us == 0:
+                interval_start = 0
             elif is_stretching:
-                mapped_time_ms = current_time_ms / scaling_factor
-                mapped_time_ms = min(mapped_time_ms, original_duration_ms) 
-                percentage_complete = (mapped_time_ms / original_duration_ms) * 100
+                interval_start = buckets.index(current_time_us, simulation_duration_us)
             else:
-                mapped_time_ms = current_time_ms % original_duration_ms
-                percentage_complete = (mapped_time_ms / original_duration_ms) * 100
-
-            if percentage_complete >= 100:
-                percentage_complete = Decimal("99.999999999999") 
-
-            interval_start = int(percentage_complete // interval_size)
-            
-            while interval_start not in valid_intervals:
-                interval_start -= 1
-                if interval_start < 0:
-                    interval_start = first_valid_interval
-                    break
-
-            action_dist = model['heatmap'].get(interval_start)
-            if not action_dist:
+                interval_start = buckets.index(
+                    current_time_us % original_duration_us, original_duration_us
+                )
+
+            interval = intervals[interval_start]
+            op_type = interval.op_sampler.sample()
+
+            target_mass = interval.target_masses.get(op_type)
+            if target_mass is not None and target_mass < 1.0 and random.random() >= target_mass:
+                if not conditioned and not self._thinned_draw_applies(
+                    interval, op_semantics[op_type], available_pool, op_type
+                ):
+                    stats.rejected += 1
+                    rejected_in_a_row += 1
+                    continue
+                delta_us = interval.delta_us_sampler.sample()
+                elapsed_us[interval_start] += delta_us
+                current_time_us += delta_us
                 continue
 
-            op_type = random.choices(list(action_dist.keys()), list(action_dist.values()))[0]
-
-            target_dist = model['target_probabilities_by_op'].get(interval_start, {}).get(op_type)
-            if not target_dist: 
-                found_fallback = False
-                for i in range(interval_start - 1, -1, -1):
-                    target_dist = model['target_probabilities_by_op'].get(i, {}).get(op_type)
-                    if target_dist:
-                        found_fallback = True
-                        break
-                if not found_fallback:
+            if conditioned:
+                drawn = self._draw_conditioned(interval, op_semantics, available_pool, op_type)
+                if drawn is None:
+                    stats.starved += 1
+                    delta_us = interval.delta_us_sampler.sample()
+                    elapsed_us[interval_start] += delta_us
+                    current_time_us += delta_us
                     continue
-            
-            target = random.choices(list(target_dist.keys()), list(target_dist.values()))[0]
-            
-            semantic_type_list = model['op_semantics'][op_type]
+                op_type, target = drawn
+            elif target_mass is None:
+                stats.rejected += 1
+                rejected_in_a_row += 1
+                continue
+            else:
+                target = interval.target_samplers[op_type].sample()
 
-            is_create_update = "CREATE" in semantic_type_list and "UPDATE" in semantic_type_list
-            if is_create_update:
-                if target not in available_pool:
-                    available_pool.add(target) 
+            semantics = op_semantics[op_type]
+            if semantics.is_create_update:
+                available_pool.add(target)
 
-            elif "READ" in semantic_type_list:
-                if not available_pool: continue
-                if target not in available_pool: continue
+            elif semantics.is_read:
+                if target not in available_pool:
+                    stats.rejected += 1
+                    rejected_in_a_row += 1
+                    continue
 
-            elif "DELETE" in semantic_type_list:
-                if target in available_pool:
-                    available_pool.remove(target)
-                else:
+            elif semantics.is_delete:
+                if not available_pool.discard(target):
+                    stats.rejected += 1
+                    rejected_in_a_row += 1
                     continue
+            rejected_in_a_row = 0
 
-            new_raw_args = self.parser.generate_args(op_type, target, available_pool=list(available_pool))
+            new_raw_args = self.parser.generate_args(op_type, target, available_pool=available_pool)
 
-            synthetic_events.append(FEIEvent(
-                timestamp=(float(current_time_ms) / 1000.0),
-                client_id=random.choice(model['client_ids']),
+            yield FEIEvent(
+                timestamp=micros_to_seconds(current_time_us),
+                client_id=random.choice(client_ids),
                 op_type=op_type,
-                semantic_type=semantic_type_list,
+                semantic_type=semantics.semantic_type,
                 target=target,
                 additional_data={"raw_args": new_raw_args}
-            ))
-
-            delta_dist = model['inter_arrival_probabilities'].get(interval_start)
-            if not delta_dist:
-                found_fallback = False
-                for i in range(interval_start - 1, -1, -1):
-                    delta_dist = model['inter_arrival_probabilities'].get(i)
-                    if delta_dist:
-                        found_fallback = True
-                        break
-                if not found_fallback:
-                     delta_dist = model['inter_arrival_probabilities'][first_valid_interval]
-
-            delta_ms_original = random.choices(list(delta_dist.keys()), list(delta_dist.values()))[0]
-            current_time_ms += Decimal(str(delta_ms_original))
-
-        print(f"Synthesis complete. Generated {len(synthetic_events)} events.")
-        return synthetic_events
+            )
+
+            emitted[interval_start] += 1
+            delta_us = interval.delta_us_sampler.sample()
+            elapsed_us[interval_start] += delta_us
+            current_time_us += delta_us
+
+    @staticmethod
+    def _thinned_draw_applies(
+        interval: CompiledInterval,
+        semantics: OpSemantics,
+        available_pool: ResourcePool,
+        op_type: str
+    ) -> bool:
+        """
+        Whether a thinned draw (its target is in another partition) would
+        have passed the pool rules. That partition's pool is not known here,
+        so a READ/DELETE is tested with a stand-in target drawn from this
+        partition's keys against this partition's pool: keys are spread over
+        the partitions by hash, so a target is live with about the same
+        probability in either. The pool is not modified.
+        """
+        if not (semantics.is_read or semantics.is_delete):
+            return True
+        sampler = interval.target_samplers.get(op_type)
+        if sampler is None:
+            return True
+        return sampler.sample() in available_pool
+
+    def _draw_conditioned(
+        self,
+        interval: CompiledInterval,
+        op_semantics: Dict[str, OpSemantics],
+        available_pool: ResourcePool,
+        op_type: str
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Draws an (op, target) pair conditioned on the pool state, starting
+        from the already drawn 'op_type': ops that need a live target only
+        pick live ones, and an op with no live target at all is excluded and
+        the op is drawn again from the remaining ones, renormalized. Returns
+        None when no op of the interval can be applied.
+        """
+        excluded: Set[str] = set()
+        while True:
+            target = self._draw_live_target(interval, op_semantics[op_type], available_pool, op_type)
+            if target is not None:
+                return op_type, target
+
+            excluded.add(op_type)
+            remaining = [op for op in interval.op_distribution if op not in excluded]
+            if not remaining:
+                return None
+            weights = [interval.op_distribution[op] for op in remaining]
+            op_type = random.choices(remaining, weights)[0]
+
+    def _draw_live_target(
+        self,
+        interval: CompiledInterval,
+        semantics: OpSemantics,
+        available_pool: ResourcePool,
+        op_type: str
+    ) -> Optional[str]:
+        """
+        Draws a target of 'op_type' that the op can be applied to. A few
+        plain draws are tried first; if they all miss the pool, the live
+        targets are enumerated and drawn with their renormalized weights,
+        so the result always follows the conditional distribution.
+        """
+        sampler = interval.target_samplers.get(op_type)
+        if sampler is None:
+            return None
+        if semantics.is_create_update or not (semantics.is_read or semantics.is_delete):
+            return sampler.sample()
+
+        for _ in range(self._CONDITIONED_TARGET_TRIES):
+            target = sampler.sample()
+            if target in available_pool:
+                return target
+
+        distribution = interval.target_distributions[op_type]
+        if len(available_pool) < len(distribution):
+            live = [target for target in available_pool if target in distribution]
+        else:
+            live = [target for target in distribution if target in available_pool]
+        if not live:
+            return None
+        return random.choices(live, [distribution[target] for target in live])[0]
+
+
+def _synthesis_worker(
+    generator: HeatmapGenerator,
+    model: Dict[str, Any],
+    partition: int,
+    partition_count: int,
+    queue
+):
+    """Process entry point of parallel synthesis: streams batches of events."""
+    try:
+        # Each worker is its own process, so seeding the global RNG gives it
+        # an independent stream without touching the parser's API.
+        if generator.seed is not None:
+            random.seed(generator._partition_seed(partition, partition_count))
+        else:
+            random.seed()
+        batch = []
+        stats = generator._new_stats()
+        for event in generator._synthesize_partition(model, partition, partition_count, stats):
+            batch.append(event)
+            if len(batch) >= generator.synthesis_batch_size:
+                queue.put(batch)
+                batch = []
+        if batch:
+            queue.put(batch)
+        queue.put(stats)
+        queue.put(None)
+    except Exception:
+        queue.put(traceback.format_exc())
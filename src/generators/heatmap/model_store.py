@@ -0,0 +1,233 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List, Tuple
+from .timebase import micros_to_ms, ms_to_micros
+
+# Binary heatmap model file:
+#
+#   magic (8 bytes) | header length (u64) | JSON header | padding | arrays
+#
+# The JSON header holds the scalar fields and, for every array, its typecode,
+# byte offset (8-byte aligned, from the start of the file) and element count.
+# Arrays are little-endian and can be read straight out of an mmap. All
+# strings (ops, semantic types, targets, client ids) live once in a string
+# table and are referenced by index everywhere else.
+MODEL_MAGIC = b'WGHMODL1'
+_ALIGNMENT = 8
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    def id_of(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.ids)
+        return string_id
+
+    def encode(self) -> Tuple[array, bytes]:
+        offsets = array('Q', [0])
+        chunks = []
+        total = 0
+        for value in self.ids:
+            raw = value.encode('utf-8', errors='surrogateescape')
+            chunks.append(raw)
+            total += len(raw)
+            offsets.append(total)
+        return offsets, b''.join(chunks)
+
+
+def save_model(model: Dict[str, Any], percentage_interval: float, path: str):
+    """Writes a characterization model in the compact binary format."""
+    strings = _StringTable()
+    arrays: Dict[str, array] = {}
+
+    op_types = list(model['op_semantics'])
+    arrays['op_ids'] = array('I', [strings.id_of(op) for op in op_types])
+    arrays['op_semantics_offsets'] = _offsets(len(model['op_semantics'][op]) for op in op_types)
+    arrays['op_semantics_ids'] = array('I', [
+        strings.id_of(semantic) for op in op_types for semantic in model['op_semantics'][op]
+    ])
+    arrays['client_ids'] = array('I', [strings.id_of(c) for c in model['client_ids']])
+    arrays['resource_pool'] = array('I', [strings.id_of(t) for t in model['initial_resource_pool']])
+
+    heatmap = model['heatmap']
+    arrays['heatmap_intervals'] = array('q', heatmap.keys())
+    arrays['heatmap_offsets'] = _offsets(len(dist) for dist in heatmap.values())
+    arrays['heatmap_ops'] = array('I', [strings.id_of(op) for dist in heatmap.values() for op in dist])
+    arrays['heatmap_probs'] = array('d', [p for dist in heatmap.values() for p in dist.values()])
+
+    target_groups = [
+        (interval_idx, op_type, dist)
+        for interval_idx, op_data in model['target_probabilities_by_op'].items()
+        for op_type, dist in op_data.items()
+    ]
+    arrays['target_group_intervals'] = array('q', [g[0] for g in target_groups])
+    arrays['target_group_ops'] = array('I', [strings.id_of(g[1]) for g in target_groups])
+    arrays['target_group_offsets'] = _offsets(len(g[2]) for g in target_groups)
+    arrays['target_ids'] = array('I', [strings.id_of(t) for g in target_groups for t in g[2]])
+    arrays['target_probs'] = array('d', [p for g in target_groups for p in g[2].values()])
+
+    deltas = model['inter_arrival_probabilities']
+    arrays['delta_intervals'] = array('q', deltas.keys())
+    arrays['delta_offsets'] = _offsets(len(dist) for dist in deltas.values())
+    arrays['delta_us'] = array('q', [ms_to_micros(d) for dist in deltas.values() for d in dist])
+    arrays['delta_probs'] = array('d', [p for dist in deltas.values() for p in dist.values()])
+
+    payload_lengths = model.get('payload_length_probabilities', {})
+    arrays['payload_ops'] = array('I', [strings.id_of(op) for op in payload_lengths])
+    arrays['payload_offsets'] = _offsets(len(dist) for dist in payload_lengths.values())
+    arrays['payload_lengths'] = array('q', [n for dist in payload_lengths.values() for n in dist])
+    arrays['payload_probs'] = array('d', [p for dist in payload_lengths.values() for p in dist.values()])
+
+    string_offsets, string_blob = strings.encode()
+    arrays['string_offsets'] = string_offsets
+    arrays['string_blob'] = array('B', string_blob)
+
+    header: Dict[str, Any] = {
+        "percentage_interval": percentage_interval,
+        "total_duration_ms": model['total_duration_ms'],
+        "arrays": {},
+    }
+    relative_offset = 0
+    for name, values in arrays.items():
+        relative_offset = _align(relative_offset)
+        header["arrays"][name] = [values.typecode, relative_offset, len(values)]
+        relative_offset += len(values) * values.itemsize
+
+    # The header size depends on the absolute offsets it contains; iterate
+    # until the reserved header space fits it.
+    relative_offsets = {name: entry[1] for name, entry in header["arrays"].items()}
+    prefix_length = len(MODEL_MAGIC) + 8
+    data_start = 0
+    while True:
+        for name, entry in header["arrays"].items():
+            entry[1] = relative_offsets[name] + data_start
+        header_bytes = json.dumps(header).encode('utf-8')
+        needed = _align(prefix_length + len(header_bytes))
+        if needed <= data_start:
+            break
+        data_start = needed
+
+    with open(path, 'wb') as f:
+        f.write(MODEL_MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for name, values in arrays.items():
+            f.write(b'\0' * (header["arrays"][name][1] - f.tell()))
+            if sys.byteorder != 'little':
+                values = array(values.typecode, values)
+                values.byteswap()
+            f.write(values.tobytes())
+
+
+def load_model(path: str) -> Tuple[Dict[str, Any], float]:
+    """
+    Reads a model written by save_model. Returns the model and the
+    percentage_interval it was characterized with.
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if buffer[:len(MODEL_MAGIC)] != MODEL_MAGIC:
+                raise ValueError(f"'{path}' is not a binary heatmap model file.")
+            (header_length,) = struct.unpack_from('<Q', buffer, len(MODEL_MAGIC))
+            header_start = len(MODEL_MAGIC) + 8
+            header = json.loads(buffer[header_start:header_start + header_length])
+
+            view = memoryview(buffer)
+            try:
+                model = _decode_model(view, header)
+            finally:
+                view.release()
+    return model, header["percentage_interval"]
+
+
+def _decode_model(view: memoryview, header: Dict[str, Any]) -> Dict[str, Any]:
+    def read(name: str) -> List:
+        typecode, offset, count = header["arrays"][name]
+        itemsize = array(typecode).itemsize
+        raw = view[offset:offset + count * itemsize]
+        if sys.byteorder != 'little':
+            values = array(typecode, raw.tobytes())
+            values.byteswap()
+            return values.tolist()
+        return raw.cast(typecode).tolist()
+
+    string_offsets = read('string_offsets')
+    _, blob_offset, _ = header["arrays"]['string_blob']
+    blob = view[blob_offset:blob_offset + string_offsets[-1]].tobytes()
+    strings = [
+        blob[start:end].decode('utf-8', errors='surrogateescape')
+        for start, end in zip(string_offsets, string_offsets[1:])
+    ]
+
+    op_types = [strings[i] for i in read('op_ids')]
+    semantic_ids = read('op_semantics_ids')
+    op_semantics = {
+        op: [strings[i] for i in semantic_ids[start:end]]
+        for op, (start, end) in zip(op_types, _ranges(read('op_semantics_offsets')))
+    }
+
+    heatmap_ops = [strings[i] for i in read('heatmap_ops')]
+    heatmap_probs = read('heatmap_probs')
+    heatmap = {
+        interval_idx: dict(zip(heatmap_ops[start:end], heatmap_probs[start:end]))
+        for interval_idx, (start, end) in zip(read('heatmap_intervals'), _ranges(read('heatmap_offsets')))
+    }
+
+    target_names = [strings[i] for i in read('target_ids')]
+    target_probs = read('target_probs')
+    target_probabilities: Dict[int, Dict[str, Dict[str, float]]] = {}
+    groups = zip(read('target_group_intervals'), read('target_group_ops'), _ranges(read('target_group_offsets')))
+    for interval_idx, op_id, (start, end) in groups:
+        target_probabilities.setdefault(interval_idx, {})[strings[op_id]] = dict(
+            zip(target_names[start:end], target_probs[start:end])
+        )
+
+    delta_values = [micros_to_ms(d) for d in read('delta_us')]
+    delta_probs = read('delta_probs')
+    inter_arrival_probabilities = {
+        interval_idx: dict(zip(delta_values[start:end], delta_probs[start:end]))
+        for interval_idx, (start, end) in zip(read('delta_intervals'), _ranges(read('delta_offsets')))
+    }
+
+    payload_length_probabilities: Dict[str, Dict[int, float]] = {}
+    if 'payload_ops' in header["arrays"]:  # Absent from files written before it was added.
+        payload_lengths = read('payload_lengths')
+        payload_probs = read('payload_probs')
+        payload_length_probabilities = {
+            strings[op_id]: dict(zip(payload_lengths[start:end], payload_probs[start:end]))
+            for op_id, (start, end) in zip(read('payload_ops'), _ranges(read('payload_offsets')))
+        }
+
+    return {
+        "total_duration_ms": header["total_duration_ms"],
+        "op_semantics": op_semantics,
+        "heatmap": heatmap,
+        "target_probabilities_by_op": target_probabilities,
+        "inter_arrival_probabilities": inter_arrival_probabilities,
+        "payload_length_probabilities": payload_length_probabilities,
+        "initial_resource_pool": [strings[i] for i in read('resource_pool')],
+        "client_ids": [strings[i] for i in read('client_ids')],
+    }
+
+
+def _offsets(lengths) -> array:
+    offsets = array('Q', [0])
+    total = 0
+    for length in lengths:
+        total += length
+        offsets.append(total)
+    return offsets
+
+
+def _ranges(offsets: List[int]):
+    return zip(offsets, offsets[1:])
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
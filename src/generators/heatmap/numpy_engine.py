@@ -0,0 +1,238 @@
+import hashlib
+from typing import Dict, Iterator, List, Optional
+from ...models.fei import FEIEvent
+from ...models.resource_pool import ResourcePool
+from ...parsers.interfaces import IParser
+from .compiled_model import CompiledInterval, CompiledModel, OpSemantics
+from .sampling import AliasSampler
+from .synthesis_stats import SynthesisStats
+from .timebase import PercentageBuckets
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency, only needed by this engine.
+    np = None
+
+# Bounds on how many candidate events are drawn at once per interval.
+_MIN_BLOCK = 16
+_MAX_BLOCK = 65536
+
+
+class _VectorSampler:
+    """Vectorized twin of an AliasSampler."""
+    __slots__ = ('values', '_n', '_prob', '_alias')
+
+    def __init__(self, sampler: AliasSampler):
+        prob, alias = sampler.tables
+        self.values = sampler.values
+        self._n = len(sampler)
+        self._prob = np.asarray(prob, dtype=np.float64)
+        self._alias = np.asarray(alias, dtype=np.int64)
+
+    def sample_indices(self, rng, size: int):
+        u = rng.random(size) * self._n
+        idx = np.minimum(u.astype(np.int64), self._n - 1)
+        return np.where(u - idx < self._prob[idx], idx, self._alias[idx])
+
+
+# Pool rule of each op, as a small integer for the tight pass.
+_RULE_CREATE, _RULE_READ, _RULE_DELETE, _RULE_NONE = 0, 1, 2, 3
+_NO_TARGETS = -1
+
+
+class _VectorInterval:
+    """
+    Vectorized samplers of one CompiledInterval. Per-op data is laid out by
+    op index so a whole block can be resolved with array lookups: the pool
+    rule, the thinning mass and the offset of the op's targets within one
+    shared target array.
+    """
+
+    def __init__(self, interval: CompiledInterval, op_semantics: Dict[str, OpSemantics]):
+        self.op_sampler = _VectorSampler(interval.op_sampler)
+        self.op_types: List[str] = self.op_sampler.values
+        self.semantic_types = [op_semantics[op].semantic_type for op in self.op_types]
+
+        rules, masses, offsets = [], [], []
+        self.target_samplers: List[Optional[_VectorSampler]] = []
+        all_targets: List[str] = []
+        for op_type in self.op_types:
+            sampler = interval.target_samplers.get(op_type)
+            mass = interval.target_masses.get(op_type)
+            if mass is None:
+                rules.append(_NO_TARGETS)
+            else:
+                rules.append(self._rule_of(op_semantics[op_type]))
+            masses.append(mass or 0.0)
+            offsets.append(len(all_targets))
+            if sampler is not None:
+                all_targets.extend(sampler.values)
+                self.target_samplers.append(_VectorSampler(sampler))
+            else:
+                self.target_samplers.append(None)
+
+        self.rules = np.asarray(rules, dtype=np.int64)
+        self.masses = np.asarray(masses, dtype=np.float64)
+        self.target_offsets = np.asarray(offsets, dtype=np.int64)
+        self.all_targets = np.asarray(all_targets + [''], dtype=object)
+
+        self.delta_sampler = _VectorSampler(interval.delta_us_sampler)
+        self.delta_values = np.asarray(self.delta_sampler.values, dtype=np.int64)
+        self.mean_delta_us = interval.mean_delta_us
+
+    @staticmethod
+    def _rule_of(semantics: OpSemantics) -> int:
+        if semantics.is_create_update:
+            return _RULE_CREATE
+        if semantics.is_read:
+            return _RULE_READ
+        if semantics.is_delete:
+            return _RULE_DELETE
+        return _RULE_NONE
+
+
+class NumpySynthesisEngine:
+    """
+    Batch synthesis engine. For the interval the clock is in, it draws a block
+    of candidate op types, targets, clients and inter-arrival deltas with
+    NumPy, then applies the thinning and CREATE/READ/DELETE pool rules in a
+    tight pass that stops at the interval boundary. Rejected candidates do
+    not advance the clock, exactly like the per-event loop.
+    """
+
+    def __init__(self, compiled: CompiledModel, seed: Optional[str] = None):
+        if np is None:
+            raise ImportError("The 'numpy' synthesis engine requires NumPy to be installed.")
+        self.compiled = compiled
+        self.rng = np.random.default_rng(self._seed_int(seed))
+        vectorized: Dict[int, _VectorInterval] = {}
+        self.intervals: List[_VectorInterval] = []
+        for interval in compiled.intervals:
+            if interval.index not in vectorized:
+                vectorized[interval.index] = _VectorInterval(interval, compiled.op_semantics)
+            self.intervals.append(vectorized[interval.index])
+
+    @staticmethod
+    def _seed_int(seed: Optional[str]) -> Optional[int]:
+        if seed is None:
+            return None
+        return int.from_bytes(hashlib.sha256(seed.encode('utf-8')).digest()[:8], 'little')
+
+    def run(
+        self,
+        parser: IParser,
+        buckets: PercentageBuckets,
+        original_duration_us: int,
+        simulation_duration_us: int,
+        is_stretching: bool,
+        stats: SynthesisStats
+    ) -> Iterator[FEIEvent]:
+        rng = self.rng
+        client_ids = self.compiled.client_ids
+        available_pool = ResourcePool()
+        # Bound once: the pass below runs once per candidate event.
+        generate_args = parser.generate_args
+        pool_add = available_pool.add
+        pool_discard = available_pool.discard
+        current_time_us = 0
+
+        while current_time_us < simulation_duration_us:
+            if original_duration_us == 0:
+                interval_start, interval_end_us = 0, simulation_duration_us
+            elif is_stretching:
+                interval_start = buckets.index(current_time_us, simulation_duration_us)
+                interval_end_us = buckets.next_boundary(current_time_us, simulation_duration_us)
+            else:
+                position = current_time_us % original_duration_us
+                interval_start = buckets.index(position, original_duration_us)
+                interval_end_us = current_time_us - position + buckets.next_boundary(position, original_duration_us)
+            interval_end_us = min(interval_end_us, simulation_duration_us)
+
+            interval = self.intervals[interval_start]
+            remaining_us = interval_end_us - current_time_us
+            if interval.mean_delta_us > 0:
+                block = int(remaining_us / interval.mean_delta_us * 1.25) + _MIN_BLOCK
+            else:
+                block = _MAX_BLOCK
+            block = max(_MIN_BLOCK, min(block, _MAX_BLOCK))
+
+            # Vectorized draws for the whole block.
+            op_indices = interval.op_sampler.sample_indices(rng, block)
+            rules = interval.rules[op_indices]
+            masses = interval.masses[op_indices]
+            thinned = rng.random(block) >= masses
+            # Thinned READ/DELETE draws are checked against the pool with the
+            # target drawn for them from this partition's keys, as a stand-in
+            # (see HeatmapGenerator._thinned_draw_applies).
+            stand_in = thinned & ((rules == _RULE_READ) | (rules == _RULE_DELETE)) & (masses > 0)
+            target_indices = interval.target_offsets[op_indices]
+            for op_idx, sampler in enumerate(interval.target_samplers):
+                if sampler is None:
+                    continue
+                positions = np.flatnonzero(op_indices == op_idx)
+                if positions.size:
+                    target_indices[positions] += sampler.sample_indices(rng, positions.size)
+            targets = interval.all_targets[target_indices].tolist()
+            deltas = interval.delta_values[interval.delta_sampler.sample_indices(rng, block)].tolist()
+            clients = rng.integers(0, len(client_ids), block).tolist()
+            op_indices = op_indices.tolist()
+            rules = rules.tolist()
+            thinned = thinned.tolist()
+            stand_in = stand_in.tolist()
+
+            # Tight sequential pass: thinning, pool rules and the clock.
+            op_types = interval.op_types
+            semantic_types = interval.semantic_types
+            start_time_us = current_time_us
+            emitted = rejected = 0
+            for k in range(block):
+                if current_time_us >= interval_end_us:
+                    break
+                rule = rules[k]
+                if rule == _NO_TARGETS:
+                    rejected += 1
+                    continue
+                if thinned[k]:
+                    if stand_in[k] and targets[k] not in available_pool:
+                        rejected += 1
+                        continue
+                    current_time_us += deltas[k]
+                    continue
+
+                target = targets[k]
+                if rule == _RULE_CREATE:
+                    pool_add(target)
+                elif rule == _RULE_READ:
+                    if target not in available_pool:
+                        rejected += 1
+                        continue
+                elif rule == _RULE_DELETE:
+                    if not pool_discard(target):
+                        rejected += 1
+                        continue
+
+                op_idx = op_indices[k]
+                op_type = op_types[op_idx]
+                # An FEIEvent, built as a literal: calling the TypedDict
+                # goes through dict(**kwargs), twice as slow per event.
+                yield {
+                    "timestamp": (current_time_us / 1000) / 1000.0,  # micros_to_seconds, inlined
+                    "client_id": client_ids[clients[k]],
+                    "op_type": op_type,
+                    "semantic_type": semantic_types[op_idx],
+                    "target": target,
+                    "additional_data": {"raw_args": generate_args(op_type, target, available_pool=available_pool)},
+                }
+                current_time_us += deltas[k]
+                emitted += 1
+
+            stats.events[interval_start] += emitted
+            stats.rejected += rejected
+            if current_time_us == start_time_us and current_time_us < interval_end_us:
+                # A whole block (at least _MIN_BLOCK draws) was rejected:
+                # counted as starved and the clock moved on by one draw, as
+                # the python engine does after _MAX_CONSECUTIVE_REJECTIONS
+                # consecutive rejections.
+                stats.starved += 1
+                current_time_us += deltas[0]
+            stats.elapsed_us[interval_start] += current_time_us - start_time_us
@@ -0,0 +1,243 @@
+import json
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from ...models.fei import FEIEvent
+from .timebase import (
+    CHARACTERIZATION_MAX_PERCENTAGE,
+    PercentageBuckets,
+    micros_to_ms,
+    seconds_to_micros,
+)
+
+
+def _op_target_counters() -> Dict[str, Counter]:
+    # Module-level (not a lambda) so partial models can be pickled.
+    return defaultdict(Counter)
+
+
+class PartialModel:
+    """
+    Count phase of the heatmap characterization: raw per-interval op, target
+    and inter-arrival counts over one contiguous slice of a trace. Partial
+    models built against the same trace bounds can be merged (in time order)
+    and are only normalized into probabilities by finalize().
+
+    The last event of a slice is kept pending, since its inter-arrival delta
+    depends on the first event of the next slice. Merging accounts for it,
+    so merging the partials of consecutive slices gives exactly the counts
+    of a single pass over the whole trace.
+    """
+
+    def __init__(self, percentage_interval: float, start_us: int, total_duration_us: int):
+        self.percentage_interval = percentage_interval
+        self.start_us = start_us
+        self.total_duration_us = total_duration_us
+        self._buckets = PercentageBuckets(percentage_interval, CHARACTERIZATION_MAX_PERCENTAGE)
+
+        self.target_counts: Dict[int, Dict[str, Counter]] = defaultdict(_op_target_counters)
+        self.inter_arrival_counts: Dict[int, Counter] = defaultdict(Counter)  # keyed by delta in µs
+        self.payload_length_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.op_semantics: Dict[str, List[str]] = {}
+        # Dicts used as insertion-ordered sets, so merged and single-pass
+        # models list targets and clients in the same (first-seen) order.
+        self.targets: Dict[str, None] = {}
+        self.client_ids: Dict[str, None] = {}
+        self.late_events = 0
+
+        self.first_us: Optional[int] = None
+        self.pending_event: Optional[FEIEvent] = None
+        self.pending_us = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return self.first_us is None
+
+    def count_events(
+        self,
+        events: Iterable[FEIEvent],
+        payload_lengths: Optional[Callable[[FEIEvent], List[int]]] = None
+    ) -> 'PartialModel':
+        """
+        Adds a time-ordered slice of events that follows everything counted
+        so far. 'payload_lengths' (usually IParser.payload_lengths) reports
+        the payload sizes of each event.
+        """
+        for event in events:
+            if payload_lengths is not None:
+                lengths = payload_lengths(event)
+                if lengths:
+                    self.payload_length_counts[event['op_type']].update(lengths)
+            event_us = seconds_to_micros(event['timestamp'])
+            if self.first_us is None:
+                self.first_us = event_us
+            else:
+                self._count_pending(event_us)
+            self.pending_event, self.pending_us = event, event_us
+        return self
+
+    def _count_pending(self, next_us: int):
+        """Accounts for the pending event now that its successor is known."""
+        event = self.pending_event
+        delta_us = next_us - self.pending_us
+        if delta_us < 0:
+            # Arrived later than the reorder buffer could compensate for.
+            self.late_events += 1
+            delta_us = 0
+
+        interval_index = self._buckets.index(self.pending_us - self.start_us, self.total_duration_us)
+        op_type = event['op_type']
+        target = event['target']
+
+        self.target_counts[interval_index][op_type][target] += 1
+        self.inter_arrival_counts[interval_index][delta_us] += 1
+
+        self.targets[target] = None
+        self.client_ids[event['client_id']] = None
+        if op_type not in self.op_semantics:
+            self.op_semantics[op_type] = event['semantic_type']
+
+    def merge(self, other: 'PartialModel') -> 'PartialModel':
+        """Folds in the partial model of the slice that directly follows this one."""
+        if (other.percentage_interval, other.start_us, other.total_duration_us) != \
+                (self.percentage_interval, self.start_us, self.total_duration_us):
+            raise ValueError("Cannot merge partial models built with different intervals or trace bounds.")
+        if other.is_empty:
+            return self
+        if self.is_empty:
+            self.first_us = other.first_us
+        else:
+            self._count_pending(other.first_us)
+
+        for interval_idx, op_data in other.target_counts.items():
+            own_op_data = self.target_counts[interval_idx]
+            for op_type, targets in op_data.items():
+                own_op_data[op_type].update(targets)
+        for interval_idx, deltas in other.inter_arrival_counts.items():
+            self.inter_arrival_counts[interval_idx].update(deltas)
+        for op_type, lengths in other.payload_length_counts.items():
+            self.payload_length_counts[op_type].update(lengths)
+        for op_type, semantic_type in other.op_semantics.items():
+            self.op_semantics.setdefault(op_type, semantic_type)
+        self.targets.update(other.targets)
+        self.client_ids.update(other.client_ids)
+        self.late_events += other.late_events
+
+        self.pending_event, self.pending_us = other.pending_event, other.pending_us
+        return self
+
+    @classmethod
+    def merge_all(cls, partials: Iterable['PartialModel']) -> 'PartialModel':
+        """Merges partial models of disjoint slices, ordering them by their first event."""
+        ordered = sorted(
+            (p for p in partials if not p.is_empty), key=lambda p: p.first_us
+        )
+        if not ordered:
+            raise ValueError("Cannot merge an empty collection of partial models.")
+        merged = ordered[0]
+        for partial in ordered[1:]:
+            merged.merge(partial)
+        return merged
+
+    def finalize(self) -> Dict[str, Any]:
+        """Normalization phase: turns the counts into the heatmap model."""
+        heatmap_probabilities = {}
+        target_probabilities = {}
+        for interval_idx, op_data in self.target_counts.items():
+            op_totals = {op: sum(targets.values()) for op, targets in op_data.items()}
+            total_ops_in_interval = sum(op_totals.values())
+            if total_ops_in_interval > 0:
+                heatmap_probabilities[interval_idx] = {
+                    op: total / total_ops_in_interval for op, total in op_totals.items()
+                }
+
+            target_probabilities[interval_idx] = {}
+            for op_type, targets in op_data.items():
+                total_for_op = op_totals[op_type]
+                if total_for_op > 0:
+                    target_probabilities[interval_idx][op_type] = {
+                        target: count / total_for_op for target, count in targets.items()
+                    }
+
+        inter_arrival_probabilities = {}
+        for interval_idx, deltas in self.inter_arrival_counts.items():
+            total_deltas = sum(deltas.values())
+            inter_arrival_probabilities[interval_idx] = {
+                micros_to_ms(delta_us): count / total_deltas for delta_us, count in deltas.items()
+            }
+
+        payload_length_probabilities = {}
+        for op_type, lengths in self.payload_length_counts.items():
+            total_lengths = sum(lengths.values())
+            payload_length_probabilities[op_type] = {
+                length: count / total_lengths for length, count in sorted(lengths.items())
+            }
+
+        return {
+            "total_duration_ms": micros_to_ms(self.total_duration_us),
+            "op_semantics": self.op_semantics,
+            "heatmap": heatmap_probabilities,
+            "target_probabilities_by_op": target_probabilities,
+            "inter_arrival_probabilities": inter_arrival_probabilities,
+            "payload_length_probabilities": payload_length_probabilities,
+            "initial_resource_pool": list(self.targets),
+            "client_ids": list(self.client_ids) or ["default_client_1"],
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-friendly form, so partial models can be shipped between machines."""
+        return {
+            "percentage_interval": self.percentage_interval,
+            "start_us": self.start_us,
+            "total_duration_us": self.total_duration_us,
+            "target_counts": {
+                str(idx): {op: dict(targets) for op, targets in op_data.items()}
+                for idx, op_data in self.target_counts.items()
+            },
+            "inter_arrival_counts": {
+                str(idx): {str(delta_us): count for delta_us, count in deltas.items()}
+                for idx, deltas in self.inter_arrival_counts.items()
+            },
+            "payload_length_counts": {
+                op: {str(length): count for length, count in lengths.items()}
+                for op, lengths in self.payload_length_counts.items()
+            },
+            "op_semantics": self.op_semantics,
+            "targets": list(self.targets),
+            "client_ids": list(self.client_ids),
+            "late_events": self.late_events,
+            "first_us": self.first_us,
+            "pending_event": self.pending_event,
+            "pending_us": self.pending_us,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PartialModel':
+        partial = cls(data["percentage_interval"], data["start_us"], data["total_duration_us"])
+        for idx, op_data in data["target_counts"].items():
+            for op_type, targets in op_data.items():
+                partial.target_counts[int(idx)][op_type].update(targets)
+        for idx, deltas in data["inter_arrival_counts"].items():
+            partial.inter_arrival_counts[int(idx)].update(
+                {int(delta_us): count for delta_us, count in deltas.items()}
+            )
+        for op_type, lengths in data.get("payload_length_counts", {}).items():
+            partial.payload_length_counts[op_type].update(
+                {int(length): count for length, count in lengths.items()}
+            )
+        partial.op_semantics = dict(data["op_semantics"])
+        partial.targets = dict.fromkeys(data["targets"])
+        partial.client_ids = dict.fromkeys(data["client_ids"])
+        partial.late_events = data["late_events"]
+        partial.first_us = data["first_us"]
+        partial.pending_event = data["pending_event"]
+        partial.pending_us = data["pending_us"]
+        return partial
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> 'PartialModel':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,60 @@
+import random
+from typing import Callable, Generic, List, Sequence, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class AliasSampler(Generic[T]):
+    """
+    Draws values from a fixed discrete distribution in O(1) per draw using
+    Vose's alias method. Building the table is O(k) and happens once.
+    """
+    __slots__ = ('values', '_n', '_prob', '_alias')
+
+    def __init__(self, values: Sequence[T], weights: Sequence[float]):
+        if not values or len(values) != len(weights):
+            raise ValueError("AliasSampler needs one weight per value and at least one value.")
+
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("AliasSampler weights must add up to a positive number.")
+
+        n = len(values)
+        self.values: List[T] = list(values)
+        self._n = n
+        self._prob: List[float] = [0.0] * n
+        self._alias: List[int] = list(range(n))
+
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+
+        # Leftovers are 1.0 up to floating point error.
+        for i in large + small:
+            self._prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def tables(self) -> Tuple[List[float], List[int]]:
+        """The (probability, alias) tables, for vectorized samplers."""
+        return self._prob, self._alias
+
+    def sample(self, rand: Callable[[], float] = random.random) -> T:
+        """Draws one value using a single uniform variate from 'rand'."""
+        u = rand() * self._n
+        i = int(u)
+        if i == self._n:  # (1 - 2**-53) * n can round up to n.
+            i -= 1
+        if u - i < self._prob[i]:
+            return self.values[i]
+        return self.values[self._alias[i]]
@@ -0,0 +1,86 @@
+from typing import Any, Dict, List
+from .compiled_model import CompiledModel
+from .timebase import MICROS_PER_SECOND
+
+
+class SynthesisStats:
+    """
+    Per-bucket throughput bookkeeping of a synthesis run: events emitted and
+    simulated time spent in each percentage bucket, plus the draws that
+    produced nothing. Stats of parallel partitions can be merged; since
+    every partition covers the whole timeline, their times are averaged.
+    """
+
+    def __init__(self, bucket_count: int, partitions: int = 1):
+        """'partitions=0' makes an empty accumulator for merging partition stats."""
+        self.events: List[int] = [0] * bucket_count
+        self.elapsed_us: List[int] = [0] * bucket_count
+        # Model interval and source mean inter-arrival time of each bucket.
+        self.intervals: List[int] = list(range(bucket_count))
+        self.target_delta_us: List[float] = [0.0] * bucket_count
+        # Draws that neither emitted an event nor advanced the clock
+        # (READ/DELETE misses in rejection mode).
+        self.rejected = 0
+        # Times no op of the interval could be applied to the pool
+        # (conditioned mode, or a long run of rejections); the clock moves
+        # on without an event.
+        self.starved = 0
+        self.partitions = partitions
+
+    def record_targets(self, compiled: CompiledModel):
+        """Takes the target rate of every bucket from the compiled model."""
+        for index, interval in enumerate(compiled.intervals[:len(self.events)]):
+            self.intervals[index] = interval.index
+            self.target_delta_us[index] = interval.mean_delta_us
+
+    def merge(self, other: 'SynthesisStats') -> 'SynthesisStats':
+        if len(other.events) != len(self.events):
+            raise ValueError("Cannot merge synthesis stats with different bucket counts.")
+        if self.partitions == 0:
+            self.intervals = list(other.intervals)
+            self.target_delta_us = list(other.target_delta_us)
+        self.events = [a + b for a, b in zip(self.events, other.events)]
+        self.elapsed_us = [a + b for a, b in zip(self.elapsed_us, other.elapsed_us)]
+        self.rejected += other.rejected
+        self.starved += other.starved
+        self.partitions += other.partitions
+        return self
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Achieved vs. target ops/s per bucket. The target rate of a bucket is
+        that of the source trace, 1 / mean inter-arrival time of its interval.
+        """
+        buckets = []
+        total_events = 0
+        total_elapsed_us = 0.0
+        total_target_events = 0.0
+        for index, target_delta_us in enumerate(self.target_delta_us):
+            elapsed_us = self.elapsed_us[index] / self.partitions
+            if elapsed_us <= 0:
+                continue
+            seconds = elapsed_us / MICROS_PER_SECOND
+            target_ops_s = MICROS_PER_SECOND / target_delta_us if target_delta_us > 0 else None
+            achieved_ops_s = self.events[index] / seconds
+            buckets.append({
+                "bucket": index,
+                "interval": self.intervals[index],
+                "seconds": seconds,
+                "events": self.events[index],
+                "target_ops_s": target_ops_s,
+                "achieved_ops_s": achieved_ops_s,
+                "ratio": achieved_ops_s / target_ops_s if target_ops_s else None,
+            })
+            total_events += self.events[index]
+            total_elapsed_us += elapsed_us
+            if target_ops_s:
+                total_target_events += target_ops_s * seconds
+
+        total_seconds = total_elapsed_us / MICROS_PER_SECOND
+        return {
+            "achieved_ops_s": total_events / total_seconds if total_seconds else None,
+            "target_ops_s": total_target_events / total_seconds if total_seconds else None,
+            "rejected_draws": self.rejected,
+            "starved_draws": self.starved,
+            "buckets": buckets,
+        }
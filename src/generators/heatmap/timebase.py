@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+# All heatmap time arithmetic is done on integer microseconds, which also
+# bounds the timestamp precision: seconds_to_micros drops anything finer.
+# RedisParser rejects a timestamp_granularity above 6 decimal places for
+# that reason. The integer math reproduces the bucketing of the former
+# Decimal implementation.
+MICROS_PER_SECOND = 1_000_000
+MICROS_PER_MS = 1000
+
+# Percentages at or above 100% are clamped to these values before bucketing.
+CHARACTERIZATION_MAX_PERCENTAGE = "99.9999999999"
+SYNTHESIS_MAX_PERCENTAGE = "99.999999999999"
+
+
+def seconds_to_micros(seconds: float) -> int:
+    """Converts a timestamp in seconds to integer microseconds."""
+    return round(seconds * MICROS_PER_SECOND)
+
+
+def ms_to_micros(milliseconds: float) -> int:
+    """Converts a duration in milliseconds to integer microseconds."""
+    return round(milliseconds * MICROS_PER_MS)
+
+
+def micros_to_ms(micros: int) -> float:
+    """Converts integer microseconds to (correctly rounded) milliseconds."""
+    return micros / MICROS_PER_MS
+
+
+def micros_to_seconds(micros: int) -> float:
+    """
+    Converts integer microseconds to seconds, going through milliseconds so
+    the result is bit-identical to the former 'float(ms) / 1000.0'.
+    """
+    return (micros / MICROS_PER_MS) / 1000.0
+
+
+class PercentageBuckets:
+    """
+    Maps a position within a span to the index of its percentage interval,
+    i.e. floor((position / span * 100) / percentage_interval), using exact
+    integer arithmetic.
+    """
+
+    def __init__(self, percentage_interval: float, max_percentage: str):
+        interval = Decimal(str(percentage_interval))
+        self._numerator, self._denominator = interval.as_integer_ratio()
+        self._scale = 100 * self._denominator
+        self.last_index = int(Decimal(max_percentage) // interval)
+
+    def index(self, position: int, span: int) -> int:
+        """Interval index of 'position' (0 <= position) within 'span' (> 0)."""
+        if position >= span:
+            return self.last_index
+        if position <= 0:
+            return 0
+        return (position * self._scale) // (span * self._numerator)
+
+    def next_boundary(self, position: int, span: int) -> int:
+        """
+        Smallest position after 'position' that falls in a later interval,
+        capped at 'span'.
+        """
+        next_index = self.index(position, span) + 1
+        # Smallest p with p * scale >= next_index * span * numerator.
+        boundary = -(-next_index * span * self._numerator // self._scale)
+        return min(max(boundary, position + 1), span)
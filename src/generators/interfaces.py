@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from ..models.event_batch import EventBatch
 from ..models.fei import FEIEvent
+from ..parsers.interfaces import IParser
 
 
 class IGenerator(ABC):
@@ -10,5 +12,79 @@ class IGenerator(ABC):
     """
 
     @abstractmethod
-    def generate(self, events: List[FEIEvent]) -> List[FEIEvent]:
-        pass
\ No newline at end of file
+    def generate(
+        self,
+        events: Iterable[FEIEvent],
+        time_bounds: Optional[Tuple[float, float]] = None
+    ) -> List[FEIEvent]:
+        """
+        Builds the synthetic events. When 'time_bounds' (first and last
+        timestamp of the trace) is given, 'events' may be a single-pass
+        iterator in (roughly) timestamp order and is never materialized.
+        'events' may also be an EventBatch, which iterates as FEIEvents.
+        """
+        pass
+
+    def generate_stream(
+        self,
+        events: Iterable[FEIEvent],
+        time_bounds: Optional[Tuple[float, float]] = None
+    ) -> Iterator[FEIEvent]:
+        """
+        Yields the synthetic events as they are produced, so callers can write
+        them out with bounded memory. Strategies that can synthesize lazily
+        should override this; the default just iterates over generate().
+        """
+        yield from self.generate(events, time_bounds=time_bounds)
+
+    def generate_batches(
+        self,
+        events: Iterable[FEIEvent],
+        time_bounds: Optional[Tuple[float, float]] = None,
+        batch_size: int = 65536
+    ) -> Iterator[EventBatch]:
+        """
+        Like generate_stream(), but packs the synthetic events into columnar
+        EventBatches of up to 'batch_size' events sharing their string tables.
+        """
+        batch = EventBatch()
+        for event in self.generate_stream(events, time_bounds=time_bounds):
+            batch.append(event)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = batch.empty_like()
+        if len(batch):
+            yield batch
+
+    def generate_stream_from_file(
+        self,
+        parser: IParser,
+        file_path: str,
+        time_bounds: Optional[Tuple[float, float]] = None
+    ) -> Iterator[FEIEvent]:
+        """
+        Like generate_stream(), but reads the raw log through 'parser' itself,
+        which lets strategies split the file across worker processes.
+        """
+        yield from self.generate_stream(parser.parse(file_path), time_bounds=time_bounds)
+
+    def model_cache_params(self) -> Optional[Dict[str, Any]]:
+        """
+        The settings that, with the parsed input, determine this strategy's
+        characterization model (used to key cached models), or None if it
+        has no model. Strategies returning params load cached models through
+        generate_stream_from_model and pass every model they characterize
+        to self.model_sink when it is set.
+        """
+        return None
+
+    def save_model(self, model: Dict[str, Any], path: str):
+        """Saves a characterization model in the format generate_stream_from_model reads."""
+        raise NotImplementedError(f"{type(self).__name__} does not use a characterization model.")
+
+    def generate_stream_from_model(self, model_file: str) -> Iterator[FEIEvent]:
+        """
+        Synthesizes events from a previously saved characterization model,
+        skipping parsing and characterization altogether.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not use a characterization model.")
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Iterable, List, Optional, Tuple
 from ..interfaces import IGenerator
 from ...models.fei import FEIEvent
 
@@ -8,9 +8,14 @@ class ReplayGenerator(IGenerator):
     A simple pass-through strategy that returns the input event list unchanged.
     """
 
-    def generate(self, events: List[FEIEvent]) -> List[FEIEvent]:
+    def generate(
+        self,
+        events: Iterable[FEIEvent],
+        time_bounds: Optional[Tuple[float, float]] = None
+    ) -> List[FEIEvent]:
         """
         Returns the input list of events without modification.
         """
+        events = list(events)
         print(f"ReplayGenerator: Passing through {len(events)} events.")
         return events
\ No newline at end of file
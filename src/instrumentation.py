@@ -0,0 +1,321 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+PROFILERS = ['cprofile', 'sampling']
+_END = object()
+
+
+def report_path(output_file: str) -> str:
+    """'trace.log' -> 'trace.report.json'."""
+    root, _ = os.path.splitext(output_file)
+    return f"{root}.report.json"
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _StageRecord:
+    __slots__ = ('wall_s', 'cpu_s', 'events', 'peak_rss_bytes', 'started', 'profile', 'samples', 'snapshot', 'allocations')
+
+    def __init__(self):
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.events: Optional[int] = None
+        self.peak_rss_bytes: Optional[int] = None
+        self.started: Optional[Tuple[float, float]] = None
+        self.profile: Optional[cProfile.Profile] = None
+        self.samples: Optional[Counter] = None
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.allocations: Optional[List[Dict[str, Any]]] = None
+
+
+class _Sampler(threading.Thread):
+    """
+    Samples the main thread's Python stack every 'interval_s' and counts
+    the stacks (in the collapsed 'a;b;c' format flame graph tools read)
+    against the stage running at that moment.
+    """
+
+    def __init__(self, instrumentation: 'PipelineInstrumentation', interval_s: float):
+        super().__init__(name='stage-sampler', daemon=True)
+        self.instrumentation = instrumentation
+        self.interval_s = interval_s
+        self.thread_id = threading.main_thread().ident
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval_s):
+            stack = self.instrumentation._stack
+            if not stack:
+                continue
+            record = self.instrumentation._stages[stack[-1]]
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            record.samples[';'.join(reversed(names))] += 1
+
+
+class PipelineInstrumentation:
+    """
+    Per-stage wall and CPU time, event throughput and peak RSS of a
+    pipeline run, plus opt-in per-stage profiles and tracemalloc top
+    allocations.
+
+    Stages nest: while a stage runs inside another (e.g. synthesis pulled
+    by the writer), the outer one is paused, so every stage reports its own
+    time only. Timing is per stage entry, not per event (see iter_stage),
+    and a disabled instance does nothing at all. CPU time is this process'
+    only; worker processes are not included.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        profiler: Optional[str] = None,
+        sampling_interval_s: float = 0.005,
+        tracemalloc_top: int = 0
+    ):
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"profiler must be one of {PROFILERS} or null, not '{profiler}'")
+        self.enabled = enabled
+        self.profiler = profiler if enabled else None
+        self.sampling_interval_s = sampling_interval_s
+        self.tracemalloc_top = tracemalloc_top if enabled else 0
+        self._stages: Dict[str, _StageRecord] = {}
+        # Stages in the order they finished, which is the pipeline order
+        # even when a later stage (the writer) was entered first.
+        self._finished: List[str] = []
+        self._stack: List[str] = []
+        self._started = (time.perf_counter(), time.process_time())
+        self._sampler: Optional[_Sampler] = None
+        if self.tracemalloc_top > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profiler == 'sampling':
+            self._sampler = _Sampler(self, sampling_interval_s)
+            self._sampler.start()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'PipelineInstrumentation':
+        return cls(
+            enabled=config.get('enabled', False),
+            profiler=config.get('profiler'),
+            sampling_interval_s=config.get('sampling_interval_s', 0.005),
+            tracemalloc_top=config.get('tracemalloc_top', 0)
+        )
+
+    def _record(self, name: str) -> _StageRecord:
+        record = self._stages.get(name)
+        if record is None:
+            record = self._stages[name] = _StageRecord()
+            if self.profiler == 'cprofile':
+                record.profile = cProfile.Profile()
+            elif self.profiler == 'sampling':
+                record.samples = Counter()
+            if self.tracemalloc_top > 0:
+                record.snapshot = tracemalloc.take_snapshot()
+        return record
+
+    def _resume(self, record: _StageRecord, now: Tuple[float, float]):
+        record.started = now
+        if record.profile is not None:
+            record.profile.enable()
+
+    def _pause(self, record: _StageRecord, now: Tuple[float, float]):
+        if record.profile is not None:
+            record.profile.disable()
+        record.wall_s += now[0] - record.started[0]
+        record.cpu_s += now[1] - record.started[1]
+        record.started = None
+        peak_rss = _peak_rss_bytes()
+        if peak_rss is not None:
+            record.peak_rss_bytes = max(record.peak_rss_bytes or 0, peak_rss)
+
+    @staticmethod
+    def _now() -> Tuple[float, float]:
+        return time.perf_counter(), time.process_time()
+
+    def _enter(self, name: str):
+        if self._stack:
+            self._pause(self._stages[self._stack[-1]], self._now())
+        # Creating the record may take a tracemalloc snapshot, which is
+        # kept out of every stage's time.
+        record = self._record(name)
+        self._stack.append(name)
+        self._resume(record, self._now())
+
+    def _exit(self, name: str, finished: bool = False):
+        record = self._stages[name]
+        self._pause(record, self._now())
+        self._stack.pop()
+        if finished:
+            self._finish(name, record)
+        if self._stack:
+            self._resume(self._stages[self._stack[-1]], self._now())
+
+    def _finish(self, name: str, record: _StageRecord):
+        """Records what the stage allocated and still holds (tracemalloc_top only)."""
+        if name not in self._finished:
+            self._finished.append(name)
+        if record.snapshot is None:
+            return
+        stats = tracemalloc.take_snapshot().compare_to(record.snapshot, 'lineno')
+        top = [stat for stat in stats if stat.traceback[0].filename != tracemalloc.__file__][:self.tracemalloc_top]
+        record.allocations = [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_bytes": stat.size_diff,
+                "count": stat.count_diff,
+            }
+            for stat in top
+        ]
+        record.snapshot = None
+
+    def add_events(self, name: str, count: int):
+        if self.enabled:
+            record = self._record(name)
+            record.events = (record.events or 0) + count
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measures the block as (part of) stage 'name'."""
+        if not self.enabled:
+            yield
+            return
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit(name, finished=True)
+
+    def iter_stage(
+        self,
+        name: str,
+        items: Iterable[Any],
+        first_item_stage: Optional[str] = None,
+        chunk_size: int = 1024
+    ) -> Iterator[Any]:
+        """
+        Measures the time spent producing 'items' as stage 'name', e.g. a
+        lazy synthetic event stream consumed by the writer. Items are pulled
+        'chunk_size' at a time, so the cost is per chunk, not per item. The
+        time until the first item is ready (e.g. characterization before
+        synthesis starts) can be reported as a separate stage.
+        """
+        if not self.enabled:
+            yield from items
+            return
+
+        iterator = iter(items)
+        # The first item is counted with the first chunk, so the stage's
+        # record is created (and any snapshot taken) inside _enter.
+        pending = 0
+        if first_item_stage is not None:
+            self._enter(first_item_stage)
+            try:
+                first = next(iterator, _END)
+            finally:
+                self._exit(first_item_stage, finished=True)
+            if first is _END:
+                return
+            pending = 1
+            yield first
+
+        chunk: List[Any] = []
+        while True:
+            self._enter(name)
+            try:
+                for item in iterator:
+                    chunk.append(item)
+                    if len(chunk) >= chunk_size:
+                        break
+            finally:
+                self._exit(name, finished=not chunk)
+            self.add_events(name, len(chunk) + pending)
+            pending = 0
+            if not chunk:
+                break
+            yield from chunk
+            chunk.clear()
+
+    def _ordered_stages(self) -> List[Tuple[str, _StageRecord]]:
+        names = self._finished + [name for name in self._stages if name not in self._finished]
+        return [(name, self._stages[name]) for name in names]
+
+    def report(self) -> Dict[str, Any]:
+        wall = time.perf_counter() - self._started[0]
+        cpu = time.process_time() - self._started[1]
+        stages = {}
+        for name, record in self._ordered_stages():
+            stage: Dict[str, Any] = {
+                "wall_s": record.wall_s,
+                "cpu_s": record.cpu_s,
+                "events": record.events,
+                "events_per_s": record.events / record.wall_s if record.events and record.wall_s > 0 else None,
+                "peak_rss_bytes": record.peak_rss_bytes,
+            }
+            if record.allocations is not None:
+                stage["top_allocations"] = record.allocations
+            stages[name] = stage
+        return {
+            "total": {"wall_s": wall, "cpu_s": cpu, "peak_rss_bytes": _peak_rss_bytes()},
+            "profiler": self.profiler,
+            "stages": stages,
+        }
+
+    def write(self, report_file: str) -> Dict[str, Any]:
+        """
+        Writes the JSON report and, with a profiler, one profile per stage
+        next to it ('<report root>.<stage>.prof' for pstats/snakeviz,
+        '<report root>.<stage>.folded' for flame graph tools). Returns the report.
+        """
+        if self._sampler is not None:
+            self._sampler.stopped.set()
+            self._sampler.join()
+        report = self.report()
+        root = report_file[:-len('.json')] if report_file.endswith('.json') else report_file
+        profiles = {}
+        for name, record in self._stages.items():
+            if record.profile is not None:
+                profiles[name] = f"{root}.{name}.prof"
+                record.profile.dump_stats(profiles[name])
+            elif record.samples:
+                profiles[name] = f"{root}.{name}.folded"
+                with open(profiles[name], 'w', encoding='utf-8') as f:
+                    for stack, count in record.samples.most_common():
+                        f.write(f"{stack} {count}\n")
+        if profiles:
+            report["profiles"] = profiles
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        if self.tracemalloc_top > 0:
+            tracemalloc.stop()
+        return report
+
+    def summary_lines(self) -> List[str]:
+        lines = []
+        for name, record in self._ordered_stages():
+            rate = f", {record.events / record.wall_s:,.0f} events/s" if record.events and record.wall_s > 0 else ""
+            lines.append(f"  {name}: {record.wall_s:.3f}s wall, {record.cpu_s:.3f}s CPU{rate}")
+        return lines
+
@@ -0,0 +1,174 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+from .fei import FEIEvent
+
+
+class StringTable:
+    """Interns strings into dense integer codes (and back)."""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for value in values:
+            self.code_of(value)
+
+    def code_of(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getitem__(self, code: int) -> str:
+        return self.values[code]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class EventBatch:
+    """
+    Columnar, dictionary-encoded store of FEI events.
+
+    Timestamps live in a float64 array; op types, client ids and targets are
+    integer codes into string tables that can be shared between the batches
+    of one stream; the raw arguments of all events are concatenated in one
+    byte buffer indexed by offset arrays:
+
+        args of event i:  arg_offsets[arg_starts[i]:arg_starts[i + 1] + 1]
+        bytes of arg j:   arg_buffer[arg_offsets[j]:arg_offsets[j + 1]]
+
+    All columns are 'array' objects, so they pickle compactly and can be
+    wrapped without copying by numpy.frombuffer. Iterating a batch yields
+    ordinary FEIEvent dicts, built on demand; only the 'raw_args' entry of
+    additional_data is kept.
+    """
+
+    def __init__(
+        self,
+        op_types: Optional[StringTable] = None,
+        client_ids: Optional[StringTable] = None,
+        targets: Optional[StringTable] = None,
+        op_semantics: Optional[Dict[str, List[str]]] = None
+    ):
+        self.op_types = op_types if op_types is not None else StringTable()
+        self.client_ids = client_ids if client_ids is not None else StringTable()
+        self.targets = targets if targets is not None else StringTable()
+        self.op_semantics = op_semantics if op_semantics is not None else {}
+
+        self.timestamps = array('d')
+        self.op_codes = array('I')
+        self.client_codes = array('I')
+        self.target_codes = array('I')
+        self.arg_starts = array('Q', [0])
+        self.arg_offsets = array('Q', [0])
+        self.arg_buffer = bytearray()
+
+    @classmethod
+    def from_events(cls, events: Iterable[FEIEvent]) -> 'EventBatch':
+        batch = cls()
+        batch.extend_events(events)
+        return batch
+
+    @classmethod
+    def concat(cls, batches: Iterable['EventBatch']) -> 'EventBatch':
+        """Concatenates batches into one, sharing the tables of the first."""
+        result = None
+        for batch in batches:
+            if result is None:
+                result = batch.empty_like()
+            result.extend(batch)
+        return result if result is not None else cls()
+
+    def empty_like(self) -> 'EventBatch':
+        """An empty batch sharing this batch's string tables."""
+        return EventBatch(self.op_types, self.client_ids, self.targets, self.op_semantics)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, event: FEIEvent):
+        op_type = event['op_type']
+        self.timestamps.append(event['timestamp'])
+        self.op_codes.append(self.op_types.code_of(op_type))
+        self.client_codes.append(self.client_ids.code_of(event['client_id']))
+        self.target_codes.append(self.targets.code_of(event['target']))
+        if op_type not in self.op_semantics:
+            self.op_semantics[op_type] = event['semantic_type']
+
+        buffer = self.arg_buffer
+        offsets = self.arg_offsets
+        for arg in event['additional_data'].get('raw_args', []):
+            buffer += str(arg).encode('utf-8', errors='surrogateescape')
+            offsets.append(len(buffer))
+        self.arg_starts.append(len(offsets) - 1)
+
+    def extend_events(self, events: Iterable[FEIEvent]):
+        for event in events:
+            self.append(event)
+
+    def extend(self, other: 'EventBatch'):
+        """Appends all events of 'other', re-encoding its codes if its tables differ."""
+        self.timestamps.extend(other.timestamps)
+        for codes, table, other_codes, other_table in (
+            (self.op_codes, self.op_types, other.op_codes, other.op_types),
+            (self.client_codes, self.client_ids, other.client_codes, other.client_ids),
+            (self.target_codes, self.targets, other.target_codes, other.targets),
+        ):
+            if table is other_table:
+                codes.extend(other_codes)
+            else:
+                remap = [table.code_of(value) for value in other_table.values]
+                codes.extend(array('I', [remap[code] for code in other_codes]))
+        for op_type, semantic_type in other.op_semantics.items():
+            self.op_semantics.setdefault(op_type, semantic_type)
+
+        arg_count = len(self.arg_offsets) - 1
+        byte_count = len(self.arg_buffer)
+        self.arg_starts.extend(start + arg_count for start in other.arg_starts[1:])
+        self.arg_offsets.extend(offset + byte_count for offset in other.arg_offsets[1:])
+        self.arg_buffer += other.arg_buffer
+
+    def args(self, index: int) -> List[str]:
+        """Decoded raw arguments of event 'index'."""
+        offsets = self.arg_offsets
+        buffer = self.arg_buffer
+        return [
+            buffer[offsets[j]:offsets[j + 1]].decode('utf-8', errors='surrogateescape')
+            for j in range(self.arg_starts[index], self.arg_starts[index + 1])
+        ]
+
+    def event(self, index: int) -> FEIEvent:
+        """Builds the FEIEvent of row 'index'."""
+        op_type = self.op_types[self.op_codes[index]]
+        return FEIEvent(
+            timestamp=self.timestamps[index],
+            client_id=self.client_ids[self.client_codes[index]],
+            op_type=op_type,
+            semantic_type=self.op_semantics[op_type],
+            target=self.targets[self.target_codes[index]],
+            additional_data={'raw_args': self.args(index)}
+        )
+
+    def __getitem__(self, index: int) -> FEIEvent:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("EventBatch index out of range")
+        return self.event(index)
+
+    def __iter__(self) -> Iterator[FEIEvent]:
+        for index in range(len(self)):
+            yield self.event(index)
+
+    def iter_events(self, order: Optional[Sequence[int]] = None) -> Iterator[FEIEvent]:
+        """Yields the events in 'order' (a sequence of row indices), or in row order."""
+        if order is None:
+            yield from self
+            return
+        for index in order:
+            yield self.event(index)
+
+    def timestamp_order(self) -> List[int]:
+        """Row indices sorted by timestamp (stable)."""
+        return sorted(range(len(self)), key=self.timestamps.__getitem__)
@@ -0,0 +1,55 @@
+import random
+from typing import Callable, Dict, Iterator, List
+
+
+class ResourcePool:
+    """
+    Set of live resources (keys) tracked during synthesis, with O(1) add,
+    remove, membership and uniform sampling: the values live in a list and a
+    position map allows removing by swapping with the last element.
+
+    It also supports len() and indexing, so random.choice(pool) works.
+    Iteration order is the list order, which depends on the add/remove
+    history but is deterministic.
+    """
+    __slots__ = ('_values', '_positions')
+
+    def __init__(self):
+        self._values: List[str] = []
+        self._positions: Dict[str, int] = {}
+
+    def add(self, value: str):
+        if value not in self._positions:
+            self._positions[value] = len(self._values)
+            self._values.append(value)
+
+    def remove(self, value: str):
+        """Removes 'value', raising KeyError if it is not in the pool."""
+        position = self._positions.pop(value)
+        last = self._values.pop()
+        if position < len(self._values):
+            self._values[position] = last
+            self._positions[last] = position
+
+    def discard(self, value: str) -> bool:
+        """Removes 'value' if present. Returns whether it was."""
+        if value not in self._positions:
+            return False
+        self.remove(value)
+        return True
+
+    def sample(self, rand: Callable[[], float] = random.random) -> str:
+        """Uniformly random member. The pool must not be empty."""
+        return self._values[int(rand() * len(self._values))]
+
+    def __contains__(self, value: str) -> bool:
+        return value in self._positions
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, index: int) -> str:
+        return self._values[index]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
@@ -0,0 +1,322 @@
+import argparse
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from ..models.fei import FEIEvent
+from ..parsers.interfaces import IParser
+
+# Binary synthetic trace file:
+#
+#   magic | records | payload blob | string offsets | string blob
+#         | JSON footer | footer length (u64) | magic
+#
+# Records are fixed-width, little-endian and start right after the magic:
+#
+#   timestamp (f64) | client (u32) | op (u32) | target (u32) | arg count (u32) | args offset (u64)
+#
+# Client, op and target are indexes into the string table. A record's args
+# are stored back to back at 'args offset' in the payload blob, each prefixed
+# with its length as a LEB128 varint (one byte for args under 128 bytes, which
+# keeps short args cheaper than in the text format). The footer (written
+# last, so the trace can be streamed out without knowing its length) holds
+# the section offsets, the counts and the op semantics. The records and the
+# string offsets are 8-byte aligned, so a reader can mmap the file and read
+# them in place.
+TRACE_MAGIC = b'WGTRACE1'
+RECORD_FORMAT = struct.Struct('<dIIIIQ')
+_ALIGNMENT = 8
+_FOOTER_TAIL = struct.Struct('<Q')
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _encode(value: str) -> bytes:
+    return value.encode('utf-8', errors='surrogateescape')
+
+
+_SHORT_LENGTHS = [bytes((length,)) for length in range(0x80)]
+
+
+def _varint(value: int) -> bytes:
+    if value < 0x80:
+        return _SHORT_LENGTHS[value]
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+class BinaryTraceWriter:
+    """
+    Streams FEI events into a binary trace. Records go straight to the
+    output file; payload bytes are spilled to a temporary file and appended
+    on close(), so memory only grows with the number of distinct strings
+    (clients, ops and targets).
+    """
+
+    def __init__(self, path: str, buffer_bytes: int = 8 * 1024 * 1024):
+        self.path = path
+        self.count = 0
+        self._strings: Dict[str, int] = {}
+        self._op_semantics: Dict[str, List[str]] = {}
+        self._payload_bytes = 0
+        self._pending: List[bytes] = []
+        self._file: BinaryIO = open(path, 'wb', buffering=buffer_bytes)
+        self._file.write(TRACE_MAGIC)
+        directory = os.path.dirname(os.path.abspath(path))
+        self._payload_spill = tempfile.TemporaryFile(dir=directory)
+
+    def _string_id(self, value: str) -> int:
+        string_id = self._strings.get(value)
+        if string_id is None:
+            string_id = self._strings[value] = len(self._strings)
+        return string_id
+
+    def append(self, event: FEIEvent):
+        op_type = event['op_type']
+        if op_type not in self._op_semantics:
+            self._op_semantics[op_type] = event['semantic_type']
+
+        raw_args = event['additional_data'].get('raw_args', [])
+        payload = []
+        for arg in raw_args:
+            encoded = _encode(str(arg))
+            payload.append(_varint(len(encoded)))
+            payload.append(encoded)
+
+        self._pending.append(RECORD_FORMAT.pack(
+            event['timestamp'],
+            self._string_id(event['client_id']),
+            self._string_id(op_type),
+            self._string_id(event['target']),
+            len(raw_args),
+            self._payload_bytes,
+        ))
+        self.count += 1
+        if payload:
+            encoded_args = b''.join(payload)
+            self._payload_spill.write(encoded_args)
+            self._payload_bytes += len(encoded_args)
+        if len(self._pending) >= 4096:
+            self._file.write(b''.join(self._pending))
+            self._pending.clear()
+
+    def write(self, events: Iterable[FEIEvent]) -> int:
+        """Appends all events and closes the trace. Returns the event count."""
+        try:
+            for event in events:
+                self.append(event)
+        finally:
+            self.close()
+        return self.count
+
+    def _pad(self):
+        position = self._file.tell()
+        self._file.write(b'\0' * (_align(position) - position))
+
+    def _copy_spill(self, spill) -> int:
+        spill.seek(0)
+        start = self._file.tell()
+        shutil.copyfileobj(spill, self._file, 1024 * 1024)
+        spill.close()
+        return start
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.write(b''.join(self._pending))
+        self._pending.clear()
+
+        sections: Dict[str, int] = {"records": len(TRACE_MAGIC)}
+        sections["payload"] = self._copy_spill(self._payload_spill)
+
+        string_offsets = array('Q', [0])
+        blobs = []
+        total = 0
+        for value in self._strings:
+            encoded = _encode(value)
+            blobs.append(encoded)
+            total += len(encoded)
+            string_offsets.append(total)
+        if sys.byteorder != 'little':
+            string_offsets.byteswap()
+        self._pad()
+        sections["string_offsets"] = self._file.tell()
+        self._file.write(string_offsets.tobytes())
+        sections["strings"] = self._file.tell()
+        self._file.write(b''.join(blobs))
+
+        footer = json.dumps({
+            "count": self.count,
+            "payload_bytes": self._payload_bytes,
+            "string_count": len(self._strings),
+            "sections": sections,
+            "op_semantics": self._op_semantics,
+        }).encode('utf-8')
+        self._file.write(footer)
+        self._file.write(_FOOTER_TAIL.pack(len(footer)))
+        self._file.write(TRACE_MAGIC)
+        self._file.close()
+
+
+class BinaryTrace:
+    """
+    Read-only view of a binary trace over an mmap. Records and payloads are
+    read in place; iterating yields FEIEvents (strings are decoded once per
+    distinct value, args per event).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = self._mmap
+        if buffer[:len(TRACE_MAGIC)] != TRACE_MAGIC or buffer[-len(TRACE_MAGIC):] != TRACE_MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not a binary trace file.")
+        tail_start = len(buffer) - len(TRACE_MAGIC) - _FOOTER_TAIL.size
+        (footer_length,) = _FOOTER_TAIL.unpack_from(buffer, tail_start)
+        footer = json.loads(buffer[tail_start - footer_length:tail_start])
+
+        self.count: int = footer["count"]
+        self.op_semantics: Dict[str, List[str]] = footer["op_semantics"]
+        sections = footer["sections"]
+        view = memoryview(buffer)
+        self._records = view[sections["records"]:sections["records"] + self.count * RECORD_FORMAT.size]
+        self._payload = view[sections["payload"]:sections["payload"] + footer["payload_bytes"]]
+
+        string_offsets = self._u64_array(view, sections["string_offsets"], footer["string_count"] + 1)
+        strings_start = sections["strings"]
+        self.strings: List[str] = [
+            bytes(view[strings_start + start:strings_start + end]).decode('utf-8', errors='surrogateescape')
+            for start, end in zip(string_offsets, string_offsets[1:])
+        ]
+
+    @staticmethod
+    def _u64_array(view: memoryview, offset: int, count: int):
+        raw = view[offset:offset + count * 8]
+        if sys.byteorder == 'little':
+            return raw.cast('Q')
+        values = array('Q', raw.tobytes())
+        values.byteswap()
+        return values
+
+    def __len__(self) -> int:
+        return self.count
+
+    def records(self) -> Iterator[Tuple[float, int, int, int, int, int]]:
+        """Raw (timestamp, client, op, target, arg count, args offset) tuples, read in place."""
+        return RECORD_FORMAT.iter_unpack(self._records)
+
+    def arg_views(self, args_offset: int, arg_count: int) -> List[memoryview]:
+        """A record's args as memoryviews into the mapped payload (no copies)."""
+        payload = self._payload
+        position = args_offset
+        views = []
+        for _ in range(arg_count):
+            length = payload[position]
+            position += 1
+            if length >= 0x80:
+                length &= 0x7F
+                shift = 7
+                while True:
+                    byte = payload[position]
+                    position += 1
+                    length |= (byte & 0x7F) << shift
+                    if byte < 0x80:
+                        break
+                    shift += 7
+            views.append(payload[position:position + length])
+            position += length
+        return views
+
+    def args(self, args_offset: int, arg_count: int) -> List[str]:
+        return [
+            str(view, 'utf-8', 'surrogateescape')
+            for view in self.arg_views(args_offset, arg_count)
+        ]
+
+    def __iter__(self) -> Iterator[FEIEvent]:
+        strings = self.strings
+        op_semantics = self.op_semantics
+        for timestamp, client, op, target, arg_count, args_offset in self.records():
+            op_type = strings[op]
+            yield FEIEvent(
+                timestamp=timestamp,
+                client_id=strings[client],
+                op_type=op_type,
+                semantic_type=op_semantics[op_type],
+                target=strings[target],
+                additional_data={'raw_args': self.args(args_offset, arg_count)}
+            )
+
+    def close(self):
+        # Views into the mmap must be released before it can be closed.
+        for name in ('_records', '_payload'):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> 'BinaryTrace':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def text_to_binary(parser: IParser, text_path: str, binary_path: str) -> int:
+    """Converts a text trace (in the parser's format) to a binary trace."""
+    return BinaryTraceWriter(binary_path).write(parser.parse(text_path))
+
+
+def binary_to_text(parser: IParser, binary_path: str, text_path: str, batch_size: int = 10000) -> int:
+    """Converts a binary trace back to the parser's text format."""
+    count = 0
+    batch = []
+    with BinaryTrace(binary_path) as trace, open(text_path, 'w', encoding='utf-8', buffering=8 * 1024 * 1024) as f:
+        for event in trace:
+            batch.append(parser.format(event))
+            if len(batch) >= batch_size:
+                f.write('\n'.join(batch) + '\n')
+                count += len(batch)
+                batch.clear()
+        if batch:
+            f.write('\n'.join(batch) + '\n')
+            count += len(batch)
+    return count
+
+
+def main(argv: Optional[List[str]] = None):
+    from ..config_loader import load_config
+    from ..parsers.factory import ParserFactory
+
+    arg_parser = argparse.ArgumentParser(description="Convert synthetic traces between the text and binary formats.")
+    arg_parser.add_argument('direction', choices=['to-binary', 'to-text'])
+    arg_parser.add_argument('source')
+    arg_parser.add_argument('destination')
+    arg_parser.add_argument('--config', default='config.yaml', help="Config whose components.parser reads/writes the text format.")
+    args = arg_parser.parse_args(argv)
+
+    config: Dict[str, Any] = load_config(args.config)
+    parser = ParserFactory().create_parser(config.get('components', {}).get('parser', {}))
+    if args.direction == 'to-binary':
+        count = text_to_binary(parser, args.source, args.destination)
+    else:
+        count = binary_to_text(parser, args.source, args.destination)
+    print(f"Converted {count} events from '{args.source}' to '{args.destination}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import json
+import os
+import re
+from array import array
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Sequence
+from ..models.fei import FEIEvent
+from ..parsers.interfaces import IParser
+from .sharding import manifest_path
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+_MICROS_PER_SECOND = 1_000_000
+
+
+def client_path(output_file: str, index: int, client_id: str) -> str:
+    """'trace.resp' + (3, '0 127.0.0.1:5009') -> 'trace.client-003-0_127.0.0.1_5009.resp'."""
+    root, extension = os.path.splitext(output_file)
+    safe_id = _UNSAFE_FILENAME_CHARS.sub('_', client_id).strip('_')
+    return f"{root}.client-{index:03d}-{safe_id}{extension}"
+
+
+def groups_path(client_file: str) -> str:
+    """'trace.client-003-x.resp' -> 'trace.client-003-x.groups'."""
+    root, _ = os.path.splitext(client_file)
+    return f"{root}.groups"
+
+
+def read_groups(groups_file: str) -> array:
+    """
+    Reads a pipeline group index written by RespTraceWriter: a flat
+    array('Q') of (first timestamp in microseconds, byte offset) pairs.
+    """
+    groups = array('Q')
+    with open(groups_file, 'rb') as f:
+        groups.frombytes(f.read())
+    return groups
+
+
+def pipeline_groups(buffer: bytes, ends: Sequence[int], pipeline_size: int) -> Iterator[memoryview]:
+    """
+    Splits a format_wire() buffer into groups of up to 'pipeline_size'
+    commands, as memoryviews (no copies), e.g. for one socket write each.
+    """
+    view = memoryview(buffer)
+    start = 0
+    for i in range(pipeline_size - 1, len(ends) + pipeline_size - 1, pipeline_size):
+        end = ends[min(i, len(ends) - 1)]
+        yield view[start:end]
+        start = end
+
+
+class RespTraceWriter:
+    """
+    Writes the event stream in the parser's wire protocol (RESP for Redis),
+    split into one file per client_id. Each file can be fed to
+    'redis-cli --pipe' or written to a socket as is, keeping the client's
+    command order.
+
+    The timing of the trace does not survive in RESP, so the manifest next
+    to the files lists, per client, its command count and time range. With
+    pipeline_size > 0, the (first timestamp, byte offset) of every group of
+    pipeline_size commands is streamed to a binary sidecar next to the
+    client's file (see groups_path and read_groups), and the manifest only
+    records its name and group count, so a replayer can send each group as
+    one pipelined write at its scheduled time.
+
+    At most max_open_files client files are open at once (least recently
+    written ones are closed and later reopened for appending), and at most
+    max_buffered_events events are held across all clients before every
+    pending batch is flushed, so traces with thousands of clients stay
+    within the file descriptor limit and bounded memory.
+    """
+
+    def __init__(
+        self,
+        parser: IParser,
+        output_file: str,
+        pipeline_size: int = 0,
+        batch_size: int = 10000,
+        buffer_bytes: int = 8 * 1024 * 1024,
+        max_open_files: int = 256,
+        max_buffered_events: int = 100000
+    ):
+        if pipeline_size < 0:
+            raise ValueError(f"pipeline_size must not be negative: {pipeline_size}")
+        if max_open_files < 1:
+            raise ValueError(f"max_open_files must be at least 1: {max_open_files}")
+        self.parser = parser
+        self.output_file = output_file
+        self.pipeline_size = pipeline_size
+        self.batch_size = batch_size
+        self.buffer_bytes = buffer_bytes
+        self.max_open_files = max_open_files
+        self.max_buffered_events = max(batch_size, max_buffered_events)
+        # Path of each client's file, in order of first appearance.
+        self.paths: Dict[str, str] = {}
+        self._handles: 'OrderedDict[str, BinaryIO]' = OrderedDict()
+
+    def write(self, events: Iterable[FEIEvent]) -> int:
+        """Writes the per-client files and the manifest. Returns the total event count."""
+        clients: Dict[str, Dict[str, Any]] = {}
+        batches: Dict[str, List[FEIEvent]] = {}
+        buffered = 0
+        self.paths = {}
+        try:
+            for event in events:
+                client_id = event['client_id']
+                batch = batches.get(client_id)
+                if batch is None:
+                    path = self.paths[client_id] = client_path(self.output_file, len(clients), client_id)
+                    clients[client_id] = {
+                        "file": os.path.basename(path),
+                        "commands": 0,
+                        "bytes": 0,
+                        "first_timestamp": event['timestamp'],
+                        "last_timestamp": event['timestamp'],
+                    }
+                    if self.pipeline_size:
+                        clients[client_id]["groups_file"] = os.path.basename(groups_path(path))
+                        clients[client_id]["groups"] = 0
+                    batch = batches[client_id] = []
+                batch.append(event)
+                buffered += 1
+                if len(batch) >= self.batch_size:
+                    buffered -= len(batch)
+                    self._flush(client_id, clients[client_id], batch)
+                elif buffered >= self.max_buffered_events:
+                    for pending_id, pending in batches.items():
+                        if pending:
+                            self._flush(pending_id, clients[pending_id], pending)
+                    buffered = 0
+            for client_id, batch in batches.items():
+                if batch:
+                    self._flush(client_id, clients[client_id], batch)
+        finally:
+            for f in self._handles.values():
+                f.close()
+            self._handles.clear()
+
+        self._write_manifest(clients)
+        return sum(client["commands"] for client in clients.values())
+
+    def _file(self, client_id: str, first_write: bool) -> BinaryIO:
+        f = self._handles.get(client_id)
+        if f is not None:
+            self._handles.move_to_end(client_id)
+            return f
+        if len(self._handles) >= self.max_open_files:
+            self._handles.popitem(last=False)[1].close()
+        buffering = max(64 * 1024, self.buffer_bytes // self.max_open_files)
+        f = self._handles[client_id] = open(self.paths[client_id], 'wb' if first_write else 'ab', buffering=buffering)
+        return f
+
+    def _flush(self, client_id: str, client: Dict[str, Any], batch: List[FEIEvent]):
+        ends = array('Q')
+        buffer = self.parser.format_wire(batch, ends)
+        first_write = client["commands"] == 0
+        if self.pipeline_size:
+            groups = array('Q')
+            for i in range(-client["commands"] % self.pipeline_size, len(batch), self.pipeline_size):
+                groups.append(round(batch[i]['timestamp'] * _MICROS_PER_SECOND))
+                groups.append(client["bytes"] + (ends[i - 1] if i else 0))
+            # Only opened for the append, so it never counts against max_open_files.
+            with open(groups_path(self.paths[client_id]), 'wb' if first_write else 'ab') as f:
+                groups.tofile(f)
+            client["groups"] += len(groups) // 2
+        self._file(client_id, first_write=first_write).write(buffer)
+        client["commands"] += len(batch)
+        client["bytes"] += len(buffer)
+        client["last_timestamp"] = batch[-1]['timestamp']
+        batch.clear()
+
+    def _write_manifest(self, clients: Dict[str, Dict[str, Any]]):
+        manifest: Dict[str, Any] = {
+            "output_format": "resp",
+            "pipeline_size": self.pipeline_size,
+            "total_events": sum(client["commands"] for client in clients.values()),
+            "clients": clients,
+        }
+        with open(manifest_path(self.output_file), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
@@ -0,0 +1,165 @@
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+from ..models.fei import FEIEvent
+from ..parsers.interfaces import IParser
+from .binary_trace import BinaryTraceWriter
+
+SHARD_BY_OPTIONS = ['client', 'key']
+OUTPUT_FORMATS = ['text', 'binary']
+
+
+def shard_paths(output_file: str, shard_count: int) -> List[str]:
+    """'trace.log' -> ['trace.shard-00.log', 'trace.shard-01.log', ...]."""
+    root, extension = os.path.splitext(output_file)
+    width = max(2, len(str(shard_count - 1)))
+    return [f"{root}.shard-{i:0{width}d}{extension}" for i in range(shard_count)]
+
+
+def manifest_path(output_file: str) -> str:
+    root, _ = os.path.splitext(output_file)
+    return f"{root}.manifest.json"
+
+
+class ShardedTraceWriter:
+    """
+    Splits a timestamp-ordered event stream into N trace files, so N replay
+    workers can each stream their own shard without coordinating.
+
+    With shard_by='client' every client_id goes to one shard (assigned
+    round-robin in order of first appearance, which balances a handful of
+    clients better than hashing); with shard_by='key' events are split by
+    a stable hash of their target. Each shard keeps the stream's order, and
+    a JSON manifest next to the shards lists their event counts and time
+    ranges (and the client assignment). With output_format='binary' every
+    shard is a binary trace (see binary_trace.py).
+    """
+
+    def __init__(
+        self,
+        parser: IParser,
+        output_file: str,
+        shard_count: int,
+        shard_by: str = 'client',
+        batch_size: int = 10000,
+        buffer_bytes: int = 8 * 1024 * 1024,
+        output_format: str = 'text'
+    ):
+        if shard_count < 1:
+            raise ValueError(f"shard_count must be at least 1: {shard_count}")
+        if shard_by not in SHARD_BY_OPTIONS:
+            raise ValueError(f"shard_by must be one of {SHARD_BY_OPTIONS}, not '{shard_by}'")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"output_format must be one of {OUTPUT_FORMATS}, not '{output_format}'")
+        self.parser = parser
+        self.output_file = output_file
+        self.shard_count = shard_count
+        self.shard_by = shard_by
+        self.batch_size = batch_size
+        self.buffer_bytes = buffer_bytes
+        self.output_format = output_format
+        self.paths = shard_paths(output_file, shard_count)
+        self.client_shards: Dict[str, int] = {}
+
+    def _shard_of(self, event: FEIEvent) -> int:
+        if self.shard_by == 'key':
+            return zlib.crc32(event['target'].encode('utf-8', errors='surrogateescape')) % self.shard_count
+        client_id = event['client_id']
+        shard = self.client_shards.get(client_id)
+        if shard is None:
+            shard = self.client_shards[client_id] = len(self.client_shards) % self.shard_count
+        return shard
+
+    def write(self, events: Iterable[FEIEvent]) -> int:
+        """Writes the shards and the manifest. Returns the total event count."""
+        counts = [0] * self.shard_count
+        first_ts: List[Optional[float]] = [None] * self.shard_count
+        last_ts: List[Optional[float]] = [None] * self.shard_count
+        batches: List[List[str]] = [[] for _ in range(self.shard_count)]
+
+        # The write buffer is split across the shard files.
+        buffering = max(64 * 1024, self.buffer_bytes // self.shard_count)
+        if self.output_format == 'binary':
+            return self._write_binary(events, buffering, counts, first_ts, last_ts)
+        files = [open(path, 'w', encoding='utf-8', buffering=buffering) for path in self.paths]
+        try:
+            for event in events:
+                shard = self._shard_of(event)
+                batch = batches[shard]
+                batch.append(self.parser.format(event))
+                if first_ts[shard] is None:
+                    first_ts[shard] = event['timestamp']
+                last_ts[shard] = event['timestamp']
+                if len(batch) >= self.batch_size:
+                    files[shard].write('\n'.join(batch) + '\n')
+                    counts[shard] += len(batch)
+                    batch.clear()
+            for shard, batch in enumerate(batches):
+                if batch:
+                    files[shard].write('\n'.join(batch) + '\n')
+                    counts[shard] += len(batch)
+        finally:
+            for f in files:
+                f.close()
+
+        self._write_manifest(counts, first_ts, last_ts)
+        return sum(counts)
+
+    def _write_binary(
+        self,
+        events: Iterable[FEIEvent],
+        buffering: int,
+        counts: List[int],
+        first_ts: List[Optional[float]],
+        last_ts: List[Optional[float]]
+    ) -> int:
+        writers: List[BinaryTraceWriter] = []
+        try:
+            for path in self.paths:
+                writers.append(BinaryTraceWriter(path, buffering))
+            for event in events:
+                shard = self._shard_of(event)
+                writers[shard].append(event)
+                if first_ts[shard] is None:
+                    first_ts[shard] = event['timestamp']
+                last_ts[shard] = event['timestamp']
+        finally:
+            for writer in writers:
+                writer.close()
+
+        for shard, writer in enumerate(writers):
+            counts[shard] = writer.count
+        self._write_manifest(counts, first_ts, last_ts)
+        return sum(counts)
+
+    def _write_manifest(self, counts: List[int], first_ts: List[Optional[float]], last_ts: List[Optional[float]]):
+        manifest: Dict[str, Any] = {
+            "shard_by": self.shard_by,
+            "output_format": self.output_format,
+            "shard_count": self.shard_count,
+            "total_events": sum(counts),
+            "shards": [
+                {
+                    "file": os.path.basename(path),
+                    "events": count,
+                    "first_timestamp": first,
+                    "last_timestamp": last,
+                }
+                for path, count, first, last in zip(self.paths, counts, first_ts, last_ts)
+            ],
+        }
+        if self.shard_by == 'client':
+            manifest["client_shards"] = self.client_shards
+        with open(manifest_path(self.output_file), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+
+def read_manifest(output_file: str) -> Dict[str, Any]:
+    """Loads the manifest of a sharded trace, with shard file names made absolute."""
+    with open(manifest_path(output_file), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    directory = os.path.dirname(os.path.abspath(output_file))
+    for shard in manifest["shards"]:
+        shard["file"] = os.path.join(directory, shard["file"])
+    return manifest
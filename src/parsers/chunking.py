@@ -0,0 +1,38 @@
+import os
+from typing import List, Tuple
+
+
+def split_newline_aligned(file_path: str, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """
+    Splits a file into [start, end) byte ranges of roughly 'chunk_bytes' each,
+    with every boundary placed right after a newline so no line is cut.
+    """
+    if chunk_bytes <= 0:
+        raise ValueError(f"chunk_bytes must be positive: {chunk_bytes}")
+
+    file_size = os.path.getsize(file_path)
+    ranges = []
+    start = 0
+    with open(file_path, 'rb') as f:
+        while start < file_size:
+            f.seek(min(start + chunk_bytes, file_size))
+            f.readline()
+            end = min(f.tell(), file_size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_lines_in_range(file_path: str, start: int, end: int) -> List[str]:
+    """
+    Reads the lines in a newline-aligned byte range, splitting them the same
+    way text-mode file iteration does (universal newlines).
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    text = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+    lines = text.split('\n')
+    if lines and lines[-1] == '':
+        lines.pop()
+    return lines
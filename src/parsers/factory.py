@@ -13,7 +13,19 @@ class ParserFactory:
             from .redis.redis_parser import RedisParser
 
             granularity = config.get('timestamp_granularity', 6)
-            return RedisParser(timestamp_granularity=granularity)
+            unescape_args = config.get('unescape_args', False)
+            workers = config.get('workers', 1)
+            chunk_bytes = config.get('chunk_bytes', 8 * 1024 * 1024)
+            payload_arena_bytes = config.get('payload_arena_bytes', 4 * 1024 * 1024)
+            payload_refs = config.get('payload_refs', False)
+            return RedisParser(
+                timestamp_granularity=granularity,
+                unescape_args=unescape_args,
+                parse_workers=workers,
+                parse_chunk_bytes=chunk_bytes,
+                payload_arena_bytes=payload_arena_bytes,
+                payload_refs=payload_refs
+            )
 
         """ Example for future parsers:
         if parser_type == 'mongodb':
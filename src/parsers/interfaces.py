@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import Iterator, List
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from ..models.event_batch import EventBatch
 from ..models.fei import FEIEvent
+from ..models.resource_pool import ResourcePool
 
 
 class IParser(ABC):
@@ -14,12 +17,92 @@ class IParser(ABC):
         """Reads a raw log file and yields a stream of FEIEvent objects."""
         pass
 
+    def parse_batches(self, file_path: str, batch_size: int = 65536) -> Iterator[EventBatch]:
+        """
+        Reads a raw log file as a stream of columnar EventBatches of up to
+        'batch_size' events, in file order. The default packs the output of
+        parse(); the batches share their string tables.
+        """
+        batch = EventBatch()
+        for event in self.parse(file_path):
+            batch.append(event)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = batch.empty_like()
+        if len(batch):
+            yield batch
+
+    def parse_range(self, file_path: str, start: int, end: int) -> Iterator[FEIEvent]:
+        """
+        Yields the events of the newline-aligned byte range [start, end) of a
+        raw log file. Needed by stages that split a file across processes.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support parsing byte ranges.")
+
+    def cache_params(self) -> Optional[Dict[str, Any]]:
+        """
+        The settings that, with the input file, determine the parsed events
+        (used to key cached parse results), or None to never cache them.
+        Settings that only affect speed must be left out.
+        """
+        return None
+
     @abstractmethod
     def format(self, event: FEIEvent) -> str:
         """Takes a single FEIEvent and formats it into a raw log line string."""
         pass
 
+    def format_batch(self, batch: EventBatch) -> List[str]:
+        """Formats every event of an EventBatch, in row order."""
+        return [self.format(event) for event in batch]
+
+    def format_wire(self, events: Sequence[FEIEvent], ends: Optional[array] = None) -> bytes:
+        """
+        Encodes 'events' in the target system's wire protocol, one command
+        per event, as a single buffer ready to be written to a socket or a
+        file. If 'ends' is given, the end offset of each command in the
+        buffer is appended to it (to split it into pipeline groups).
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support wire-protocol output.")
+
     @abstractmethod
-    def generate_args(self, op_type: str, target: str, available_pool: List[str]) -> List[str]:
-        """Generates a list of synthetic raw arguments for a given operation type."""
-        pass
\ No newline at end of file
+    def generate_args(self, op_type: str, target: str, available_pool: ResourcePool) -> List[str]:
+        """
+        Generates a list of synthetic raw arguments for a given operation type.
+        'available_pool' holds the live resources; it is the generator's own
+        pool (not a copy), so it must not be modified.
+        """
+        pass
+
+    def payload_lengths(self, event: FEIEvent) -> List[int]:
+        """
+        Lengths of the payload arguments of a parsed event, i.e. the ones
+        generate_args fills with synthetic data. Generators count them to
+        learn realistic payload sizes. The default reports none.
+        """
+        return []
+
+    def set_payload_lengths(self, distribution: Dict[str, Dict[int, float]]):
+        """
+        Makes generate_args draw payload sizes from 'distribution'
+        ({op_type: {length: probability}}), as learned from payload_lengths.
+        Called before each synthesis run. The default ignores it.
+        """
+        pass
+
+    def read_time_bounds(self, file_path: str) -> Tuple[float, float]:
+        """
+        Returns the (first, last) event timestamps of a raw log file.
+        The default implementation scans the whole stream once; parsers
+        should override it with something cheaper when the format allows.
+        """
+        start_ts = end_ts = None
+        for event in self.parse(file_path):
+            ts = event['timestamp']
+            if start_ts is None or ts < start_ts:
+                start_ts = ts
+            if end_ts is None or ts > end_ts:
+                end_ts = ts
+        if start_ts is None:
+            raise ValueError(f"No events found in '{file_path}'.")
+        return start_ts, end_ts
@@ -0,0 +1,88 @@
+import random
+import string
+from typing import Union
+
+# Printable ASCII with '"' mapped to "'", '\\' to '/' and ' ' to '_', so
+# payloads never need MONITOR escaping: they read back unchanged whether or
+# not the parser unescapes arguments.
+PAYLOAD_ALPHABET = (
+    string.ascii_letters + string.digits + string.punctuation + ' '
+).replace('"', "'").replace('\\', '/').replace(' ', '_')
+
+
+class PayloadRef:
+    """
+    A lazy payload: a slice of an arena chunk that is only turned into a str
+    when formatted. The chunk is immutable, so refilling the arena never
+    invalidates outstanding references.
+    """
+    __slots__ = ('chunk', 'start', 'length')
+
+    def __init__(self, chunk: bytes, start: int, length: int):
+        self.chunk = chunk
+        self.start = start
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __str__(self) -> str:
+        return self.chunk[self.start:self.start + self.length].decode('ascii')
+
+    def __repr__(self) -> str:
+        return f"PayloadRef({str(self)!r})"
+
+    def __eq__(self, other) -> bool:
+        return str(self) == str(other)
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __reduce__(self):
+        # Materialize when pickled (e.g. sent between synthesis processes)
+        # rather than shipping the whole arena chunk along.
+        return (str, (str(self),))
+
+
+class PayloadArena:
+    """
+    Hands out random payload strings as consecutive slices of a large
+    pre-generated buffer. The buffer is filled in one go from the (seedable)
+    'random' module and mapped onto PAYLOAD_ALPHABET with bytes.translate,
+    rejecting the high bytes that would bias the mapping.
+    """
+
+    def __init__(self, size_bytes: int = 4 * 1024 * 1024, lazy: bool = False):
+        if size_bytes <= 0:
+            raise ValueError(f"size_bytes must be positive: {size_bytes}")
+        self.size_bytes = size_bytes
+        # When lazy, take() returns PayloadRef objects instead of strings.
+        self.lazy = lazy
+
+        alphabet = PAYLOAD_ALPHABET.encode('ascii')
+        usable = 256 - 256 % len(alphabet)
+        self._table = bytes(alphabet[b % len(alphabet)] for b in range(256))
+        self._rejected = bytes(range(usable, 256))
+        self._chunk = b''
+        self._position = 0
+
+    def _refill(self, min_bytes: int):
+        target = max(self.size_bytes, min_bytes)
+        parts = []
+        filled = 0
+        while filled < target:
+            part = random.randbytes(target - filled + 64).translate(self._table, self._rejected)
+            parts.append(part)
+            filled += len(part)
+        self._chunk = b''.join(parts)
+        self._position = 0
+
+    def take(self, length: int) -> Union[str, PayloadRef]:
+        """Returns the next 'length' random payload characters."""
+        if self._position + length > len(self._chunk):
+            self._refill(length)
+        start = self._position
+        self._position += length
+        if self.lazy:
+            return PayloadRef(self._chunk, start, length)
+        return self._chunk[start:start + length].decode('ascii')
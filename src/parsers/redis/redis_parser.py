@@ -1,10 +1,19 @@
+import bisect
+import codecs
+import os
 import random
 import re
-import string
 import sys
-from typing import Iterator, List, Optional
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from ...models.event_batch import EventBatch
 from ...models.fei import FEIEvent
+from ...models.resource_pool import ResourcePool
+from ..chunking import read_lines_in_range, split_newline_aligned
 from ..interfaces import IParser
+from .payload_arena import PayloadArena
 
 
 class RedisParser(IParser):
@@ -24,37 +33,88 @@ class RedisParser(IParser):
         "CLIENT":  ["READ"],
     }
     _DEFAULT_SEMANTIC_TYPE = ["READ"]
+    # Bytes read from each end of the file to find the trace time bounds.
+    # Large enough to cover the reorder window of a MONITOR capture.
+    _BOUNDS_PROBE_BYTES = 1 << 20
+    # One double-quoted argument: runs of plain characters and backslash
+    # escapes (so an escaped '\"' never closes the argument).
+    _QUOTED_ARG_REGEX = re.compile(r'"([^"\\]*(?:\\.[^"\\]*)*)"', re.DOTALL)
+    _BYTE_ESCAPES = [
+        {0x22: '\\"', 0x5c: '\\\\', 0x0a: '\\n', 0x0d: '\\r', 0x09: '\\t', 0x07: '\\a', 0x08: '\\b'}.get(
+            b, chr(b) if 0x20 <= b < 0x7f else f'\\x{b:02x}'
+        )
+        for b in range(256)
+    ]
 
-    def __init__(self, timestamp_granularity: int):
+    def __init__(
+        self,
+        timestamp_granularity: int,
+        unescape_args: bool = False,
+        parse_workers: int = 1,
+        parse_chunk_bytes: int = 8 * 1024 * 1024,
+        payload_arena_bytes: int = 4 * 1024 * 1024,
+        payload_refs: bool = False
+    ):
+        if not (0 <= timestamp_granularity <= 6):
+            # Synthesis keeps time in integer microseconds (see timebase.py).
+            raise ValueError(f"timestamp_granularity must be between 0 and 6 decimal places: {timestamp_granularity}")
+        if parse_workers < 1:
+            raise ValueError(f"parse_workers must be at least 1: {parse_workers}")
+        if payload_arena_bytes <= 0:
+            raise ValueError(f"payload_arena_bytes must be positive: {payload_arena_bytes}")
         self.timestamp_granularity = timestamp_granularity
+        # When enabled, arguments are decoded from MONITOR's escaped
+        # representation on parse and re-escaped on format.
+        self.unescape_args = unescape_args
+        # With more than one worker, parse() splits the file into chunks of
+        # roughly parse_chunk_bytes and parses them on a process pool.
+        self.parse_workers = parse_workers
+        self.parse_chunk_bytes = parse_chunk_bytes
+        # Synthetic payloads are sliced out of a pre-generated arena. With
+        # payload_refs, generate_args returns lazy references that are only
+        # turned into strings by format().
+        self.payload_arena_bytes = payload_arena_bytes
+        self.payload_refs = payload_refs
+        self._payload_arena = PayloadArena(payload_arena_bytes, lazy=payload_refs)
+        # Learned payload sizes per op: (lengths, cumulative weights).
+        self._payload_length_tables: Dict[str, Tuple[List[int], List[float]]] = {}
+        # RESP bulk strings of the op names, e.g. b'$3\r\nSET\r\n'.
+        self._resp_op_bulks: Dict[str, bytes] = {}
 
     def _parse_command_args(self, command_str: str) -> List[str]:
         """
-        Parses a raw command string by splitting arguments only when a
-        double-quote is followed by a space, treating content as raw.
+        Parses a raw command string into its double-quoted arguments, with
+        their content kept raw (MONITOR escapes included).
+
+        A double-quote only closes an argument when it is not escaped, so a
+        value rendered as "a\\" " (MONITOR's form of 'a" ') stays one
+        argument. Text between arguments is ignored, and an unterminated
+        last argument (e.g. a line cut off at the end of a capture) is
+        dropped.
         """
-        args = []
-        current_arg = ""
-        in_quotes = False
-        i = 0
-        while i < len(command_str):
-            char = command_str[i]
-
-            if not in_quotes:
-                if char == '"':
-                    in_quotes = True
-                i += 1
-                continue
+        args = self._QUOTED_ARG_REGEX.findall(command_str)
 
-            if char == '"' and (i + 1 == len(command_str) or (command_str[i+1].isspace() and command_str[i+2] == '"')):
-                in_quotes = False
-                args.append(current_arg)
-                current_arg = ""
-            else:
-                current_arg += char
-            i += 1
+        if self.unescape_args:
+            args = [self._unescape_arg(arg) if '\\' in arg else arg for arg in args]
         return args
 
+    @staticmethod
+    def _unescape_arg(arg: str) -> str:
+        """
+        Decodes the backslash escapes MONITOR emits for quotes, backslashes,
+        control characters and raw bytes (\\xHH) back into the original value.
+        """
+        raw_bytes = codecs.escape_decode(arg.encode('utf-8'))[0]
+        return raw_bytes.decode('utf-8', errors='surrogateescape')
+
+    @classmethod
+    def _escape_arg(cls, arg: str) -> str:
+        """Inverse of _unescape_arg, following Redis' sdscatrepr rules."""
+        if arg.isascii() and arg.isprintable() and '"' not in arg and '\\' not in arg:
+            return arg
+        raw_bytes = arg.encode('utf-8', errors='surrogateescape')
+        return ''.join([cls._BYTE_ESCAPES[byte] for byte in raw_bytes])
+
     def _parse_line_to_fei(self, line: str) -> Optional[FEIEvent]:
         match = self._LOG_LINE_REGEX.match(line.strip())
         if not match:
@@ -94,9 +154,24 @@ class RedisParser(IParser):
         raw_args = all_args[2:]
         return target, raw_args
 
+    def cache_params(self) -> Optional[Dict[str, Any]]:
+        return {
+            "type": "redis",
+            "timestamp_granularity": self.timestamp_granularity,
+            "unescape_args": self.unescape_args,
+        }
+
+    def _arg_quoter(self) -> Callable[[str], str]:
+        if self.unescape_args:
+            def escape_arg(arg: str) -> str:
+                return f'"{self._escape_arg(arg)}"'
+        else:
+            def escape_arg(arg: str) -> str:
+                return f'"{arg}"'
+        return escape_arg
+
     def format(self, event: FEIEvent) -> str:
-        def escape_arg(arg: str) -> str:
-            return f'"{arg}"'
+        escape_arg = self._arg_quoter()
 
         command_parts = [escape_arg(event["op_type"]), escape_arg(event["target"])]
         raw_args = event['additional_data'].get('raw_args', [])
@@ -107,30 +182,112 @@ class RedisParser(IParser):
         
         return f"{event['timestamp']:.{self.timestamp_granularity}f} [{event['client_id']}] {full_command}"
 
-    def generate_args(self, op_type: str, target: str, available_pool: List[str]) -> List[str]:
+    def format_batch(self, batch: EventBatch) -> List[str]:
+        """Formats straight from the batch columns, without building FEIEvents."""
+        escape_arg = self._arg_quoter()
+        granularity = self.timestamp_granularity
+        quoted_ops = [escape_arg(op_type) for op_type in batch.op_types.values]
+        client_ids = batch.client_ids.values
+        targets = batch.targets.values
+
+        lines = []
+        for i, timestamp in enumerate(batch.timestamps):
+            command_parts = [quoted_ops[batch.op_codes[i]], escape_arg(targets[batch.target_codes[i]])]
+            command_parts.extend([escape_arg(arg) for arg in batch.args(i)])
+            lines.append(f"{timestamp:.{granularity}f} [{client_ids[batch.client_codes[i]]}] {' '.join(command_parts)}")
+        return lines
+
+    def format_wire(self, events: Sequence[FEIEvent], ends: Optional[array] = None) -> bytes:
+        """
+        Encodes the events as RESP arrays of bulk strings (the format
+        'redis-cli --pipe' reads), joined into a single buffer. Args are
+        sent as they are held, like the text format prints them (so with
+        unescape_args off, MONITOR escapes are sent literally).
+        """
+        op_bulks = self._resp_op_bulks
+        commands: List[bytes] = []
+        offset = 0
+        for event in events:
+            op_type = event['op_type']
+            op_bulk = op_bulks.get(op_type)
+            if op_bulk is None:
+                encoded_op = op_type.encode('utf-8', errors='surrogateescape')
+                op_bulk = op_bulks[op_type] = b'$%d\r\n%s\r\n' % (len(encoded_op), encoded_op)
+            raw_args = event['additional_data'].get('raw_args', [])
+            encoded_args = [str(arg).encode('utf-8', errors='surrogateescape') for arg in (event['target'], *raw_args)]
+            command = b'*%d\r\n%s%s' % (
+                len(encoded_args) + 1,
+                op_bulk,
+                b''.join([b'$%d\r\n%s\r\n' % (len(arg), arg) for arg in encoded_args])
+            )
+            commands.append(command)
+            if ends is not None:
+                offset += len(command)
+                ends.append(offset)
+        return b''.join(commands)
+
+    def generate_args(self, op_type: str, target: str, available_pool: ResourcePool) -> List[str]:
         """Generates realistic synthetic arguments for Redis commands."""
         if op_type == "HMSET":
             num_fields = random.randint(1, 10)
             fields = [f"field{j}" for j in range(num_fields)]
-            values = [self._generate_thrash_string(50) for _ in range(num_fields)]
+            values = [self._generate_thrash_string(self._payload_length(op_type, 50)) for _ in range(num_fields)]
             return [item for pair in zip(fields, values) for item in pair]
         elif op_type == "SET":
-            return [self._generate_thrash_string(100)]
+            return [self._generate_thrash_string(self._payload_length(op_type, 100))]
         elif op_type == "ZADD":
             if not available_pool:
                 return []
-            member = random.choice(available_pool)
+            member = available_pool.sample()
             score = f"{random.uniform(-1e9, 1e9):.8E}"
             return [score, member]
         return []
 
+    def payload_lengths(self, event: FEIEvent) -> List[int]:
+        """HMSET values and the SET value are the payloads generate_args synthesizes."""
+        op_type = event['op_type']
+        if op_type == "HMSET":
+            return [len(value) for value in event['additional_data']['raw_args'][1::2]]
+        elif op_type == "SET":
+            return [len(value) for value in event['additional_data']['raw_args'][:1]]
+        return []
+
+    def set_payload_lengths(self, distribution: Dict[str, Dict[int, float]]):
+        tables = {}
+        for op_type, probabilities in distribution.items():
+            lengths = list(probabilities)
+            cumulative = []
+            total = 0.0
+            for length in lengths:
+                total += probabilities[length]
+                cumulative.append(total)
+            if lengths:
+                tables[op_type] = (lengths, cumulative)
+        self._payload_length_tables = tables
+        # Start a fresh arena, so it is filled from the RNG stream of the run
+        # (and of each synthesis worker) rather than inherited from a parent.
+        self._payload_arena = PayloadArena(self.payload_arena_bytes, lazy=self.payload_refs)
+
+    def _payload_length(self, op_type: str, default: int) -> int:
+        table = self._payload_length_tables.get(op_type)
+        if table is None:
+            return default
+        lengths, cumulative = table
+        # What random.choices(lengths, cum_weights=cumulative) does (same
+        # draw, same result), without its per-call argument handling.
+        return lengths[bisect.bisect(cumulative, random.random() * cumulative[-1], 0, len(lengths) - 1)]
+
     def _generate_thrash_string(self, length: int) -> str:
-        """Generates a random string, allowing all characters."""
-        chars = string.ascii_letters + string.digits + string.punctuation + ' '
-        return ''.join(random.choice(chars) for _ in range(length)).replace('"', "'").replace(' ', '_')
+        """Returns a random string of printable characters, taken from the payload arena."""
+        return self._payload_arena.take(length)
 
     def parse(self, file_path: str) -> Iterator[FEIEvent]:
         """Reads a log file and yields a stream of FEIEvent objects."""
+        if self.parse_workers > 1:
+            for chunk_events in self.parse_chunks(file_path):
+                yield from chunk_events
+            return
+
         with open(file_path, 'r', encoding='utf-8') as f:
             for line_num, line in enumerate(f, 1):
                 if not line.strip():
@@ -139,4 +296,110 @@ class RedisParser(IParser):
                 if event:
                     yield event
                 else:
-                    print(f"[WARN] Line {line_num} was skipped due to parsing error.", file=sys.stderr)
\ No newline at end of file
+                    print(f"[WARN] Line {line_num} was skipped due to parsing error.", file=sys.stderr)
+
+    def parse_chunks(self, file_path: str) -> Iterator[List[FEIEvent]]:
+        """
+        Parses the file in newline-aligned byte ranges on a process pool and
+        yields one list of events per range, in file order. At most two
+        ranges per worker are in flight, which bounds memory use.
+        """
+        yield from self._map_ranges(file_path, self._parse_range)
+
+    def parse_batches(self, file_path: str, batch_size: int = 65536) -> Iterator[EventBatch]:
+        """
+        With several workers, each worker packs its byte range into one
+        EventBatch, which is much cheaper to send back than a list of dicts.
+        Batches from different workers have their own string tables.
+        """
+        if self.parse_workers <= 1:
+            yield from super().parse_batches(file_path, batch_size)
+            return
+        yield from self._map_ranges(file_path, self._parse_range_batch)
+
+    def _map_ranges(self, file_path: str, parse_range: Callable[[str, int, int], Tuple[Any, int, List[int]]]) -> Iterator[Any]:
+        ranges = split_newline_aligned(file_path, self.parse_chunk_bytes)
+        max_in_flight = 2 * self.parse_workers
+        lines_before = 0
+
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as executor:
+            pending: Deque[Future] = deque()
+            next_range = 0
+            while pending or next_range < len(ranges):
+                while next_range < len(ranges) and len(pending) < max_in_flight:
+                    start, end = ranges[next_range]
+                    pending.append(executor.submit(parse_range, file_path, start, end))
+                    next_range += 1
+
+                chunk_events, line_count, skipped_lines = pending.popleft().result()
+                for local_line_num in skipped_lines:
+                    print(f"[WARN] Line {lines_before + local_line_num} was skipped due to parsing error.", file=sys.stderr)
+                lines_before += line_count
+                yield chunk_events
+
+    def parse_range(self, file_path: str, start: int, end: int) -> Iterator[FEIEvent]:
+        """Parses the newline-aligned byte range [start, end) of a log file."""
+        events, _, skipped_lines = self._parse_range(file_path, start, end)
+        if skipped_lines:
+            print(f"[WARN] {len(skipped_lines)} lines in bytes [{start}, {end}) were skipped due to parsing errors.", file=sys.stderr)
+        yield from events
+
+    def _parse_range(self, file_path: str, start: int, end: int) -> Tuple[List[FEIEvent], int, List[int]]:
+        """
+        Worker side of parse_chunks. Returns the parsed events, the number of
+        lines in the range and the (1-based, range-local) skipped line numbers.
+        """
+        lines = read_lines_in_range(file_path, start, end)
+        events = []
+        skipped_lines = []
+        for line_num, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            event = self._parse_line_to_fei(line)
+            if event:
+                events.append(event)
+            else:
+                skipped_lines.append(line_num)
+        return events, len(lines), skipped_lines
+
+    def _parse_range_batch(self, file_path: str, start: int, end: int) -> Tuple[EventBatch, int, List[int]]:
+        """Worker side of parse_batches: like _parse_range, packed into an EventBatch."""
+        events, line_count, skipped_lines = self._parse_range(file_path, start, end)
+        return EventBatch.from_events(events), line_count, skipped_lines
+
+    def read_time_bounds(self, file_path: str) -> Tuple[float, float]:
+        """
+        Finds the first and last event timestamps by reading only the head
+        and the tail of the file. MONITOR lines may be slightly out of order,
+        so the min/max over each probed block is used.
+        """
+        file_size = os.path.getsize(file_path)
+        with open(file_path, 'rb') as f:
+            head = f.read(self._BOUNDS_PROBE_BYTES)
+            tail_offset = max(0, file_size - self._BOUNDS_PROBE_BYTES)
+            f.seek(tail_offset)
+            tail = f.read()
+
+        head_lines = head.split(b'\n')
+        if len(head) < file_size:
+            head_lines = head_lines[:-1]  # Drop the partial last line.
+        tail_lines = tail.split(b'\n')
+        if tail_offset > 0:
+            tail_lines = tail_lines[1:]  # Drop the partial first line.
+
+        head_ts = self._timestamps_of(head_lines)
+        tail_ts = self._timestamps_of(tail_lines)
+        if not head_ts or not tail_ts:
+            raise ValueError(f"No events found in the head or tail of '{file_path}'.")
+        return min(head_ts), max(tail_ts)
+
+    def _timestamps_of(self, raw_lines: Iterable[bytes]) -> List[float]:
+        timestamps = []
+        for raw_line in raw_lines:
+            line = raw_line.decode('utf-8', errors='replace')
+            if not line.strip():
+                continue
+            event = self._parse_line_to_fei(line)
+            if event:
+                timestamps.append(event['timestamp'])
+        return timestamps
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+from .models.event_batch import EventBatch
+
+# Bumped whenever the layout of a cached artifact changes.
+_CACHE_VERSION = 1
+_DIGEST_INDEX = 'inputs.json'
+
+
+class StageCache:
+    """
+    Content-addressed on-disk cache of pipeline artifacts (parsed events,
+    characterization models).
+
+    An entry is named after a hash of the input file's contents and of the
+    settings the artifact depends on, so a changed trace or setting is a
+    miss and never a stale hit. File digests are remembered per path, size
+    and mtime, so an unchanged input is only hashed once. Every hit touches
+    its entry; when the cache grows past max_bytes the least recently used
+    entries are removed.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 ** 3):
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be positive: {max_bytes}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['StageCache']:
+        """The cache described by pipeline.stage_cache, or None if it is disabled."""
+        if not config.get('enabled', False):
+            return None
+        return cls(config.get('directory', 'logs/.stage_cache'), config.get('max_bytes', 2 * 1024 ** 3))
+
+    def input_digest(self, file_path: str) -> str:
+        """SHA-1 of the file's contents (cached per path, size and mtime)."""
+        stat = os.stat(file_path)
+        path = os.path.abspath(file_path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        index = self._read_digest_index()
+        entry = index.get(path)
+        if entry is not None and entry["signature"] == signature:
+            return entry["digest"]
+
+        digest = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(8 * 1024 * 1024), b''):
+                digest.update(block)
+        index[path] = {"signature": signature, "digest": digest.hexdigest()}
+        self._write_json(os.path.join(self.directory, _DIGEST_INDEX), index)
+        return index[path]["digest"]
+
+    def _read_digest_index(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.directory, _DIGEST_INDEX), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_json(self, path: str, value: Any):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def key(stage: str, input_digest: str, params: Dict[str, Any]) -> str:
+        """Key of a stage's artifact for an input file and the settings it depends on."""
+        identity = json.dumps(
+            {"version": _CACHE_VERSION, "stage": stage, "input": input_digest, "params": params},
+            sort_keys=True
+        )
+        return f"{hashlib.sha1(identity.encode('utf-8')).hexdigest()}.{stage}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Path of the cached artifact, or None. A hit marks the entry as recently used."""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def store(self, key: str, write: Callable[[str], Any]) -> Optional[str]:
+        """
+        Stores an artifact: 'write' is called with a temporary path to write
+        it to, which is then moved into place. Evicts the least recently used
+        entries if the cache is over max_bytes. Returns the entry's path, or
+        None if the artifact alone does not fit in the cache.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        os.close(fd)
+        try:
+            write(tmp_path)
+            if os.path.getsize(tmp_path) > self.max_bytes:
+                print(f"[WARN] Stage cache entry '{key}' is larger than max_bytes; not cached.", file=sys.stderr)
+                return None
+            os.replace(tmp_path, self._path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict(keep=key)
+        return self._path(key)
+
+    def entries(self) -> List[os.DirEntry]:
+        """Cached artifacts, least recently used first."""
+        with os.scandir(self.directory) as scan:
+            entries = [
+                entry for entry in scan
+                if entry.is_file() and not entry.name.startswith('.tmp-') and entry.name != _DIGEST_INDEX
+            ]
+        return sorted(entries, key=lambda entry: entry.stat().st_mtime_ns)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Removes least recently used entries until the cache fits in max_bytes. Returns the count removed."""
+        entries = self.entries()
+        total = sum(entry.stat().st_size for entry in entries)
+        removed = 0
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+            removed += 1
+        return removed
+
+    def load_events(self, key: str) -> Optional[EventBatch]:
+        path = self.lookup(key)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def store_events(self, key: str, events: EventBatch) -> Optional[str]:
+        # EventBatch columns are arrays, which pickle as flat buffers.
+        def write(path: str):
+            with open(path, 'wb') as f:
+                pickle.dump(events, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return self.store(key, write)
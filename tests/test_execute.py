@@ -0,0 +1,44 @@
+import contextlib
+import io
+import pytest
+from execute import read_pipeline_output
+from src.output.resp_writer import RespTraceWriter
+from src.output.sharding import ShardedTraceWriter
+from src.parsers.redis.redis_parser import RedisParser
+
+
+def make_events(count):
+    return [
+        {
+            "timestamp": 1700000000.0 + i * 0.001,
+            "client_id": f"0 127.0.0.1:{5000 + i % 7}",
+            "op_type": "SET",
+            "semantic_type": ["CREATE", "UPDATE"],
+            "target": f"key:{i % 13}",
+            "additional_data": {"raw_args": [f"v{i}"]},
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize('output_format', ['text', 'binary'])
+@pytest.mark.parametrize('shard_by', ['client', 'key'])
+def test_sharded_output_is_replayed_in_timestamp_order(tmp_path, output_format, shard_by):
+    parser = RedisParser(6)
+    events = make_events(500)
+    output_file = str(tmp_path / 'trace.log')
+    ShardedTraceWriter(parser, output_file, 3, shard_by, batch_size=50, output_format=output_format).write(events)
+    pipeline_config = {"generator_log_file": output_file, "output_shards": 3, "output_format": output_format}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        replayed = list(read_pipeline_output(parser, pipeline_config))
+    key = lambda event: (event['timestamp'], event['client_id'], event['target'], event['additional_data']['raw_args'])
+    assert [key(event) for event in replayed] == [key(event) for event in events]
+
+
+def test_resp_output_is_rejected_with_a_clear_error(tmp_path):
+    parser = RedisParser(6)
+    output_file = str(tmp_path / 'trace.resp')
+    RespTraceWriter(parser, output_file).write(make_events(10))
+    with pytest.raises(ValueError, match="external replay workers"):
+        read_pipeline_output(parser, {"generator_log_file": output_file, "output_format": "resp"})
@@ -0,0 +1,65 @@
+import contextlib
+import io
+import os
+from collections import Counter
+import pytest
+from src.benchmarks.monitor_trace import TraceSpec, write_monitor_trace
+from src.generators.heatmap.heatmap_generator import HeatmapGenerator
+from src.parsers.redis.redis_parser import RedisParser
+
+
+@pytest.fixture(scope='module')
+def parsed_events(tmp_path_factory):
+    # Many keys relative to the trace length, so a good share of READ/DELETE
+    # draws find no live key and are rejected.
+    trace_file = os.path.join(tmp_path_factory.mktemp('trace'), 'trace.log')
+    write_monitor_trace(TraceSpec(lines=20000, keys=50000), trace_file)
+    parser = RedisParser(6)
+    return parser, list(parser.parse(trace_file))
+
+
+def stream(parser, events, engine, workers, seed=11):
+    generator = HeatmapGenerator(
+        parser,
+        percentage_interval=5.0,
+        simulation_duration_s=4,
+        time_expansion_strategy='stretch',
+        seed=seed,
+        synthesis_engine=engine,
+        synthesis_workers=workers,
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield from generator.generate_stream(list(events))
+
+
+def synthesize(parser, events, engine, workers):
+    return Counter(event['op_type'] for event in stream(parser, events, engine, workers))
+
+
+def synthesize_trace(parser, events, engine, workers, seed):
+    # Formatted, so the payloads are compared by their text.
+    return [parser.format(event) for event in stream(parser, events, engine, workers, seed)]
+
+
+@pytest.mark.parametrize('engine', ['python', 'numpy'])
+def test_event_count_and_mix_are_stable_across_synthesis_workers(parsed_events, engine):
+    parser, events = parsed_events
+    single = synthesize(parser, events, engine, workers=1)
+    total = sum(single.values())
+    for workers in (2, 4):
+        merged = synthesize(parser, events, engine, workers)
+        merged_total = sum(merged.values())
+        # Thinned draws used to advance the clock even when the pool would
+        # have rejected them, which lost 15% or more of the events here.
+        assert abs(merged_total - total) / total < 0.02
+        for op_type in single:
+            assert abs(merged[op_type] / merged_total - single[op_type] / total) < 0.01
+
+
+@pytest.mark.parametrize('engine', ['python', 'numpy'])
+def test_same_seed_and_workers_reproduce_the_trace(parsed_events, engine):
+    parser, events = parsed_events
+    first = synthesize_trace(parser, events, engine, workers=2, seed=7)
+    assert first
+    assert synthesize_trace(parser, events, engine, workers=2, seed=7) == first
+    assert synthesize_trace(parser, events, engine, workers=2, seed=8) != first
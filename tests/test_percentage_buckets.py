@@ -0,0 +1,85 @@
+import random
+from decimal import Decimal
+import pytest
+from src.generators.heatmap.timebase import (
+    CHARACTERIZATION_MAX_PERCENTAGE,
+    SYNTHESIS_MAX_PERCENTAGE,
+    PercentageBuckets,
+)
+from src.parsers.redis.redis_parser import RedisParser
+
+INTERVALS = [0.5, 1, 2.5]
+MAX_PERCENTAGES = [CHARACTERIZATION_MAX_PERCENTAGE, SYNTHESIS_MAX_PERCENTAGE]
+
+
+def decimal_index(position_us, span_us, percentage_interval, max_percentage):
+    """The Decimal bucketing HeatmapGenerator used before PercentageBuckets (reference)."""
+    relative_ms = Decimal(position_us) / 1000
+    total_duration_ms = Decimal(span_us) / 1000
+    percentage_complete = (relative_ms / total_duration_ms) * 100
+    if percentage_complete >= 100:
+        percentage_complete = Decimal(max_percentage)
+    return int(percentage_complete // Decimal(str(percentage_interval)))
+
+
+def random_pairs(rng, count):
+    for _ in range(count):
+        # Spans from a millisecond up to about a day of microseconds.
+        span = rng.randrange(1000, 10 ** rng.randint(4, 11))
+        yield rng.randrange(0, span + 1), span
+
+
+@pytest.mark.parametrize('max_percentage', MAX_PERCENTAGES)
+@pytest.mark.parametrize('percentage_interval', INTERVALS)
+def test_matches_decimal_on_random_positions(percentage_interval, max_percentage):
+    buckets = PercentageBuckets(percentage_interval, max_percentage)
+    rng = random.Random(2)
+    for position, span in random_pairs(rng, 20000):
+        assert buckets.index(position, span) == decimal_index(position, span, percentage_interval, max_percentage)
+
+
+@pytest.mark.parametrize('max_percentage', MAX_PERCENTAGES)
+@pytest.mark.parametrize('percentage_interval', INTERVALS)
+def test_matches_decimal_around_interval_boundaries(percentage_interval, max_percentage):
+    # Positions exactly on (and one microsecond around) every interval
+    # boundary, where rounding would show first.
+    buckets = PercentageBuckets(percentage_interval, max_percentage)
+    interval = Decimal(str(percentage_interval))
+    rng = random.Random(3)
+    for span in [1000, 999_983, 20_000_000, 86_400_000_000] + [rng.randrange(1000, 10 ** 10) for _ in range(20)]:
+        for k in range(int(100 // interval) + 1):
+            boundary = int(span * k * interval / 100)
+            for position in (boundary - 1, boundary, boundary + 1):
+                if 0 <= position <= span:
+                    assert buckets.index(position, span) == decimal_index(position, span, percentage_interval, max_percentage)
+
+
+@pytest.mark.parametrize('percentage_interval', INTERVALS)
+def test_end_of_span_is_clamped_to_last_interval(percentage_interval):
+    for max_percentage in MAX_PERCENTAGES:
+        buckets = PercentageBuckets(percentage_interval, max_percentage)
+        expected = decimal_index(1, 1, percentage_interval, max_percentage)
+        assert buckets.last_index == expected == int(100 // Decimal(str(percentage_interval))) - 1
+        assert buckets.index(5000, 5000) == expected
+
+
+@pytest.mark.parametrize('percentage_interval', INTERVALS)
+def test_next_boundary_starts_the_next_interval(percentage_interval):
+    buckets = PercentageBuckets(percentage_interval, SYNTHESIS_MAX_PERCENTAGE)
+    rng = random.Random(4)
+    for position, span in random_pairs(rng, 5000):
+        if position >= span:
+            continue
+        boundary = buckets.next_boundary(position, span)
+        assert position < boundary <= span
+        if boundary < span:
+            assert buckets.index(boundary, span) > buckets.index(position, span)
+            assert buckets.index(boundary - 1, span) == buckets.index(position, span)
+
+
+def test_parser_rejects_sub_microsecond_granularity():
+    # Anything finer than microseconds would be dropped by seconds_to_micros.
+    assert RedisParser(6).timestamp_granularity == 6
+    for granularity in (7, 9, -1):
+        with pytest.raises(ValueError, match="timestamp_granularity"):
+            RedisParser(granularity)
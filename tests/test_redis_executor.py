@@ -0,0 +1,171 @@
+import asyncio
+from typing import List, Optional
+from src.executors.redis.redis_executor import RedisExecutor
+from src.executors.redis.resp import encode_command
+
+
+class FakeRespServer:
+    """
+    In-process RESP server. Replies '+OK' to every command ('-ERR' to BAD,
+    after 'slow_reply_s' to SLOW) and records, per connection, the commands
+    it received, when, and how many arrived in each read.
+    """
+
+    def __init__(self, slow_reply_s: float = 0.0):
+        self.slow_reply_s = slow_reply_s
+        self.connections: List[List[List[bytes]]] = []
+        self.arrivals: List[tuple] = []
+        self.commands_per_read: List[int] = []
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def __aenter__(self) -> 'FakeRespServer':
+        self._server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        received: List[List[bytes]] = []
+        self.connections.append(received)
+        buffer = b''
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            buffer += data
+            commands, buffer = self._split_commands(buffer)
+            if not commands:
+                continue
+            self.commands_per_read.append(len(commands))
+            replies = []
+            for command in commands:
+                received.append(command)
+                self.arrivals.append((loop.time(), command))
+                if command[0] == b'SLOW':
+                    await asyncio.sleep(self.slow_reply_s)
+                replies.append(b'-ERR unknown command\r\n' if command[0] == b'BAD' else b'+OK\r\n')
+            writer.write(b''.join(replies))
+            await writer.drain()
+        writer.close()
+
+    @staticmethod
+    def _split_commands(buffer: bytes):
+        """Complete RESP arrays at the start of 'buffer', and the rest."""
+        commands = []
+        while True:
+            end = buffer.find(b'\r\n')
+            if end < 0:
+                return commands, buffer
+            count = int(buffer[1:end])
+            position = end + 2
+            args = []
+            for _ in range(count):
+                end = buffer.find(b'\r\n', position)
+                if end < 0:
+                    return commands, buffer
+                length = int(buffer[position + 1:end])
+                start = end + 2
+                if len(buffer) < start + length + 2:
+                    return commands, buffer
+                args.append(buffer[start:start + length])
+                position = start + length + 2
+            commands.append(args)
+            buffer = buffer[position:]
+
+
+def event(timestamp, client_id, op_type, target, *raw_args):
+    return {
+        "timestamp": timestamp,
+        "client_id": client_id,
+        "op_type": op_type,
+        "semantic_type": [],
+        "target": target,
+        "additional_data": {"raw_args": list(raw_args)},
+    }
+
+
+def replay(events, server=None, **executor_args):
+    async def run():
+        async with (server or FakeRespServer()) as fake:
+            executor = RedisExecutor(port=fake.port, **executor_args)
+            summary = await executor.execute_async(events)
+        return summary, fake
+    return asyncio.run(run())
+
+
+def test_encodes_events_as_resp_commands():
+    assert encode_command(['SET', 'k', 'v']) == b'*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$1\r\nv\r\n'
+    assert encode_command(['SET', 'k', '\udcff']) == b'*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$1\r\n\xff\r\n'
+
+    summary, server = replay([event(1.0, 'c1', 'SET', 'k', 'v'), event(1.0, 'c1', 'GET', 'k')])
+    assert server.connections == [[[b'SET', b'k', b'v'], [b'GET', b'k']]]
+    assert (summary.attempted, summary.succeeded, summary.failed) == (2, 2, 0)
+
+
+def test_error_replies_are_counted_as_failures():
+    summary, _ = replay([event(0.0, 'c1', 'SET', 'k', 'v'), event(0.0, 'c1', 'BAD', 'k'), event(0.0, 'c1', 'GET', 'k')])
+    assert (summary.attempted, summary.succeeded, summary.failed) == (3, 2, 1)
+
+
+def test_open_loop_scheduling_does_not_wait_for_replies():
+    # c1's SLOW request is answered only after 0.5 s; c2's requests must
+    # still go out at their own trace times (50 ms apart) in the meantime.
+    events = [event(100.0, 'c1', 'SLOW', 'k')] + [event(100.0 + 0.05 * i, 'c2', 'GET', f'k{i}') for i in range(1, 5)]
+    summary, server = replay(events, FakeRespServer(slow_reply_s=0.5))
+
+    first_arrival = server.arrivals[0][0]
+    offsets = {command[1]: arrival - first_arrival for arrival, command in server.arrivals}
+    for i in range(1, 5):
+        # Not released early, and not held back behind the slow reply.
+        assert offsets[f'k{i}'.encode()] >= 0.05 * i - 0.01
+        assert offsets[f'k{i}'.encode()] < 0.4
+    assert (summary.attempted, summary.succeeded) == (5, 5)
+    # Latency is measured from the scheduled time, so the slow reply shows.
+    assert summary.latency_max_ms >= 450
+    assert summary.duration_s >= 0.2
+
+
+def test_pipelining_writes_several_requests_before_reading_replies():
+    events = [event(0.0, 'c1', 'SET', f'k{i}', 'v') for i in range(200)]
+
+    summary, server = replay(events, pipeline_depth=1)
+    assert max(server.commands_per_read) == 1
+    assert summary.succeeded == 200
+
+    summary, server = replay(events, pipeline_depth=8)
+    # Never more than the depth in flight, and actually batched.
+    assert 1 < max(server.commands_per_read) <= 8
+    assert summary.succeeded == 200
+    # Requests of a client stay in trace order.
+    assert [command[1] for command in server.connections[0]] == [f'k{i}'.encode() for i in range(200)]
+
+
+def test_each_client_id_reuses_its_own_connection():
+    clients = ['c1', 'c2', 'c3']
+    events = [event(0.001 * i, clients[i % 3], 'SET', f'{clients[i % 3]}:{i}', 'v') for i in range(60)]
+
+    summary, server = replay(events, max_connections=10)
+    assert summary.succeeded == 60
+    assert len(server.connections) == 3
+    for received in server.connections:
+        owners = {command[1].split(b':')[0] for command in received}
+        assert len(owners) == 1
+        positions = [int(command[1].split(b':')[1]) for command in received]
+        assert len(positions) == 20 and positions == sorted(positions)
+
+
+def test_clients_share_connections_beyond_max_connections():
+    clients = ['c1', 'c2', 'c3', 'c4', 'c5']
+    events = [event(0.0, clients[i % 5], 'SET', f'{clients[i % 5]}:{i}', 'v') for i in range(50)]
+
+    summary, server = replay(events, max_connections=2)
+    assert summary.succeeded == 50
+    assert len(server.connections) == 2
+    owners = [sorted({command[1].split(b':')[0] for command in received}) for received in server.connections]
+    # Round-robin in order of first appearance.
+    assert sorted(owners) == [[b'c1', b'c3', b'c5'], [b'c2', b'c4']]
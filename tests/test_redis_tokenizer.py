@@ -0,0 +1,125 @@
+import random
+import time
+from src.parsers.redis.payload_arena import PAYLOAD_ALPHABET
+from src.parsers.redis.redis_parser import RedisParser
+
+
+def legacy_parse_command_args(command_str):
+    """The char-by-char tokenizer RedisParser used before the regex one (reference)."""
+    args = []
+    current_arg = ""
+    in_quotes = False
+    i = 0
+    while i < len(command_str):
+        char = command_str[i]
+
+        if not in_quotes:
+            if char == '"':
+                in_quotes = True
+            i += 1
+            continue
+
+        if char == '"' and (i + 1 == len(command_str) or (command_str[i+1].isspace() and command_str[i+2] == '"')):
+            in_quotes = False
+            args.append(current_arg)
+            current_arg = ""
+        else:
+            current_arg += char
+        i += 1
+    return args
+
+
+def monitor_command(values):
+    """Renders raw values the way MONITOR does: escaped (sdscatrepr) and quoted."""
+    return ' '.join(f'"{RedisParser._escape_arg(value)}"' for value in values)
+
+
+def random_value(rng, allow_quotes):
+    alphabet = ['a', 'Z', '0', ' ', '\\', '\n', '\t', '\x00', '\x7f', '\udcff', 'é', "'"]
+    if allow_quotes:
+        alphabet += ['"', '" ', '\\"']
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randrange(0, 12)))
+
+
+def random_command(rng, allow_quotes):
+    op = rng.choice(['SET', 'GET', 'HMSET', 'ZADD', 'DEL'])
+    return [op] + [random_value(rng, allow_quotes) for _ in range(rng.randrange(1, 6))]
+
+
+def test_matches_legacy_tokenizer_on_quote_free_values():
+    # Without raw double-quotes in the values the legacy rule was unambiguous,
+    # so both tokenizers must agree exactly (raw, still escaped arguments).
+    parser = RedisParser(6)
+    rng = random.Random(5)
+    for _ in range(5000):
+        command = monitor_command(random_command(rng, allow_quotes=False))
+        assert parser._parse_command_args(command) == legacy_parse_command_args(command)
+
+
+def test_round_trips_values_with_escaped_quotes():
+    parser = RedisParser(6, unescape_args=True)
+    rng = random.Random(6)
+    for _ in range(5000):
+        values = random_command(rng, allow_quotes=True)
+        assert parser._parse_command_args(monitor_command(values)) == values
+
+
+def test_escaped_quote_followed_by_space_stays_one_argument():
+    command = r'"SET" "a\" " "v"'
+    assert RedisParser(6)._parse_command_args(command) == ['SET', 'a\\" ', 'v']
+    assert RedisParser(6, unescape_args=True)._parse_command_args(command) == ['SET', 'a" ', 'v']
+
+
+def test_trailing_backslash():
+    command = r'"SET" "k" "x\\"'
+    assert RedisParser(6)._parse_command_args(command) == ['SET', 'k', 'x\\\\']
+    assert RedisParser(6, unescape_args=True)._parse_command_args(command) == ['SET', 'k', 'x\\']
+
+
+def test_hex_escapes():
+    command = r'"SET" "k" "\xff\x00\x41"'
+    assert RedisParser(6)._parse_command_args(command) == ['SET', 'k', '\\xff\\x00\\x41']
+    assert RedisParser(6, unescape_args=True)._parse_command_args(command) == ['SET', 'k', '\udcff\x00A']
+
+
+def test_empty_and_unterminated_arguments():
+    parser = RedisParser(6)
+    assert parser._parse_command_args('"GET" ""') == ['GET', '']
+    assert parser._parse_command_args('"SET" "k" "cut off') == ['SET', 'k']
+    assert parser._parse_command_args('no quotes') == []
+
+
+def test_parse_line_with_escaped_quote_and_unescape():
+    parser = RedisParser(6, unescape_args=True)
+    event = parser._parse_line_to_fei(r'1700000000.000001 [0 127.0.0.1:5000] "SET" "a\" " "v\\"')
+    assert event['op_type'] == 'SET'
+    assert event['target'] == 'a" '
+    assert event['additional_data']['raw_args'] == ['v\\']
+    assert parser.format(event) == r'1700000000.000001 [0 127.0.0.1:5000] "SET" "a\" " "v\\"'
+
+
+def test_synthetic_payloads_need_no_escaping():
+    assert '"' not in PAYLOAD_ALPHABET and '\\' not in PAYLOAD_ALPHABET
+    parser = RedisParser(6)
+    command = monitor_command(['SET', 'k', PAYLOAD_ALPHABET])
+    assert parser._parse_command_args(command) == ['SET', 'k', PAYLOAD_ALPHABET]
+
+
+def _throughput(tokenize, commands):
+    start = time.perf_counter()
+    for command in commands:
+        tokenize(command)
+    elapsed = time.perf_counter() - start
+    return sum(len(command) for command in commands) / elapsed / 2**20
+
+
+def test_throughput_against_legacy_tokenizer():
+    # Large HMSET/SET payloads, where the char-by-char tokenizer was slowest.
+    rng = random.Random(7)
+    payload = ''.join(rng.choices('abcdefghij\\"', k=16 * 1024))
+    commands = [monitor_command(['HMSET', f'key:{i}', 'field0', payload, 'field1', 'x']) for i in range(50)]
+    parser = RedisParser(6)
+    new_mb_s = _throughput(parser._parse_command_args, commands)
+    legacy_mb_s = _throughput(legacy_parse_command_args, commands)
+    print(f"\ntokenizer throughput: {new_mb_s:,.1f} MB/s (legacy {legacy_mb_s:,.1f} MB/s)")
+    assert new_mb_s > 5 * legacy_mb_s
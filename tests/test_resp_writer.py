@@ -0,0 +1,57 @@
+import json
+import os
+import random
+from array import array
+from src.output.resp_writer import RespTraceWriter, read_groups
+from src.output.sharding import manifest_path
+from src.parsers.redis.redis_parser import RedisParser
+
+
+def make_events(count, clients, seed=1):
+    rng = random.Random(seed)
+    return [
+        {
+            "timestamp": 1700000000 + i * 0.000731,
+            "client_id": f"0 127.0.0.1:{5000 + rng.randrange(clients)}",
+            "op_type": "SET",
+            "semantic_type": ["CREATE", "UPDATE"],
+            "target": f"key:{i}",
+            "additional_data": {"raw_args": ["v" * rng.randrange(1, 30)]},
+        }
+        for i in range(count)
+    ]
+
+
+def test_group_index_is_streamed_to_sidecar_files(tmp_path):
+    # Small batches, few open files and a low buffering cap, so every client
+    # is flushed (and its files reopened) many times.
+    parser = RedisParser(6)
+    events = make_events(5000, clients=30)
+    output_file = str(tmp_path / 'trace.resp')
+    writer = RespTraceWriter(parser, output_file, pipeline_size=3, batch_size=7, max_open_files=4, max_buffered_events=40)
+    assert writer.write(events) == len(events)
+
+    with open(manifest_path(output_file), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert len(manifest["clients"]) == 30
+    for client_id, client in manifest["clients"].items():
+        mine = [event for event in events if event['client_id'] == client_id]
+        ends = array('Q')
+        with open(tmp_path / client["file"], 'rb') as f:
+            assert f.read() == parser.format_wire(mine, ends)
+
+        expected = array('Q')
+        for i in range(0, len(mine), 3):
+            expected.append(round(mine[i]['timestamp'] * 1_000_000))
+            expected.append(ends[i - 1] if i else 0)
+        assert read_groups(str(tmp_path / client["groups_file"])) == expected
+        assert client["groups"] == len(expected) // 2
+
+
+def test_no_group_index_without_pipeline_size(tmp_path):
+    output_file = str(tmp_path / 'trace.resp')
+    RespTraceWriter(RedisParser(6), output_file).write(make_events(100, clients=3))
+    with open(manifest_path(output_file), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert all("groups" not in client for client in manifest["clients"].values())
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.groups')]